@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# Compare the time taken to check a generated pact against an expected pact, between the canonical form comparison
+# used by run_examples.py and the previous DeepDiff based comparison, for pacts with many interactions.
+#
+# Run with e.g.: benchmarks/bench_compare.py --interactions 1000 --interactions 5000
+
+import copy
+import json
+import pathlib
+import sys
+import timeit
+
+import click
+from deepdiff import DeepDiff
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.joinpath("scripts")))
+
+from pact_compare import _canonicalise, _compare_pacts  # noqa: E402
+from shared import bcolors  # noqa: E402
+
+
+def _synthetic_pact(num_interactions: int) -> dict:
+    return {
+        "consumer": {"name": "BearServiceClient"},
+        "provider": {"name": "BearService"},
+        "interactions": [
+            {
+                "description": f"A request for the Bear species with id {idx}",
+                "providerState": "There are some bears",
+                "request": {"method": "get", "path": f"/species/{idx}", "query": f"name=Bear{idx}"},
+                "response": {
+                    "status": 200,
+                    "headers": {"Content-Type": "application/json"},
+                    "body": {"name": f"Bear{idx}", "colour": "White", "tags": [f"tag{x}" for x in range(5)]},
+                },
+            }
+            for idx in range(num_interactions)
+        ],
+        "metadata": {"pactSpecification": {"version": "2.0.0"}},
+    }
+
+
+def _deepdiff_compare(actual: dict, expected: dict) -> bool:
+    """The comparison as it was previously done in _compare_example."""
+    for data in [actual, expected]:
+        data["metadata"].pop("pact-js", None)
+        data["metadata"].pop("pactRust", None)
+        data["metadata"].pop("pactSpecification", None)
+        if "interactions" in data:
+            num_interactions = len(data["interactions"])
+            for interaction in range(num_interactions):
+                data["interactions"][interaction]["response"]["headers"].pop("Content-Type", None)
+
+    expected["consumer"]["name"] = expected["consumer"]["name"].replace("LANGUAGE", "python")
+    expected["provider"]["name"] = expected["provider"]["name"].replace("LANGUAGE", "python")
+
+    if "interactions" in expected:
+        for interaction in expected["interactions"]:
+            interaction["request"]["method"] = interaction["request"]["method"].upper()
+        for interaction in actual["interactions"]:
+            interaction["request"]["method"] = interaction["request"]["method"].upper()
+
+    diff = DeepDiff(actual, expected)
+    if diff:
+        str(diff)
+        json.dumps(actual, indent=4)
+        json.dumps(expected, indent=4)
+    return not diff
+
+
+def _canonical_compare(actual: dict, expected: dict) -> bool:
+    return not _compare_pacts(_canonicalise(actual, spec="v2"), _canonicalise(expected, spec="v2", language="python"))
+
+
+def _time(compare, actual: dict, expected: dict, repeat: int) -> float:
+    # The pacts are normalised in place, so each run needs its own copies, which aren't included in the timing
+    copies = [(copy.deepcopy(actual), copy.deepcopy(expected)) for _ in range(repeat)]
+    runs = iter(copies)
+    return min(timeit.repeat(lambda: compare(*next(runs)), number=1, repeat=repeat))
+
+
+@click.command()
+@click.option("--interactions", multiple=True, type=int, default=[100, 1000, 5000], show_default=True)
+@click.option("--repeat", default=3, show_default=True, help="Runs of each, the fastest is reported")
+def main(interactions, repeat):
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Pact comparison: DeepDiff vs canonical form{bcolors.ENDC}")
+    print(f"{'interactions':>12} {'case':>10} {'deepdiff':>10} {'canonical':>10} {'speedup':>8}")
+    for num_interactions in interactions:
+        expected = _synthetic_pact(num_interactions)
+        identical = copy.deepcopy(expected)
+        different = copy.deepcopy(expected)
+        different["interactions"][-1]["response"]["body"]["colour"] = "Brown"
+
+        for case, actual in [("identical", identical), ("different", different)]:
+            assert _deepdiff_compare(copy.deepcopy(actual), copy.deepcopy(expected)) == _canonical_compare(
+                copy.deepcopy(actual), copy.deepcopy(expected)
+            )
+            deepdiff_time = _time(_deepdiff_compare, actual, expected, repeat)
+            canonical_time = _time(_canonical_compare, actual, expected, repeat)
+            print(
+                f"{num_interactions:>12} {case:>10} {deepdiff_time:>9.3f}s {canonical_time:>9.3f}s "
+                f"{deepdiff_time / canonical_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+# Compare how many species a second the Python BearConsumer of example-hello-world can fetch from a Provider which
+# takes a while to respond: one at a time, get_species_many over the pooled connections, and get_species_many of the
+# AsyncBearConsumer. Every way of fetching them is checked to give the same species.
+#
+# Run with e.g.: benchmarks/bench_consumer.py --species 500 --latency 50 --concurrency 20
+
+import asyncio
+import importlib.util
+import json
+import pathlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_PATH.joinpath("scripts")))
+
+from shared import bcolors  # noqa: E402
+
+CONSUMER_PATH = ROOT_PATH.joinpath(
+    "suites/consumer-features/example-hello-world/v2/example-hello-world-python/src/consumer.py"
+)
+
+
+def _load_consumer():
+    spec = importlib.util.spec_from_file_location("consumer", CONSUMER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _provider(latency: float) -> ThreadingHTTPServer:
+    """A Provider on a free port, taking latency seconds to respond to each request, and which doesn't know species 0."""
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep the connection open between requests, as the Provider would
+        protocol_version = "HTTP/1.1"
+        # The headers and body are written separately, don't wait for the first to be acknowledged to send the second
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            species_id = int(self.path.rsplit("/", 1)[1])
+            if species_id == 0:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = json.dumps({"name": f"Bear {species_id}", "colour": "White"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@click.command()
+@click.option("--species", default=200, show_default=True, help="How many species to fetch")
+@click.option("--latency", default=20.0, show_default=True, help="How long the Provider takes to respond, in ms")
+@click.option("--concurrency", default=10, show_default=True, help="How many requests can be in flight at once")
+def main(species, latency, concurrency):
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Fetching {species} species, with {latency:.0f}ms latency{bcolors.ENDC}")
+    consumer = _load_consumer()
+    server = _provider(latency / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    # Every tenth species isn't found, so None is returned for it
+    species_ids = [0 if idx % 10 == 0 else idx for idx in range(species)]
+
+    def _one_at_a_time():
+        with consumer.BearConsumer(url, pool_size=concurrency) as client:
+            return [client.get_species(x) for x in species_ids]
+
+    def _many():
+        with consumer.BearConsumer(url, pool_size=concurrency) as client:
+            return client.get_species_many(species_ids)
+
+    async def _many_async():
+        async with consumer.AsyncBearConsumer(url, max_concurrency=concurrency) as client:
+            return await client.get_species_many(species_ids)
+
+    print(f"{'':<40} {'time':>8} {'species/s':>10}")
+    results = {}
+    try:
+        for name, fetch in [
+            ("sync, one at a time", _one_at_a_time),
+            (f"sync, get_species_many ({concurrency} connections)", _many),
+            (f"async, get_species_many ({concurrency} at once)", lambda: asyncio.run(_many_async())),
+        ]:
+            start = time.perf_counter()
+            fetched = fetch()
+            elapsed = time.perf_counter() - start
+            results[name] = [(x.name, x.colour) if x else None for x in fetched]
+            print(f"{name:<40} {elapsed:>7.2f}s {species / elapsed:>10.0f}")
+    finally:
+        server.shutdown()
+
+    if any(x != results["sync, one at a time"] for x in results.values()):
+        print(f"{bcolors.FAIL}The species fetched differ between the ways of fetching them{bcolors.ENDC}")
+        sys.exit(1)
+    print(f"{bcolors.OKGREEN}Every way of fetching them gave the same species{bcolors.ENDC}")
+
+
+if __name__ == "__main__":
+    main()
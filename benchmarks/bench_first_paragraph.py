@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# Compare the time taken to extract the first paragraph of each README.md, between rendering the whole README with
+# Markdown and parsing it with Beautiful Soup every time, as run_examples.py used to, and the same memoised by the
+# content hash of each file, as it does now. Each README.md in the repo is checked to give the same text both ways.
+#
+# Run with e.g.: benchmarks/bench_first_paragraph.py --sections 10 --sections 1000
+
+import pathlib
+import sys
+import tempfile
+import timeit
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_PATH.joinpath("scripts")))
+
+from first_paragraph import _first_paragraph, _first_paragraph_text  # noqa: E402
+from shared import bcolors  # noqa: E402
+
+
+def _rendered_first_paragraph(path: pathlib.Path) -> str:
+    """The extraction as it was previously done in _extract_first_paragraph, rendering the file every time."""
+    with open(path) as f:
+        return _first_paragraph_text(f.read())
+
+
+def _synthetic_readme(num_sections: int) -> str:
+    sections = [
+        f"## Section {idx}\n\nSome *text* about [section {idx}](https://example.com/{idx}), with `code`.\n\n"
+        f"- An item\n- Another item\n\n    indented_code({idx})\n"
+        for idx in range(num_sections)
+    ]
+    return "# example-synthetic\n\nThis is a **synthetic** example, to show the cost of a long README.\n\n" + "\n".join(
+        sections
+    )
+
+
+def _readmes() -> list[pathlib.Path]:
+    return [path for path in sorted(ROOT_PATH.glob("**/README.md")) if "node_modules" not in path.parts]
+
+
+@click.command()
+@click.option("--sections", multiple=True, type=int, default=[10, 100, 1000], show_default=True)
+@click.option("--repeat", default=5, show_default=True, help="Runs of each, the fastest is reported")
+def main(sections, repeat):
+    print(f"{bcolors.HEADER}{bcolors.BOLD}First paragraph: rendered every time vs memoised{bcolors.ENDC}")
+
+    readmes = _readmes()
+    different = [path for path in readmes if _first_paragraph(path) != _rendered_first_paragraph(path)]
+    for path in different:
+        print(f"{bcolors.FAIL}{path}: {_rendered_first_paragraph(path)=}, {_first_paragraph(path)=}{bcolors.ENDC}")
+    if different:
+        sys.exit(1)
+    print(f"{bcolors.OKGREEN}All {len(readmes)} README.md files give the same text{bcolors.ENDC}")
+
+    print(f"{'readme':>24} {'rendered':>10} {'memoised':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [("repo README.md files", readmes)]
+        for num_sections in sections:
+            path = pathlib.Path(tmp).joinpath(f"{num_sections}.md")
+            path.write_text(_synthetic_readme(num_sections))
+            cases.append((f"{num_sections} sections", [path]))
+
+        for case, paths in cases:
+            rendered_time = min(
+                timeit.repeat(lambda: [_rendered_first_paragraph(x) for x in paths], number=1, repeat=repeat)
+            )
+            # The first of each is rendered, then every later one is memoised
+            memoised_time = min(timeit.repeat(lambda: [_first_paragraph(x) for x in paths], number=1, repeat=repeat))
+            print(f"{case:>24} {rendered_time:>9.4f}s {memoised_time:>9.4f}s {rendered_time / memoised_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
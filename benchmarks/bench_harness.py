@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+# Time each phase of run_examples.py over synthetic repos, with hundreds of examples, several specs, languages and
+# flavours, and large pacts. Examples are run with the fake Docker client, so neither Docker nor any images are needed.
+#
+# The times are compared with those stored in benchmarks/baselines/bench_harness.json, which is updated with
+# --update-baseline, so a change to the baseline shows up in review. Times vary between machines, so compare baselines
+# made on the same machine.
+#
+# Run with e.g.: benchmarks/bench_harness.py --examples 50 --examples 500 --check
+
+import contextlib
+import functools
+import io
+import json
+import pathlib
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_PATH.joinpath("scripts")))
+
+import first_paragraph  # noqa: E402
+import run_examples  # noqa: E402
+from container_pool import ContainerPool  # noqa: E402
+from fake_docker import FakeDockerClient, FakeExecResult  # noqa: E402
+from manifest import _load_manifest  # noqa: E402
+from pact_compare import COMPARISON_FINGERPRINT  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+from result_reports import ResultsLog  # noqa: E402
+from scheduler import _run_cells  # noqa: E402
+from shared import _get_languages_and_specs, bcolors  # noqa: E402
+
+BASELINE_PATH = ROOT_PATH.joinpath("benchmarks").joinpath("baselines").joinpath("bench_harness.json")
+
+SUITE = "synthetic"
+
+README = """# {example}
+
+This is a **synthetic** example, number {idx}, with [a link](https://example.com/{idx}) and `code`.
+
+## Setup
+
+<!-- Annotated code block - setup -->
+
+## Test
+
+<!-- Annotated code block - test -->
+
+{sections}
+"""
+
+SOURCE = """import requests
+
+
+# Pact annotated code block - setup
+def setup():
+    return requests.Session()
+# End Pact annotated code block
+
+{filler}
+
+# Pact annotated code block - test
+def test_{idx}(session):
+    assert session.get("http://localhost:1234/species/{idx}").ok
+# End Pact annotated code block
+"""
+
+
+def _synthetic_pact(example: str, num_interactions: int, spec: str) -> dict:
+    return {
+        "consumer": {"name": f"{example}-LANGUAGE-consumer"},
+        "provider": {"name": f"{example}-LANGUAGE-provider"},
+        "interactions": [
+            {
+                "description": f"A request for the Bear species with id {idx}",
+                "providerState": "There are some bears",
+                "request": {"method": "GET", "path": f"/species/{idx}", "query": f"name=Bear{idx}"},
+                "response": {
+                    "status": 200,
+                    "headers": {"Content-Type": "application/json"},
+                    "body": {"name": f"Bear{idx}", "colour": "White", "tags": [f"tag{x}" for x in range(5)]},
+                },
+            }
+            for idx in range(num_interactions)
+        ],
+        "metadata": {"pactSpecification": {"version": f"{spec[1:]}.0.0"}},
+    }
+
+
+def _synthetic_repo(
+    root_path: pathlib.Path, num_examples: int, specs: list[str], languages: list[str], num_interactions: int
+):
+    """A repo with languages/ and a suite of num_examples examples, each implemented in every language and spec, and
+    for the first language also in a -flavour."""
+    for language in languages:
+        for spec in specs:
+            dockerfile = root_path.joinpath("languages", language, spec, "Dockerfile")
+            dockerfile.parent.mkdir(parents=True)
+            dockerfile.write_text(f"FROM {language}\n")
+
+    suite_path = root_path.joinpath("suites", SUITE)
+    suite_path.mkdir(parents=True)
+    suite_path.joinpath("README.md").write_text("# Synthetic\n\nA suite of synthetic examples.\n")
+    for idx in range(num_examples):
+        example = f"example-{idx:04d}"
+        example_path = suite_path.joinpath(example)
+        example_path.mkdir()
+        sections = "\n".join(f"## Section {x}\n\nSome text about section {x}.\n" for x in range(20))
+        example_path.joinpath("README.md").write_text(README.format(example=example, idx=idx, sections=sections))
+        for spec in specs:
+            pacts_path = example_path.joinpath(spec, "pacts")
+            pacts_path.mkdir(parents=True)
+            pacts_path.joinpath(f"{example}-LANGUAGE-consumer-{example}-LANGUAGE-provider.json").write_text(
+                json.dumps(_synthetic_pact(example, num_interactions, spec), indent=2)
+            )
+            for dir_name in [f"{example}-{x}" for x in languages] + [f"{example}-{languages[0]}-flavour"]:
+                implementation_path = example_path.joinpath(spec, dir_name)
+                implementation_path.mkdir()
+                implementation_path.joinpath("Makefile").write_text("test:\n\ttrue\n")
+                filler = "\n".join(f"# Line {x} of a longer test file" for x in range(200))
+                implementation_path.joinpath("test_example.py").write_text(SOURCE.format(idx=idx, filler=filler))
+
+
+def _generate_pacts(root_path: pathlib.Path, container, command, workdir) -> FakeExecResult:
+    """Stands in for running an example, writing the pacts it is expected to generate."""
+    example_path = container.host_path(workdir)
+    # i.e. <workspace root>/<example dir name>-<random>/example
+    dir_name = example_path.parent.name.rsplit("-", 1)[0]
+    language = dir_name.split("-")[2]
+    spec = container.image.rsplit("-", 1)[1]
+    pacts_path = root_path.joinpath("suites", SUITE, "-".join(dir_name.split("-")[:2]), spec, "pacts")
+    output_path = example_path.joinpath("output", "pacts")
+    output_path.mkdir(parents=True, exist_ok=True)
+    for pact_path in pacts_path.iterdir():
+        output_path.joinpath(pact_path.name.replace("LANGUAGE", language)).write_text(
+            pact_path.read_text().replace("LANGUAGE", language)
+        )
+    return FakeExecResult(exit_code=0, output=b"Tests passed\n" * 100)
+
+
+def _phases(root_path: pathlib.Path, languages: list[str], specs: list[str]) -> dict[str, Callable[[], None]]:
+    """Each phase to time, in the order a run goes through them, which must be able to be run repeatedly."""
+    cache_path = root_path.joinpath(".cache")
+    suites_path = root_path.joinpath("suites")
+    examples_path = suites_path.joinpath(SUITE)
+
+    def _forget(*names: str):
+        _load_manifest.cache_clear()
+        first_paragraph._first_paragraphs.clear()
+        for name in names:
+            path = cache_path.joinpath(name)
+            shutil.rmtree(path) if path.is_dir() else path.unlink(missing_ok=True)
+
+    def _languages_and_specs():
+        return _get_languages_and_specs(root_path.joinpath("languages"), examples_path=examples_path)
+
+    # The pacts each example would generate for the first language and spec, to compare with those expected
+    generated_path = root_path.joinpath("generated")
+    for example_path in sorted(examples_path.iterdir()):
+        if example_path.is_dir():
+            pacts_path = generated_path.joinpath(example_path.name, "pacts")
+            pacts_path.mkdir(parents=True)
+            for pact_path in example_path.joinpath(specs[0], "pacts").iterdir():
+                pacts_path.joinpath(pact_path.name.replace("LANGUAGE", languages[0])).write_text(
+                    pact_path.read_text().replace("LANGUAGE", languages[0])
+                )
+
+    def _compare_examples():
+        for example in _load_manifest(root_path).examples(SUITE):
+            output_path = generated_path.joinpath(example)
+            run_examples._compare_example(output_path, examples_path, example, specs[0], languages[0])
+
+    def _first_paragraphs():
+        for example in _load_manifest(root_path).examples(SUITE):
+            run_examples._extract_first_paragraph(examples_path.joinpath(example, "README.md"), example, SUITE)
+
+    def _scrape():
+        run_examples._scrape_annotated_code_blocks(
+            examples_path, _load_manifest(root_path).examples(SUITE), _languages_and_specs()
+        )
+
+    def _docs():
+        run_examples._generate_example_docs(
+            root_path, examples_path, _load_manifest(root_path).examples(SUITE), _languages_and_specs(), SUITE
+        )
+
+    def _run():
+        plan = run_examples.plan_suite(root_path, suites_path, SUITE)
+        client = FakeDockerClient(
+            [f"pact-examples-{x}-{y}" for x in languages for y in specs], functools.partial(_generate_pacts, root_path)
+        )
+        pool = ContainerPool(client=client, max_uses=10)
+        cache = ResultCache(cache_path.joinpath("results"), client, COMPARISON_FINGERPRINT, reuse=False)
+        results_log = ResultsLog(cache_path.joinpath("report", "results.jsonl"))
+        settings = run_examples.RunSettings(cache_path.joinpath("report", "logs"), 100, None, None)
+        try:
+            _run_cells(plan.cells, functools.partial(run_examples._run_cell, pool, cache, results_log, settings), 4)
+        finally:
+            pool.close()
+            results_log.close()
+
+    return {
+        "languages and specs, scan": lambda: (_forget("manifest.json"), _languages_and_specs()),
+        "languages and specs, cached": lambda: (_forget(), _languages_and_specs()),
+        "examples": lambda: run_examples._get_examples(examples_path),
+        "compare examples": _compare_examples,
+        "first paragraphs": lambda: (_forget(), _first_paragraphs()),
+        "code blocks, scan": lambda: (_forget("code_blocks.json"), _scrape()),
+        "code blocks, cached": lambda: (_forget(), _scrape()),
+        "example docs, generate": lambda: (_forget("docs.json"), _docs()),
+        "example docs, unchanged": _docs,
+        "run examples, fake docker": lambda: (_forget("results"), _run()),
+    }
+
+
+def _time(phase: Callable[[], None], repeat: int) -> float:
+    """The fastest of repeat runs, with everything the harness prints discarded."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            phase()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@click.command()
+@click.option("--examples", multiple=True, type=int, default=[50, 200], show_default=True)
+@click.option("--specs", default=3, show_default=True, help="Specs each example is implemented for")
+@click.option("--languages", default=3, show_default=True, help="Languages each example is implemented in")
+@click.option("--interactions", default=200, show_default=True, help="Interactions in each pact")
+@click.option("--repeat", default=3, show_default=True, help="Runs of each, the fastest is reported")
+@click.option("--tolerance", default=1.5, show_default=True, help="How many times slower than the baseline to allow")
+@click.option("--check", is_flag=True, help="Fail if any phase is slower than the baseline allows")
+@click.option("--update-baseline", is_flag=True, help=f"Save the times to {BASELINE_PATH.relative_to(ROOT_PATH)}")
+def main(examples, specs, languages, interactions, repeat, tolerance, check, update_baseline):
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Harness phases over synthetic repos{bcolors.ENDC}")
+    spec_names = [f"v{x + 2}" for x in range(specs)]
+    language_names = [f"lang{x}" for x in range(languages)]
+
+    try:
+        baseline = json.loads(BASELINE_PATH.read_text())
+    except (OSError, ValueError):
+        baseline = {}
+    print(f"Baseline made with: {baseline.get('machine', 'no baseline')}")
+
+    times = {}
+    regressions = []
+    for num_examples in examples:
+        size = f"{num_examples} examples, {specs} specs, {languages} languages, {interactions} interactions"
+        print(f"{bcolors.OKBLUE}{size}{bcolors.ENDC}")
+        print(f"{'phase':>30} {'time':>10} {'baseline':>10} {'ratio':>7}")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root_path = pathlib.Path(tmp_dir)
+            _synthetic_repo(root_path, num_examples, spec_names, language_names, interactions)
+            times[size] = {}
+            for name, phase in _phases(root_path, language_names, spec_names).items():
+                elapsed = _time(phase, repeat)
+                times[size][name] = round(elapsed, 4)
+                expected = baseline.get("times", {}).get(size, {}).get(name)
+                if expected:
+                    ratio = elapsed / expected
+                    line = f"{name:>30} {elapsed:>9.4f}s {expected:>9.4f}s {ratio:>6.2f}x"
+                    if ratio > tolerance:
+                        regressions.append(f"{size}: {name}")
+                        line = f"{bcolors.FAIL}{line}{bcolors.ENDC}"
+                    print(line)
+                else:
+                    print(f"{name:>30} {elapsed:>9.4f}s {'-':>10} {'-':>7}")
+            _load_manifest.cache_clear()
+
+    if update_baseline:
+        machine = f"{platform.python_implementation()} {platform.python_version()}, {platform.machine()}"
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps({"machine": machine, "times": times}, indent=2) + "\n")
+        print(f"{bcolors.OKGREEN}Baseline saved to {BASELINE_PATH}{bcolors.ENDC}")
+
+    if regressions:
+        print(f"{bcolors.FAIL}Slower than {tolerance}x the baseline: {regressions}{bcolors.ENDC}")
+        if check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
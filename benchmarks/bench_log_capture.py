@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# Compare the memory used to capture the output of a chatty example, e.g. one with the pact mock service's debug logs,
+# between streaming it to a log file while keeping only the last lines, and the previous approach of holding all of it
+# in memory and decoding it once the example has finished. The tail kept is checked to be the end of the full output.
+#
+# Run with e.g.: benchmarks/bench_log_capture.py --megabytes 10 --megabytes 200
+
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_PATH.joinpath("scripts")))
+
+from log_capture import _capture_output  # noqa: E402
+from shared import bcolors  # noqa: E402
+
+# Docker streams output in chunks of around this size
+CHUNK_SIZE = 32 * 1024
+
+LINE = b"D, [2023-01-01T00:00:00.000000 #1] DEBUG -- : Received request GET /species/Polar?id=%d HTTP/1.1\r\n"
+
+
+def _chunks(megabytes: int):
+    """Synthetic output of about megabytes, split into chunks regardless of where lines end."""
+    total = megabytes * 1024 * 1024
+    buffer = b""
+    idx = 0
+    sent = 0
+    while sent < total:
+        while len(buffer) < CHUNK_SIZE:
+            buffer += LINE % idx
+            idx += 1
+        yield buffer[:CHUNK_SIZE]
+        sent += CHUNK_SIZE
+        buffer = buffer[CHUNK_SIZE:]
+
+
+def _in_memory(megabytes: int) -> list[str]:
+    """The capture as it was previously done, all of the output then decoded once finished."""
+    output = b"".join(_chunks(megabytes))
+    return output.decode("unicode_escape").splitlines()
+
+
+def _measure(capture) -> tuple[float, int, list[str]]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    lines = capture()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, lines
+
+
+@click.command()
+@click.option("--megabytes", multiple=True, type=int, default=[10, 50], show_default=True)
+@click.option("--tail-lines", default=100, show_default=True)
+def main(megabytes, tail_lines):
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Capturing example output: in memory vs streamed to a log file{bcolors.ENDC}")
+    print(f"{'output':>8} {'in memory':>20} {'streamed':>20}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = pathlib.Path(tmp_dir).joinpath("example.log")
+        for size in megabytes:
+            memory_time, memory_peak, memory_lines = _measure(lambda: _in_memory(size))
+            streamed_time, streamed_peak, tail = _measure(lambda: _capture_output(_chunks(size), log_path, tail_lines))
+            if tail != memory_lines[-tail_lines:]:
+                print(f"{bcolors.FAIL}The tail kept differs from the end of the output{bcolors.ENDC}")
+                sys.exit(1)
+            if log_path.stat().st_size != sum(len(x) for x in _chunks(size)):
+                print(f"{bcolors.FAIL}The log file doesn't have all of the output{bcolors.ENDC}")
+                sys.exit(1)
+            print(
+                f"{size:>6}MB {memory_time:>8.2f}s {memory_peak / 1024 / 1024:>8.1f}MB "
+                f"{streamed_time:>8.2f}s {streamed_peak / 1024 / 1024:>8.1f}MB"
+            )
+    print(
+        f"{bcolors.OKGREEN}The tail kept matches the end of the output, and the log files have all of it{bcolors.ENDC}"
+    )
+
+
+if __name__ == "__main__":
+    main()
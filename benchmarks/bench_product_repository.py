@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# Compare the ProductRepository of the Python SNS example against the plain dict it used to be, at 100k+ products:
+# storing them one at a time and in batches, finding them by type and by version, and taking snapshots of every product
+# while products are still being stored. The products found are checked to be the same either way.
+#
+# Run with e.g.: benchmarks/bench_product_repository.py --products 100000 --products 500000
+
+import asyncio
+import pathlib
+import sys
+import time
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_PATH.joinpath("scripts")))
+sys.path.insert(
+    0, str(ROOT_PATH.joinpath("suites/consumer-features/example-consumer-sns/v3/example-consumer-sns-python"))
+)
+
+from shared import bcolors  # noqa: E402
+from src.product.product import Product  # noqa: E402
+from src.product.product_repository import ProductRepository  # noqa: E402
+
+TYPES = 1000
+VERSIONS = 5
+
+
+class DictRepository:
+    """The repository as it was, a dict, which is scanned to find products by type or version, and copied for a
+    snapshot of it."""
+
+    def __init__(self):
+        # Starting with the same products
+        self.products = dict(ProductRepository.__wrapped__().products)
+
+    async def fetch_all(self):
+        return dict(self.products)
+
+    async def find_by_type(self, type):
+        return [x for x in self.products.values() if x.type == type]
+
+    async def find_by_version(self, version):
+        return [x for x in self.products.values() if x.version == version]
+
+    async def insert(self, product):
+        self.products[product.id] = product
+        return product
+
+    async def bulk_upsert(self, products):
+        for product in products:
+            self.products[product.id] = product
+        return products
+
+
+def _products(count: int) -> list[Product]:
+    return [
+        Product(f"product-{idx}", f"Product {idx}", f"type-{idx % TYPES}", f"v{idx % VERSIONS}") for idx in range(count)
+    ]
+
+
+async def _phases(repository, products: list[Product], batch_size: int, lookups: int, snapshots: int) -> tuple:
+    """How long each phase took, and what was found, so it can be checked to be the same for each repository."""
+    times = {}
+
+    start = time.perf_counter()
+    await asyncio.gather(*(repository.insert(x) for x in products))
+    times["insert one at a time"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for idx in range(0, len(products), batch_size):
+        await repository.bulk_upsert(products[idx : idx + batch_size])
+    times[f"bulk upsert, {batch_size} at a time"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = []
+    for idx in range(lookups):
+        found.append(sorted(x.id for x in await repository.find_by_type(f"type-{idx % TYPES}")))
+    times[f"{lookups} finds by type"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for idx in range(lookups):
+        found.append(sorted(x.id for x in await repository.find_by_version(f"v{idx % VERSIONS}")))
+    times[f"{lookups} finds by version"] = time.perf_counter() - start
+
+    # Snapshots handed out while updates still arrive, a change after every tenth
+    start = time.perf_counter()
+    for idx in range(snapshots):
+        found.append(len(await repository.fetch_all()))
+        if idx % 10 == 9:
+            await repository.insert(Product(f"snapshot-{idx}", "Snapshot", "type-snapshot", "v1"))
+    times[f"{snapshots} snapshots, 1 in 10 then a change"] = time.perf_counter() - start
+
+    return times, found
+
+
+@click.command()
+@click.option("--products", multiple=True, type=int, default=[100_000, 200_000], show_default=True)
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--lookups", default=100, show_default=True)
+@click.option("--snapshots", default=100, show_default=True)
+def main(products, batch_size, lookups, snapshots):
+    print(f"{bcolors.HEADER}{bcolors.BOLD}ProductRepository: indexed vs a plain dict{bcolors.ENDC}")
+    for count in products:
+        items = _products(count)
+        dict_times, dict_found = asyncio.run(_phases(DictRepository(), items, batch_size, lookups, snapshots))
+        # A repository of its own, rather than the one shared by the service
+        repository = ProductRepository.__wrapped__()
+        indexed_times, indexed_found = asyncio.run(_phases(repository, items, batch_size, lookups, snapshots))
+
+        print(f"\n{bcolors.OKBLUE}{count} products{bcolors.ENDC}")
+        print(f"{'':<40} {'dict':>10} {'indexed':>10}")
+        for phase in dict_times:
+            print(f"{phase:<40} {dict_times[phase]:>9.3f}s {indexed_times[phase]:>9.3f}s")
+        if dict_found != indexed_found:
+            print(f"{bcolors.FAIL}The products found differ between the repositories{bcolors.ENDC}")
+            sys.exit(1)
+    print(f"\n{bcolors.OKGREEN}The products found are the same for both repositories{bcolors.ENDC}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Check how long run_examples.py takes to start, using `--list` so neither Docker nor any examples are needed. The
+# modules which are only needed to run examples or report their results must not be imported by `--list`, and the
+# import time of run_examples.py must stay within a budget.
+#
+# Run with e.g.: benchmarks/bench_startup.py --max-import-ms 250
+
+import pathlib
+import re
+import subprocess
+import sys
+import time
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_PATH.joinpath("scripts")))
+
+from shared import bcolors  # noqa: E402
+
+# Only needed when examples are run, or their results are reported
+LAZY_MODULES = ["docker", "tabulate", "requests", "markdown", "bs4", "deepdiff", "first_paragraph"]
+
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _import_times(stderr: str) -> dict[str, tuple[int, int]]:
+    """The self and cumulative import time of each top level package, in microseconds, from -X importtime."""
+    times = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def _run(args: list[str], cwd: pathlib.Path) -> tuple[float, str]:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=cwd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        print(f"{bcolors.FAIL}{' '.join(args)} failed:\n{result.stderr}{bcolors.ENDC}")
+        sys.exit(1)
+    return elapsed, result.stderr
+
+
+def _fastest(args: list[str], cwd: pathlib.Path, repeat: int) -> tuple[float, str]:
+    return min([_run(args, cwd) for _ in range(repeat)], key=lambda x: x[0])
+
+
+@click.command()
+@click.option("--suite", default="specs", show_default=True, help="The suite to list")
+@click.option("--repeat", default=5, show_default=True, help="Runs, the fastest is reported")
+@click.option("--slowest", default=10, show_default=True, help="How many of the slowest imports to show")
+@click.option("--max-import-ms", default=250, show_default=True, help="Fail if importing run_examples takes longer")
+def main(suite, repeat, slowest, max_import_ms):
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Startup of run_examples.py --list{bcolors.ENDC}")
+
+    elapsed, stderr = _fastest(["scripts/run_examples.py", "--list", "--suite", suite], ROOT_PATH, repeat)
+    times = _import_times(stderr)
+
+    imported = [x for x in LAZY_MODULES if x in times]
+    if imported:
+        print(f"{bcolors.FAIL}Imported by --list, but only needed to run examples: {', '.join(imported)}{bcolors.ENDC}")
+        sys.exit(1)
+    print(f"{bcolors.OKGREEN}None of {', '.join(LAZY_MODULES)} were imported{bcolors.ENDC}")
+
+    print(f"{'module':>32} {'self':>9} {'cumulative':>11}")
+    for name, (own, cumulative) in sorted(times.items(), key=lambda x: x[1][0], reverse=True)[:slowest]:
+        print(f"{name:>32} {own / 1000:>7.1f}ms {cumulative / 1000:>9.1f}ms")
+
+    # Run as a script it's never imported itself, so its import time is found separately
+    _, stderr = _fastest(["-c", "import run_examples"], ROOT_PATH.joinpath("scripts"), repeat)
+    import_ms = _import_times(stderr)["run_examples"][1] / 1000
+    print(f"{'import run_examples':>32} {import_ms:>9.1f}ms")
+    print(f"{'--list wall clock':>32} {elapsed * 1000:>9.1f}ms")
+    if import_ms > max_import_ms:
+        print(f"{bcolors.FAIL}Importing run_examples took longer than {max_import_ms}ms{bcolors.ENDC}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,48 +2,199 @@
 
 # Generally, this will be run via a "make build" which in turn calls wrapper script build.sh
 
+import collections
+import concurrent.futures
+import hashlib
+import json
 import os
 import pathlib
 import subprocess
 import textwrap
 from pathlib import Path
+from typing import NamedTuple, Optional
 
+import click
 from tabulate import tabulate
 
 from shared import LanguagesAndSpecs, RESULT, _get_languages_and_specs, bcolors
 
 
-def _build_image(language: str, spec: str, dockerfile: Path):
-    print(
-        f"\n{bcolors.HEADER} - Attempting to build {dockerfile=} for {bcolors.OKBLUE}{language=}{bcolors.HEADER}, {bcolors.OKBLUE}{spec=}{bcolors.ENDC}"
-    )
-    command = ["docker", "build", ".", "-t", f"pact-examples-{language}-{spec}"]
-    print(" ".join(command))
-    p = subprocess.run(command, cwd=str(dockerfile.parent))
+# Label stamped on each image with the hash of the context it was built from, so unchanged images can be skipped
+CONTEXT_HASH_LABEL = "pact-examples.context-hash"
+
+
+class ImageToBuild(NamedTuple):
+    language: str
+    spec: str
+    dockerfile: Path
+
+    @property
+    def tag(self) -> str:
+        return f"pact-examples-{self.language}-{self.spec}"
+
 
-    colour = bcolors.OKGREEN if p.returncode == 0 else bcolors.FAIL
-    print(f"{colour} - Result: {RESULT[p.returncode]}{bcolors.ENDC}")
-    return p.returncode
+def _hash_context(context: Path) -> str:
+    """Hash every file in a build context, by relative name and content, so identical contexts give the same hash."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(context):
+        # Walk in a stable order, so the hash only changes if the context does
+        dirs.sort()
+        for _file in sorted(files):
+            file_path = Path(root).joinpath(_file)
+            digest.update(str(file_path.relative_to(context)).encode())
+            digest.update(b"\0")
+            digest.update(file_path.read_bytes())
+            digest.update(b"\0")
+    return digest.hexdigest()
 
 
-def _build_images(languages_path: pathlib.Path, languages_and_specs: LanguagesAndSpecs) -> list[list[str]]:
+def _image_context_hash(tag: str) -> Optional[str]:
+    """The context hash label of an existing image, or None if there is no such image or it has no label."""
+    command = ["docker", "image", "inspect", "--format", f'{{{{ index .Config.Labels "{CONTEXT_HASH_LABEL}" }}}}', tag]
+    p = subprocess.run(command, capture_output=True, text=True)
+    if p.returncode != 0:
+        return None
+    return p.stdout.strip() or None
+
+
+def _build_image(context_hash: str, images: list[ImageToBuild], force: bool = False) -> int:
+    """Build images which share an identical context once, tagging the result for each of them.
+
+    If an image for one of them was already built from this context it is reused, unless force is set.
+    """
+    tags = [image.tag for image in images]
+    dockerfile = images[0].dockerfile
+    print(
+        f"\n{bcolors.HEADER} - Attempting to build {dockerfile=} for {bcolors.OKBLUE}{tags=}{bcolors.HEADER}, "
+        f"{bcolors.OKBLUE}{context_hash=}{bcolors.ENDC}"
+    )
+
+    up_to_date = [] if force else [tag for tag in tags if _image_context_hash(tag) == context_hash]
+    if up_to_date:
+        print(f"{bcolors.OKCYAN} - Unchanged since last build: {up_to_date=}{bcolors.ENDC}")
+        returncode = 0
+        for tag in tags:
+            if tag not in up_to_date:
+                command = ["docker", "tag", up_to_date[0], tag]
+                print(" ".join(command))
+                returncode = returncode or subprocess.run(command).returncode
+    else:
+        command = ["docker", "build", ".", "--label", f"{CONTEXT_HASH_LABEL}={context_hash}"]
+        for tag in tags:
+            command.extend(["-t", tag])
+        print(" ".join(command))
+        returncode = subprocess.run(command, cwd=str(dockerfile.parent)).returncode
+
+    colour = bcolors.OKGREEN if returncode == 0 else bcolors.FAIL
+    print(f"{colour} - Result for {tags=}: {RESULT[min(returncode, 1)]}{bcolors.ENDC}")
+    return returncode
+
+
+def _build_images(
+    languages_path: pathlib.Path,
+    languages_and_specs: LanguagesAndSpecs,
+    jobs: int = 2,
+    force: bool = False,
+    tags: Optional[set[str]] = None,
+    built: Optional[dict[tuple[str, str], int]] = None,
+) -> dict[tuple[str, str], int]:
+    """Build every image with a Dockerfile, or only those in tags, returning the result for each (language, spec).
+
+    :param built: Results of images already built elsewhere, e.g. by each shard of a run, which aren't built again
+    """
+    built = built or {}
+    images = []
+    for language in languages_and_specs.languages:
+        for spec in languages_and_specs.specs:
+            dockerfile = languages_path.joinpath(language).joinpath(spec).joinpath("Dockerfile")
+            if dockerfile.is_file() and (language, spec) not in built:
+                images.append(ImageToBuild(language=language, spec=spec, dockerfile=dockerfile))
+    if tags is not None:
+        images = [image for image in images if image.tag in tags]
+
+    # Group together any images with identical contexts, e.g. the same Dockerfile for two specs, to only build once
+    images_by_context_hash = collections.defaultdict(list)
+    for image in images:
+        images_by_context_hash[_hash_context(image.dockerfile.parent)].append(image)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            context_hash: executor.submit(_build_image, context_hash, images_to_build, force)
+            for context_hash, images_to_build in images_by_context_hash.items()
+        }
+    return {
+        **built,
+        **{
+            (image.language, image.spec): futures[context_hash].result()
+            for context_hash, images_to_build in images_by_context_hash.items()
+            for image in images_to_build
+        },
+    }
+
+
+def _write_build_results(path: pathlib.Path, results: dict[tuple[str, str], int]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump([{"language": x, "spec": y, "returncode": z} for (x, y), z in sorted(results.items())], f, indent=2)
+
+
+def _read_build_results(paths: list[pathlib.Path]) -> dict[tuple[str, str], int]:
+    """The results written by builds elsewhere, e.g. each shard of a run. Any file which doesn't exist is skipped."""
+    results = {}
+    for path in paths:
+        if not path.is_file():
+            print(f"{bcolors.WARNING}No build results found at {path}, its images are built here{bcolors.ENDC}")
+            continue
+        with open(path) as f:
+            for result in json.load(f):
+                # An image which failed to build anywhere is reported as an error
+                key = (result["language"], result["spec"])
+                if not results.get(key):
+                    results[key] = result["returncode"]
+    return results
+
+
+def _results_matrix(languages_and_specs: LanguagesAndSpecs, results: dict[tuple[str, str], int]) -> list[list[str]]:
     header = ["Language"]
     header.extend(languages_and_specs.specs)
     matrix = [header]
     for language in languages_and_specs.languages:
         spec_results = [f"**{language}**"]
         for spec in languages_and_specs.specs:
-            dockerfile = languages_path.joinpath(language).joinpath(spec).joinpath("Dockerfile")
-            if dockerfile.is_file():
-                result = _build_image(language=language, spec=spec, dockerfile=dockerfile)
-                spec_results.append("✅ Yes" if result == 0 else "❌ Error")
+            if (language, spec) in results:
+                spec_results.append("✅ Yes" if results[(language, spec)] == 0 else "❌ Error")
             else:
                 spec_results.append("-")
         matrix.append(spec_results)
     return matrix
 
 
-if __name__ == "__main__":
+@click.command()
+@click.option(
+    "--jobs", default=2, show_default=True, type=click.IntRange(min=1), help="How many images to build at once"
+)
+@click.option("--force", is_flag=True, help="Build every image, even if its context is unchanged since the last build")
+@click.option(
+    "--image",
+    multiple=True,
+    help="Only build this image e.g. pact-examples-python-v3, multiple may be provided. output/build.md isn't written, "
+    "as it would only show some of the images",
+)
+@click.option(
+    "--results-file",
+    default=".cache/report/build.json",
+    show_default=True,
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="Where to write the result of each image built, relative to the root, e.g. for --merge",
+)
+@click.option(
+    "--merge",
+    multiple=True,
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="Take the results of the images in the --results-file written by each shard of a run, multiple may be "
+    "provided, and only build those images not already built by any of them before writing output/build.md",
+)
+def main(jobs, force, image, results_file, merge):
     print(f"{bcolors.HEADER}{bcolors.BOLD}Identifying and building available Docker images{bcolors.ENDC}")
     root_path = pathlib.Path.cwd().parent if pathlib.Path.cwd().name == "scripts" else pathlib.Path.cwd()
     languages_path = root_path.joinpath("languages")
@@ -51,8 +202,16 @@ if __name__ == "__main__":
     languages_and_specs = _get_languages_and_specs(languages_path)
     print(f"Found: {languages_and_specs=}")
 
+    if image:
+        print(f"Attempt to build only {image=}")
+        built = _build_images(languages_path, languages_and_specs, jobs=jobs, force=force, tags=set(image))
+        _write_build_results(root_path.joinpath(results_file), built)
+        return
+
     print("Attempt to build all available, and create a table of all permutations")
-    languages_and_specs_table = _build_images(languages_path, languages_and_specs)
+    built = _build_images(languages_path, languages_and_specs, jobs=jobs, force=force, built=_read_build_results(merge))
+    _write_build_results(root_path.joinpath(results_file), built)
+    languages_and_specs_table = _results_matrix(languages_and_specs, built)
 
     details = textwrap.dedent(
         """\
@@ -84,3 +243,7 @@ if __name__ == "__main__":
         f.write(details)
         f.write(results)
         f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,4 @@
 
 # Generally, this will be run via a "make build"
 
-scripts/build.py
+scripts/build.py --jobs "${BUILD_JOBS:-2}" "$@"
@@ -0,0 +1,158 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import re
+import threading
+from typing import NamedTuple, Optional
+
+from shared import _write_atomically, bcolors
+
+# Bump if how files are scanned changes, so old cached scans are never used
+CODE_BLOCKS_CACHE_VERSION = 1
+
+EXTENSIONS = {"py", "js", "ts"}
+EXCLUDED_DIRS = {"node_modules"}
+
+PATTERN_START = re.compile(r"(#|//)\s+Pact annotated code block - (.*)")
+PATTERN_END = re.compile(r"(#|//)\s+End Pact annotated code block")
+
+
+class UnterminatedBlock(NamedTuple):
+    name: str
+    # 1-based line number of the start of the block
+    line: int
+
+
+class ScannedFile(NamedTuple):
+    # Block name to the code between its start and end comments, in the order they appear
+    blocks: dict[str, str]
+    unterminated: list[UnterminatedBlock]
+
+
+def _lines(text: str):
+    """The lines of text with their newlines, treating \r\n and \r as \n like reading the file in text mode does."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        end = len(text) if end == -1 else end + 1
+        yield text[start:end]
+        start = end
+
+
+def _scan_lines(lines) -> ScannedFile:
+    """Extract every annotated code block from lines of text, in a single pass.
+
+    A block runs from the end of its start comment up to the start of the next end comment, so each block's code is
+    exactly what was between the two comments, including the newline after the start comment and any indentation before
+    the end comment. Blocks may be nested or overlap, in which case they all end at the next end comment.
+    """
+    blocks = {}
+    # Lines since the earliest block still open was started, shared by all the open blocks
+    buffer: list[str] = []
+    # Blocks started but not yet ended, by name, with the rest of their start line and where their code starts in buffer.
+    # If a block with the same name is started again before it is ended, the later one is kept as it would overwrite it
+    open_blocks: dict[str, tuple[int, int, str]] = {}
+
+    for number, line in enumerate(lines, start=1):
+        end = PATTERN_END.search(line)
+        if end and open_blocks:
+            buffer.append(line[: end.start()])
+            for name, (_, index, head) in open_blocks.items():
+                blocks[name] = head + "".join(buffer[index:])
+            buffer, open_blocks = [], {}
+            continue
+
+        if open_blocks:
+            buffer.append(line)
+
+        start = PATTERN_START.search(line)
+        if start:
+            open_blocks.pop(start.group(2), None)
+            # The name runs to the end of the line, so the block starts with the newline after it
+            open_blocks[start.group(2)] = (number, len(buffer), line[start.end() :])
+
+    return ScannedFile(
+        blocks=blocks,
+        unterminated=[UnterminatedBlock(name=name, line=line) for name, (line, _, _) in open_blocks.items()],
+    )
+
+
+def _source_files(path: pathlib.Path) -> list[pathlib.Path]:
+    """Every file in path which could contain annotated code blocks, in a stable order."""
+    source_files = []
+    for root, dirs, files in os.walk(path):
+        # Don't look for e.g. .ts files under the excluded dir node_modules
+        dirs[:] = sorted(x for x in dirs if x not in EXCLUDED_DIRS)
+        source_files.extend(pathlib.Path(root).joinpath(x) for x in sorted(files) if x.split(".")[-1] in EXTENSIONS)
+    return source_files
+
+
+class CodeBlockScanner:
+    """Scans files for annotated code blocks, caching the results by file content so unchanged files aren't scanned.
+
+    :param cache_path: File to load and save the scans to, or None to only cache them in memory
+    """
+
+    def __init__(self, cache_path: Optional[pathlib.Path] = None):
+        self.cache_path = cache_path
+        self._scans: dict[str, ScannedFile] = {}
+        self._changed = False
+        self._lock = threading.Lock()
+        if cache_path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+            if data.get("version") == CODE_BLOCKS_CACHE_VERSION:
+                self._scans = {
+                    content_hash: ScannedFile(
+                        blocks=scan["blocks"], unterminated=[UnterminatedBlock(*x) for x in scan["unterminated"]]
+                    )
+                    for content_hash, scan in data["scans"].items()
+                }
+        except (OSError, ValueError, KeyError, TypeError):
+            self._scans = {}
+
+    def save(self):
+        """Save the scans, if any files were scanned, so they can be reused by the next run."""
+        if not self.cache_path or not self._changed:
+            return
+        data = {
+            "version": CODE_BLOCKS_CACHE_VERSION,
+            "scans": {content_hash: scan._asdict() for content_hash, scan in self._scans.items()},
+        }
+        try:
+            _write_atomically(self.cache_path, json.dumps(data))
+            self._changed = False
+        except OSError as ex:
+            print(f"{bcolors.WARNING}Unable to save scanned code blocks to {self.cache_path}: {ex}{bcolors.ENDC}")
+
+    def scan(self, path: pathlib.Path) -> ScannedFile:
+        content = path.read_bytes()
+        content_hash = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            scanned = self._scans.get(content_hash)
+        if scanned is None:
+            scanned = _scan_lines(_lines(content.decode()))
+            with self._lock:
+                self._scans[content_hash] = scanned
+                self._changed = True
+        return scanned
+
+    def scan_all(self, paths: list[pathlib.Path], jobs: int = 8) -> dict[pathlib.Path, ScannedFile]:
+        """Scan every file, several at once, reporting any blocks which are never ended."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="scan") as executor:
+            scans = dict(zip(paths, executor.map(self.scan, paths)))
+
+        for path, scanned in scans.items():
+            for block in scanned.unterminated:
+                print(
+                    f"{bcolors.WARNING}Pact annotated code block {block.name!r} started at {path}:{block.line} is never "
+                    f"ended, it is ignored{bcolors.ENDC}"
+                )
+        return scans
@@ -0,0 +1,204 @@
+import collections
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+from typing import NamedTuple, Optional
+
+from lifecycle import _new_workspace_root, _owner_labels
+from log_capture import _capture_output
+from shared import bcolors
+from tracing import span
+
+# Where the pool's workspace root is mounted inside every container
+WORKSPACES_MOUNT = "/workspaces"
+
+# Local leftovers which shouldn't be copied into a workspace, the image provides e.g. node_modules
+IGNORED_WHEN_COPYING = shutil.ignore_patterns("node_modules", "output", "logs", ".pytest_cache", "__pycache__")
+
+
+class ExampleRun(NamedTuple):
+    exit_code: int
+    # The last lines output by the example, all of which are in the log file
+    tail: list[str]
+    log_path: pathlib.Path
+    # Host path of the copy of the example which was run, to be removed once finished with
+    workspace: pathlib.Path
+    # Host path of the example's output dir, where any pacts generated will be found under pacts/
+    output_dir: pathlib.Path
+    # If the example didn't finish in time, and its container was killed
+    timed_out: bool = False
+
+
+class PooledContainer:
+    def __init__(self, image: str, container):
+        self.image = image
+        self.container = container
+        self.uses = 0
+
+
+class ContainerPool:
+    """Long-lived containers for each pact-examples-{language}-{spec} image, which examples are exec'd into.
+
+    Rather than paying for a new container (and everything that starts inside it) for every example, each example is
+    copied into a fresh working directory under a shared workspace root, which is mounted into every container. A
+    container is only used by one example at a time, and is recycled after max_uses, or as soon as an example fails in
+    it, in case it has been left in a bad state e.g. with a mock service still holding onto its port.
+
+    Every container is labelled as started by this process, and the workspace root is marked the same way, so anything
+    left behind if the process is killed can be found and removed by a later run.
+    """
+
+    def __init__(self, client, max_uses: int = 10):
+        self.client = client
+        self.max_uses = max_uses
+        self.workspace_root = _new_workspace_root()
+        self._idle: dict[str, list[PooledContainer]] = collections.defaultdict(list)
+        self._all: list[PooledContainer] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start(self, image: str) -> PooledContainer:
+        print(f"{bcolors.OKCYAN}Starting a pooled container for {image=}{bcolors.ENDC}")
+        with span("container create", image=image):
+            container = self.client.containers.run(
+                image=image,
+                # Keep the container alive, examples are run in it via exec
+                command="sleep infinity",
+                # So we don't get mixed up perms and have files we can't delete, use the current uid
+                user=os.getuid(),
+                volumes={str(self.workspace_root): {"bind": WORKSPACES_MOUNT, "mode": "rw"}},
+                labels=_owner_labels(),
+                tty=True,
+                detach=True,
+            )
+        pooled = PooledContainer(image=image, container=container)
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._all.append(pooled)
+        if closed:
+            # Closed while this container was starting, e.g. on Ctrl-C, so it would never be removed
+            container.remove(force=True)
+            raise RuntimeError("The container pool has been closed")
+        return pooled
+
+    def _discard(self, pooled: PooledContainer):
+        with self._lock:
+            if pooled in self._all:
+                self._all.remove(pooled)
+        with span("container remove", image=pooled.image):
+            pooled.container.remove(force=True)
+
+    def acquire(self, image: str) -> PooledContainer:
+        """Lease a container for image, starting a new one if there are none idle."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The container pool has been closed")
+            if self._idle[image]:
+                return self._idle[image].pop()
+        return self._start(image)
+
+    def release(self, pooled: PooledContainer, healthy: bool):
+        """Return a leased container to the pool, or discard it if it failed or has been used enough."""
+        pooled.uses += 1
+        with self._lock:
+            if self._closed:
+                # Already removed by close
+                return
+        if not healthy or pooled.uses >= self.max_uses:
+            print(
+                f"{bcolors.OKCYAN}Recycling pooled container for {pooled.image}, after {pooled.uses} use(s){bcolors.ENDC}"
+            )
+            self._discard(pooled)
+            return
+        with self._lock:
+            self._idle[pooled.image].append(pooled)
+
+    def _kill(self, pooled: PooledContainer, timeout: float, timed_out: threading.Event):
+        """Kill a container whose example didn't finish in time, it's removed rather than reused once released."""
+        timed_out.set()
+        print(f"{bcolors.WARNING}Killing pooled container for {pooled.image}, after {timeout}s{bcolors.ENDC}")
+        try:
+            pooled.container.kill()
+        except Exception as ex:
+            print(f"{bcolors.WARNING}Unable to kill pooled container for {pooled.image}: {ex}{bcolors.ENDC}")
+
+    def new_workspace(self, example_dir: pathlib.Path) -> pathlib.Path:
+        """Copy an example into a fresh working directory under the workspace root."""
+        with span("workspace copy"):
+            workspace = pathlib.Path(tempfile.mkdtemp(prefix=f"{example_dir.name}-", dir=self.workspace_root))
+            shutil.copytree(example_dir, workspace.joinpath("example"), symlinks=True, ignore=IGNORED_WHEN_COPYING)
+            workspace.joinpath("example").joinpath("output").mkdir()
+            return workspace
+
+    def run(
+        self,
+        image: str,
+        example_dir: pathlib.Path,
+        log_path: pathlib.Path,
+        tail_lines: int = 100,
+        timeout: Optional[float] = None,
+        command: str = "make test",
+    ) -> ExampleRun:
+        """Run command for the example in a pooled container for image.
+
+        The output is written to log_path as the command runs, rather than being held in memory until it exits, and
+        only the last tail_lines lines of it are kept. If the command is still running after timeout seconds, the
+        container is killed, which ends the command, and the run is marked as timed out.
+
+        :raises docker.errors.ImageNotFound: If the image has not been built
+        """
+        workspace = self.new_workspace(example_dir)
+        workdir = f"{WORKSPACES_MOUNT}/{workspace.name}/example"
+
+        try:
+            pooled = self.acquire(image)
+            exit_code = None
+            timed_out = threading.Event()
+            watchdog = threading.Timer(timeout, self._kill, args=(pooled, timeout, timed_out)) if timeout else None
+            try:
+                with span("container wait", image=image):
+                    exec_id = self.client.api.exec_create(
+                        pooled.container.id, ["sh", "-c", command], workdir=workdir, user=str(os.getuid()), tty=True
+                    )["Id"]
+                    if watchdog:
+                        watchdog.start()
+                    tail = _capture_output(self.client.api.exec_start(exec_id, stream=True), log_path, tail_lines)
+                    exit_code = self.client.api.exec_inspect(exec_id)["ExitCode"]
+            finally:
+                if watchdog:
+                    # Stopped before deciding whether the container is healthy, waiting for it if it has already fired,
+                    # so a container killed just as the command exited is never reused
+                    watchdog.cancel()
+                    if watchdog.is_alive():
+                        watchdog.join()
+                self.release(pooled, healthy=exit_code == 0 and not timed_out.is_set())
+        except BaseException:
+            # Including on Ctrl-C, as the workspace is only handed back once the example has run
+            shutil.rmtree(workspace, ignore_errors=True)
+            raise
+
+        return ExampleRun(
+            exit_code=exit_code,
+            tail=tail,
+            log_path=log_path,
+            workspace=workspace,
+            output_dir=workspace.joinpath("example").joinpath("output"),
+            timed_out=timed_out.is_set(),
+        )
+
+    def close(self):
+        """Remove every container started by the pool, and the workspaces, including any still in use."""
+        with self._lock:
+            self._closed = True
+            pooled_containers = list(self._all)
+            self._idle.clear()
+        for pooled in pooled_containers:
+            # Carry on removing the others if one can't be, a later run will remove it from its labels
+            try:
+                self._discard(pooled)
+            except Exception as ex:
+                print(f"{bcolors.WARNING}Unable to remove pooled container for {pooled.image}: {ex}{bcolors.ENDC}")
+        shutil.rmtree(self.workspace_root, ignore_errors=True)
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import pathlib
+from typing import Optional
+
+from shared import _write_atomically, bcolors
+
+# Bump if how docs are generated changes, so every doc is generated again
+DOCS_FORMAT_VERSION = 1
+
+
+def _hash_inputs(*inputs) -> str:
+    """A hash of everything a generated doc depends on, which must all be JSON serialisable."""
+    text = json.dumps([DOCS_FORMAT_VERSION, *inputs], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class DocsCache:
+    """What each generated doc was generated from, so a doc is only generated again when its inputs change.
+
+    For each doc the hash of its inputs and of what was written is kept, so a doc which was changed or removed since it
+    was written is also generated again.
+    """
+
+    def __init__(self, cache_path: pathlib.Path):
+        self.cache_path = cache_path
+        self._changed = False
+        try:
+            with open(cache_path) as f:
+                data = json.load(f)
+            self._docs: dict[str, dict] = data["docs"] if data.get("version") == DOCS_FORMAT_VERSION else {}
+        except (OSError, ValueError, KeyError, AttributeError):
+            self._docs = {}
+
+    def is_current(self, output_path: pathlib.Path, inputs_hash: str) -> bool:
+        doc: Optional[dict] = self._docs.get(str(output_path.resolve()))
+        if not doc or doc["inputs"] != inputs_hash:
+            return False
+        try:
+            return _hash_text(output_path.read_text()) == doc["output"]
+        except OSError:
+            return False
+
+    def write(self, output_path: pathlib.Path, inputs_hash: str, text: str):
+        """Write a doc, recording what it was generated from."""
+        _write_atomically(output_path, text)
+        self._docs[str(output_path.resolve())] = {"inputs": inputs_hash, "output": _hash_text(text)}
+        self._changed = True
+
+    def save(self):
+        if not self._changed:
+            return
+        try:
+            _write_atomically(self.cache_path, json.dumps({"version": DOCS_FORMAT_VERSION, "docs": self._docs}))
+            self._changed = False
+        except OSError as ex:
+            print(f"{bcolors.WARNING}Unable to save the generated docs cache to {self.cache_path}: {ex}{bcolors.ENDC}")
@@ -0,0 +1,159 @@
+import hashlib
+import itertools
+import pathlib
+from typing import Callable, NamedTuple, Optional
+
+from docker.errors import ImageNotFound, NotFound
+
+
+class FakeExecResult(NamedTuple):
+    exit_code: int
+    output: bytes
+
+
+def _succeed(container: "FakeContainer", command, workdir: str) -> FakeExecResult:
+    return FakeExecResult(exit_code=0, output=b"")
+
+
+class FakeContainer:
+    """Stands in for a docker.models.containers.Container, enough for the harness to run examples in it."""
+
+    def __init__(self, client: "FakeDockerClient", id: str, image: str, volumes: dict, labels: dict = None):
+        self.client = client
+        self.id = id
+        self.image = image
+        self.volumes = volumes or {}
+        self.labels = labels or {}
+        self.status = "running"
+        self.exec_calls = []
+
+    @property
+    def attrs(self) -> dict:
+        return {"Id": self.id, "Config": {"Image": self.image, "Labels": self.labels}, "State": {"Status": self.status}}
+
+    def host_path(self, container_path: str) -> Optional[pathlib.Path]:
+        """Map a path inside the container back to the host, via the mounted volumes."""
+        for host, bind in self.volumes.items():
+            mount = bind["bind"].rstrip("/")
+            if container_path == mount or container_path.startswith(f"{mount}/"):
+                return pathlib.Path(host).joinpath(container_path[len(mount) :].lstrip("/"))
+        return None
+
+    def exec_run(self, cmd, workdir: str = None, user: str = "", tty: bool = False, **kwargs) -> FakeExecResult:
+        if self.status != "running":
+            raise NotFound(f"Container {self.id} is not running")
+        self.exec_calls.append((cmd, workdir))
+        return self.client.exec_handler(self, cmd, workdir)
+
+    def wait(self, **kwargs) -> dict:
+        self.status = "exited"
+        return {"StatusCode": 0}
+
+    def logs(self, **kwargs) -> bytes:
+        return b""
+
+    def kill(self, **kwargs):
+        self.status = "exited"
+
+    def remove(self, force: bool = False, **kwargs):
+        self.status = "removed"
+        self.client.containers.removed.append(self)
+        self.client.containers.running.pop(self.id, None)
+
+
+class FakeContainers:
+    def __init__(self, client: "FakeDockerClient"):
+        self.client = client
+        self.running: dict[str, FakeContainer] = {}
+        self.removed: list[FakeContainer] = []
+        self.started: list[FakeContainer] = []
+        self._ids = itertools.count(1)
+
+    def run(
+        self, image: str, command=None, volumes: dict = None, labels: dict = None, detach: bool = False, **kwargs
+    ) -> FakeContainer:
+        if image not in self.client.images.names:
+            raise ImageNotFound(f"No such image: {image}")
+        container = FakeContainer(
+            self.client, id=f"fake-{next(self._ids)}", image=image, volumes=volumes, labels=labels
+        )
+        self.running[container.id] = container
+        self.started.append(container)
+        return container
+
+    def get(self, container_id: str) -> FakeContainer:
+        if container_id not in self.running:
+            raise NotFound(f"No such container: {container_id}")
+        return self.running[container_id]
+
+    def list(self, all: bool = False, filters: dict = None, **kwargs) -> list[FakeContainer]:
+        """Containers which haven't been removed, only those running unless all, filtered by label and status."""
+        filters = filters or {}
+        containers = [x for x in self.running.values() if all or x.status == "running"]
+        if "status" in filters:
+            containers = [x for x in containers if x.status == filters["status"]]
+        if "label" in filters:
+            key, _, value = filters["label"].partition("=")
+            containers = [x for x in containers if key in x.labels and (not value or x.labels[key] == value)]
+        return containers
+
+
+class FakeAPIClient:
+    """Stands in for the low level docker.APIClient, for the exec calls used to stream an example's output."""
+
+    # The output is streamed in chunks of this many bytes, so it is split part way through lines as it would be
+    CHUNK_SIZE = 64
+
+    def __init__(self, client: "FakeDockerClient"):
+        self.client = client
+        self.execs: dict[str, dict] = {}
+        self._ids = itertools.count(1)
+
+    def exec_create(self, container, cmd, workdir: str = None, user: str = "", tty: bool = False, **kwargs) -> dict:
+        container = self.client.containers.get(getattr(container, "id", container))
+        exec_id = f"fake-exec-{next(self._ids)}"
+        self.execs[exec_id] = {"container": container, "cmd": cmd, "workdir": workdir, "ExitCode": None}
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id: str, stream: bool = False, **kwargs):
+        _exec = self.execs[exec_id]
+        result = _exec["container"].exec_run(_exec["cmd"], workdir=_exec["workdir"])
+        # Killed while running, as if by SIGKILL
+        _exec["ExitCode"] = result.exit_code if _exec["container"].status == "running" else 137
+        if not stream:
+            return result.output
+        return (result.output[idx : idx + self.CHUNK_SIZE] for idx in range(0, len(result.output), self.CHUNK_SIZE))
+
+    def exec_inspect(self, exec_id: str) -> dict:
+        _exec = self.execs[exec_id]
+        return {"ID": exec_id, "Running": False, "ExitCode": _exec["ExitCode"]}
+
+
+class FakeImage(NamedTuple):
+    id: str
+    tags: list[str]
+
+
+class FakeImages:
+    def __init__(self, names: list[str]):
+        self.names = set(names)
+
+    def get(self, name: str) -> FakeImage:
+        if name not in self.names:
+            raise ImageNotFound(f"No such image: {name}")
+        return FakeImage(id=f"sha256:{hashlib.sha256(name.encode()).hexdigest()}", tags=[f"{name}:latest"])
+
+
+class FakeDockerClient:
+    """A Docker client which doesn't need a Docker daemon, for exercising the harness.
+
+    :param images: Image names which are treated as having been built, any others raise ImageNotFound
+    :param exec_handler: Called for every exec with (container, command, workdir), returning a FakeExecResult. Use
+        container.host_path(workdir) to e.g. write the pacts an example would have generated.
+    """
+
+    def __init__(self, images: list[str], exec_handler: Callable[..., FakeExecResult] = _succeed):
+        self.images = FakeImages(images)
+        self.exec_handler = exec_handler
+        self.containers = FakeContainers(self)
+        self.api = FakeAPIClient(self)
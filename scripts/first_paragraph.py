@@ -0,0 +1,39 @@
+import hashlib
+import pathlib
+import threading
+
+import markdown
+from bs4 import BeautifulSoup
+
+# Reads the first paragraph or list from Markdown by rendering it with Python-Markdown and taking the text of the first
+# <p> or <ul> with Beautiful Soup, as run_examples.py always has. Rendering is the slow part, so each file's text is
+# memoised by its content hash, and a README.md is only rendered again once it changes.
+
+
+def _first_paragraph_text(data: str) -> str:
+    """The text of the first paragraph or list in some Markdown, with each line break as <br/>.
+
+    An empty string if there is neither, e.g. a README.md of only a heading.
+    """
+    html = markdown.Markdown().convert(data)
+    soup = BeautifulSoup(html, "html.parser")
+    found = [x.text for x in list(soup.children) if x.name in ["ul", "p"]]
+    return found[0].replace("\n", "<br/>") if found else ""
+
+
+_first_paragraphs: dict[str, str] = {}
+_first_paragraphs_lock = threading.Lock()
+
+
+def _first_paragraph(path: pathlib.Path) -> str:
+    """The first paragraph or list of a Markdown file, memoised by the file's content hash."""
+    content = path.read_bytes()
+    content_hash = hashlib.sha256(content).hexdigest()
+    with _first_paragraphs_lock:
+        if content_hash in _first_paragraphs:
+            return _first_paragraphs[content_hash]
+    # Newlines as reading the file in text mode would give them
+    text = _first_paragraph_text(content.decode().replace("\r\n", "\n").replace("\r", "\n"))
+    with _first_paragraphs_lock:
+        _first_paragraphs[content_hash] = text
+    return text
@@ -0,0 +1,72 @@
+import json
+import pathlib
+from typing import NamedTuple, Optional
+
+from result_reports import OUTCOME_CACHED, CellResult
+from scheduler import Cell
+from shared import _write_atomically, bcolors
+
+# Bump if what is stored changes, so an old history is never used
+HISTORY_VERSION = 1
+
+
+class CellHistory(NamedTuple):
+    # The result of the last run, 0 for success
+    result: int
+    # In seconds, of the last time the cell was actually run rather than its result taken from the cache
+    duration: Optional[float]
+
+
+def _cell_key(cell: Cell) -> str:
+    return f"{cell.suite}/{cell.example}/{cell.spec}/{cell.language}{cell.flavour}"
+
+
+class History:
+    """The last result and duration of each cell, so the cells most likely to fail, and the slowest, can be run first.
+
+    Running the slowest first packs the cells onto the workers better, as a slow cell started last would otherwise be
+    left running on its own once every other cell has finished.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            cells = data["cells"] if data.get("version") == HISTORY_VERSION else {}
+            self._cells = {key: CellHistory(**value) for key, value in cells.items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._cells: dict[str, CellHistory] = {}
+
+    def get(self, cell: Cell) -> Optional[CellHistory]:
+        return self._cells.get(_cell_key(cell))
+
+    def order(self, cells: list[Cell]) -> list[Cell]:
+        """The cells in the order to run them: those which failed last time, then any without a history, then those
+        which passed, each the slowest first. Otherwise, cells stay in the order given."""
+
+        def _priority(idx_cell: tuple[int, Cell]):
+            idx, cell = idx_cell
+            history = self.get(cell)
+            if not history:
+                return 1, 0, idx
+            return 0 if history.result != 0 else 2, -(history.duration or 0), idx
+
+        return [cell for _, cell in sorted(enumerate(cells), key=_priority)]
+
+    def update(self, cell_results: list[CellResult]):
+        for cell_result in cell_results:
+            previous = self.get(cell_result.cell)
+            # A cached result takes no time, so keep how long it took when it was last actually run
+            if cell_result.outcome == OUTCOME_CACHED:
+                duration = previous.duration if previous else None
+            else:
+                duration = round(cell_result.duration, 3)
+            self._cells[_cell_key(cell_result.cell)] = CellHistory(result=cell_result.result, duration=duration)
+
+    def save(self):
+        data = {"version": HISTORY_VERSION, "cells": {key: value._asdict() for key, value in self._cells.items()}}
+        try:
+            _write_atomically(self.path, json.dumps(data))
+        except OSError as ex:
+            print(f"{bcolors.WARNING}Unable to save the history of results to {self.path}: {ex}{bcolors.ENDC}")
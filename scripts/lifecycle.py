@@ -0,0 +1,118 @@
+import contextlib
+import json
+import os
+import pathlib
+import shutil
+import signal
+import socket
+import tempfile
+import time
+
+from shared import bcolors
+
+# Every container the harness starts has this label, along with the host and process which started it
+LABEL = "pact-examples"
+HOST_LABEL = f"{LABEL}.host"
+PID_LABEL = f"{LABEL}.pid"
+
+# Every workspace root the harness creates has this prefix, and a marker file saying which host and process created it
+WORKSPACES_PREFIX = "pact-examples-workspaces-"
+WORKSPACES_MARKER = ".pact-examples.json"
+
+# Leftovers which can't be traced back to a process are only removed once they are this old, in seconds
+UNOWNED_MAX_AGE = 24 * 60 * 60
+
+
+def _owner_labels() -> dict[str, str]:
+    """Labels for anything created by this process."""
+    return {LABEL: "true", HOST_LABEL: socket.gethostname(), PID_LABEL: str(os.getpid())}
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, but as someone else
+        return True
+    return True
+
+
+def _is_stale(labels: dict) -> bool:
+    """Whether whatever has these labels was left behind by a harness process on this host which is no longer running.
+
+    Anything created from another host, e.g. sharing the Docker daemon, is never treated as stale.
+    """
+    if labels.get(HOST_LABEL) != socket.gethostname():
+        return False
+    try:
+        return not _is_running(int(labels.get(PID_LABEL, "")))
+    except ValueError:
+        return False
+
+
+def _new_workspace_root() -> pathlib.Path:
+    """A temporary dir for the workspaces of a run, marked as belonging to this process."""
+    workspace_root = pathlib.Path(tempfile.mkdtemp(prefix=WORKSPACES_PREFIX))
+    workspace_root.joinpath(WORKSPACES_MARKER).write_text(json.dumps(_owner_labels()))
+    return workspace_root
+
+
+def _stale_containers(client) -> list:
+    # Started by the harness, for a process which has gone
+    stale = [x for x in client.containers.list(all=True, filters={"label": LABEL}) if _is_stale(x.labels)]
+    # Stopped containers of the example images without labels, from before containers were labelled
+    stale += [
+        x
+        for x in client.containers.list(all=True, filters={"status": "exited"})
+        if LABEL not in x.labels and x.attrs.get("Config", {}).get("Image", "").startswith("pact-examples-")
+    ]
+    return stale
+
+
+def _stale_workspace_roots(tmp_dir: pathlib.Path) -> list[pathlib.Path]:
+    stale = []
+    for path in sorted(tmp_dir.glob(f"{WORKSPACES_PREFIX}*")):
+        try:
+            labels = json.loads(path.joinpath(WORKSPACES_MARKER).read_text())
+        except (OSError, ValueError):
+            labels = None
+        try:
+            if labels is not None and _is_stale(labels):
+                stale.append(path)
+            elif labels is None and time.time() - path.stat().st_mtime > UNOWNED_MAX_AGE:
+                stale.append(path)
+        except OSError:
+            continue
+    return stale
+
+
+def _collect_garbage(client, tmp_dir: pathlib.Path = None):
+    """Remove any containers and workspaces left behind by earlier runs, e.g. which were killed."""
+    from docker.errors import APIError
+
+    for container in _stale_containers(client):
+        print(f"{bcolors.WARNING}Removing a container left behind by an earlier run: {container.id}{bcolors.ENDC}")
+        try:
+            container.remove(force=True)
+        except APIError as ex:
+            print(f"{bcolors.WARNING}Unable to remove container {container.id}: {ex}{bcolors.ENDC}")
+
+    for path in _stale_workspace_roots(tmp_dir or pathlib.Path(tempfile.gettempdir())):
+        print(f"{bcolors.WARNING}Removing workspaces left behind by an earlier run: {path}{bcolors.ENDC}")
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def _interrupt_on_sigterm():
+    """Treat SIGTERM, e.g. from a cancelled CI job, as Ctrl-C, so everything is cleaned up on the way out."""
+
+    def _interrupt(signum, frame):
+        raise KeyboardInterrupt(f"Received signal {signum}")
+
+    previous = signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
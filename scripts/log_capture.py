@@ -0,0 +1,46 @@
+import collections
+import pathlib
+from typing import Iterable
+
+# A line longer than this is cut short in the tail kept in memory, the log file always has all of it
+MAX_LINE_BYTES = 16 * 1024
+
+
+def _tail_line(line: bytes, truncated: bool) -> str:
+    # With a tty, lines end with \r\n
+    text = line.rstrip(b"\r").decode("utf-8", errors="replace")
+    return f"{text} [...]" if truncated else text
+
+
+def _capture_output(chunks: Iterable[bytes], log_path: pathlib.Path, tail_lines: int) -> list[str]:
+    """Write output to log_path as it arrives, keeping only the last tail_lines lines of it in memory.
+
+    However much an example outputs, at most tail_lines lines of up to MAX_LINE_BYTES each are held at once.
+
+    :param chunks: The output as it is streamed, split anywhere, including part way through a line or character
+    :return: The last tail_lines lines
+    """
+    tail = collections.deque(maxlen=tail_lines)
+    # The start of a line which hasn't ended yet, and whether it was too long to keep all of
+    partial = b""
+    truncated = False
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            lines = chunk.split(b"\n")
+            # Only the end of the chunk can be an unfinished line, to be completed by the chunks which follow
+            for line in lines[:-1]:
+                if not truncated:
+                    partial += line
+                tail.append(_tail_line(partial[:MAX_LINE_BYTES], truncated or len(partial) > MAX_LINE_BYTES))
+                partial = b""
+                truncated = False
+            if not truncated:
+                partial += lines[-1]
+                if len(partial) > MAX_LINE_BYTES:
+                    partial = partial[:MAX_LINE_BYTES]
+                    truncated = True
+    if partial or truncated:
+        tail.append(_tail_line(partial, truncated))
+    return list(tail)
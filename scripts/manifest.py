@@ -0,0 +1,220 @@
+import functools
+import json
+import os
+import pathlib
+from typing import NamedTuple, Optional
+
+from shared import LanguagesAndSpecs, _write_atomically, bcolors
+
+# Bump if what is stored in the manifest changes, so an old one is never used
+MANIFEST_VERSION = 2
+
+
+class Implementation(NamedTuple):
+    """An implementation of an example for a spec, in a language and optionally a flavour of it.
+
+    e.g. consumer-features/example-hello-world/v2/example-hello-world-js-jest-pact is language js, flavour -jest-pact
+    """
+
+    language: str
+    # e.g. -jest-pact. Note the leading -, and the default of empty string for no flavour
+    flavour: str
+    path: pathlib.Path
+    makefile: Optional[pathlib.Path]
+
+
+def _scandir(path: pathlib.Path) -> tuple[list[str], list[str]]:
+    """The sorted names of the dirs and of the files directly in path."""
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                (dirs if entry.is_dir() else files).append(entry.name)
+    except FileNotFoundError:
+        pass
+    return sorted(dirs), sorted(files)
+
+
+class Manifest:
+    """Everything the scripts need to know about the layout of languages/ and suites/, found by a single scan.
+
+    The scan records the modification time of every dir it looks in. Adding, removing or renaming anything in a dir
+    changes its modification time, so if none have changed the saved manifest can be used without scanning again.
+    """
+
+    def __init__(self, root_path: pathlib.Path, data: dict):
+        self.root_path = root_path
+        self.data = data
+
+        # Index the implementations for each example and spec, for lookups by language and flavour
+        self._implementations: dict[tuple[str, str, str], dict[tuple[str, str], Implementation]] = {}
+        for suite, suite_data in data["suites"].items():
+            for example, example_data in suite_data["examples"].items():
+                for spec, spec_data in example_data["specs"].items():
+                    self._implementations[(suite, example, spec)] = self._identify(suite, example, spec, spec_data)
+
+    def _identify(self, suite: str, example: str, spec: str, spec_data: dict) -> dict[tuple[str, str], Implementation]:
+        spec_path = self.root_path.joinpath("suites").joinpath(suite).joinpath(example).joinpath(spec)
+        implementations = {}
+        for dir_name, has_makefile in spec_data["dirs"].items():
+            # Check the longest language names first, so e.g. a language js-legacy isn't taken as js flavour -legacy
+            for language in sorted(self.data["languages"], key=len, reverse=True):
+                prefix = f"{example}-{language}"
+                if dir_name == prefix or dir_name.startswith(f"{prefix}-"):
+                    path = spec_path.joinpath(dir_name)
+                    implementations[(language, dir_name[len(prefix) :])] = Implementation(
+                        language=language,
+                        flavour=dir_name[len(prefix) :],
+                        path=path,
+                        makefile=path.joinpath("Makefile") if has_makefile else None,
+                    )
+                    break
+        return implementations
+
+    @classmethod
+    def scan(cls, root_path: pathlib.Path) -> "Manifest":
+        """Walk languages/ and suites/ once, recording only what the scripts need."""
+        mtimes = {}
+
+        def _scan(*parts: str) -> tuple[list[str], list[str]]:
+            path = root_path.joinpath(*parts)
+            mtimes["/".join(parts)] = os.stat(path).st_mtime_ns if path.exists() else None
+            return _scandir(path)
+
+        languages = {}
+        for language in _scan("languages")[0]:
+            languages[language] = {
+                spec: "Dockerfile" in _scan("languages", language, spec)[1] for spec in _scan("languages", language)[0]
+            }
+
+        suites = {}
+        for suite in _scan("suites")[0]:
+            suite_dirs, suite_files = _scan("suites", suite)
+            examples = {}
+            for example in suite_dirs:
+                example_dirs, example_files = _scan("suites", suite, example)
+                specs = {}
+                for spec in example_dirs:
+                    spec_dirs, _ = _scan("suites", suite, example, spec)
+                    pacts_dirs, pacts_files = (
+                        _scan("suites", suite, example, spec, "pacts") if "pacts" in spec_dirs else ([], [])
+                    )
+                    specs[spec] = {
+                        "pacts": pacts_files,
+                        # Pacts only expected for one language, in a dir named after it
+                        "language_pacts": {
+                            language: _scan("suites", suite, example, spec, "pacts", language)[1]
+                            for language in pacts_dirs
+                        },
+                        "dirs": {
+                            dir_name: "Makefile" in _scan("suites", suite, example, spec, dir_name)[1]
+                            for dir_name in spec_dirs
+                            if dir_name != "pacts"
+                        },
+                    }
+                examples[example] = {"readme": "README.md" in example_files, "specs": specs}
+            suites[suite] = {"readme": "README.md" in suite_files, "examples": examples}
+
+        data = {"version": MANIFEST_VERSION, "languages": languages, "suites": suites, "mtimes": mtimes}
+        return cls(root_path, data)
+
+    def is_current(self) -> bool:
+        """Whether nothing has been added, removed or renamed in any of the dirs scanned."""
+        for relative_path, mtime in self.data["mtimes"].items():
+            path = self.root_path.joinpath(relative_path)
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                if mtime is not None:
+                    return False
+        return True
+
+    def save(self, manifest_path: pathlib.Path):
+        _write_atomically(manifest_path, json.dumps(self.data))
+
+    def languages_and_specs(self, languages=None, specs=None, suite: Optional[str] = None) -> LanguagesAndSpecs:
+        """The languages and specs to run, and if for a suite, the flavours of the languages its examples have.
+
+        Any language ending with 'skip' is ignored unless it is asked for.
+        """
+        if not languages:
+            languages = sorted(x for x in self.data["languages"] if not x.endswith("skip"))
+        if not specs:
+            specs = sorted({spec for language_specs in self.data["languages"].values() for spec in language_specs})
+
+        # Find any additional flavours, i.e. variations of a language
+        # This will find e.g. consumer-features/v2/example-hello-world-js-jest-pact and identify v2-js-jest-pact
+        flavours = set()
+        if suite:
+            for example in self.examples(suite):
+                for spec in specs:
+                    for language, flavour in self._implementations.get((suite, example, spec), {}):
+                        if flavour and language in languages:
+                            flavours.add(f"{spec}-{language}{flavour}")
+        return LanguagesAndSpecs(languages=list(languages), specs=list(specs), flavours=sorted(flavours))
+
+    def dockerfile(self, language: str, spec: str) -> Optional[pathlib.Path]:
+        if self.data["languages"].get(language, {}).get(spec):
+            return self.root_path.joinpath("languages").joinpath(language).joinpath(spec).joinpath("Dockerfile")
+        return None
+
+    def suites(self) -> list[str]:
+        return list(self.data["suites"])
+
+    def examples(self, suite: str) -> list[str]:
+        return list(self.data["suites"].get(suite, {}).get("examples", {}))
+
+    def implementation(
+        self, suite: str, example: str, spec: str, language: str, flavour: str = ""
+    ) -> Optional[Implementation]:
+        return self._implementations.get((suite, example, spec), {}).get((language, flavour))
+
+    def readme(self, suite: str, example: Optional[str] = None) -> Optional[pathlib.Path]:
+        """The README.md for an example, or for the suite itself if no example is given."""
+        suite_data = self.data["suites"].get(suite, {})
+        if example:
+            found = suite_data.get("examples", {}).get(example, {}).get("readme")
+        else:
+            found = suite_data.get("readme")
+        path = self.root_path.joinpath("suites").joinpath(suite)
+        return path.joinpath(example or "").joinpath("README.md") if found else None
+
+    def pacts(self, suite: str, example: str, spec: str, language: Optional[str] = None) -> list[pathlib.Path]:
+        """The expected pacts for an example and spec, and if given a language, those only expected for it too."""
+        spec_data = self.data["suites"].get(suite, {}).get("examples", {}).get(example, {}).get("specs", {}).get(spec)
+        if not spec_data:
+            return []
+        pacts_path = (
+            self.root_path.joinpath("suites").joinpath(suite).joinpath(example).joinpath(spec).joinpath("pacts")
+        )
+        paths = [pacts_path.joinpath(x) for x in spec_data["pacts"]]
+        if language:
+            paths += [pacts_path.joinpath(language).joinpath(x) for x in spec_data["language_pacts"].get(language, [])]
+        return paths
+
+
+@functools.lru_cache(maxsize=None)
+def _load_manifest(root_path: pathlib.Path) -> Manifest:
+    """Load the saved manifest if nothing has changed since it was made, otherwise scan again and save it.
+
+    This is only done once per run.
+    """
+    manifest_path = root_path.joinpath(".cache").joinpath("manifest.json")
+    try:
+        with open(manifest_path) as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            manifest = Manifest(root_path, data)
+            if manifest.is_current():
+                return manifest
+    except (OSError, ValueError, KeyError):
+        pass
+
+    print(f"{bcolors.OKCYAN}Scanning {root_path} for languages and examples{bcolors.ENDC}")
+    manifest = Manifest.scan(root_path)
+    try:
+        manifest.save(manifest_path)
+    except OSError as ex:
+        print(f"{bcolors.WARNING}Unable to save the manifest to {manifest_path}: {ex}{bcolors.ENDC}")
+    return manifest
@@ -0,0 +1,127 @@
+import functools
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, NamedTuple, Optional
+
+import pact_normalise
+from pact_normalise import _normaliser, _read_pact
+
+# Any change to how pacts are compared, whether to the normalisation rules or to the code which normalises and compares
+# them, changes this, and so invalidates every cached result
+COMPARISON_FINGERPRINT = hashlib.sha256(
+    b"\0".join(pathlib.Path(x).read_bytes() for x in (__file__, pact_normalise.__file__))
+).hexdigest()
+
+
+class CanonicalPact(NamedTuple):
+    document: dict
+    # sha256 of the document serialised with sorted keys and no whitespace, so equal documents have equal hashes
+    hash: str
+
+
+class Difference(NamedTuple):
+    # DeepDiff style path to the difference e.g. root['interactions'][0]['request']['method']
+    path: str
+    # DeepDiff style kind of difference e.g. values_changed, dictionary_item_added
+    kind: str
+    actual: Any
+    expected: Any
+
+
+class Pacticipants(NamedTuple):
+    """The consumer and provider a pact is between, normalised so they can be used to match pacts up."""
+
+    consumer: str
+    provider: str
+
+
+# For values which are missing from one side of a Difference
+MISSING = "<missing>"
+
+
+def _canonicalise(data: dict, spec: str, language: Optional[str] = None) -> CanonicalPact:
+    """Normalise a loaded pact once, and hash its canonical form so it can be compared without walking it again."""
+    document = _normaliser(spec)(data, language=language)
+    text = json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return CanonicalPact(document=document, hash=hashlib.sha256(text.encode()).hexdigest())
+
+
+@functools.lru_cache(maxsize=256)
+def _canonical_expected_cached(path: str, mtime_ns: int, spec: str, language: str) -> CanonicalPact:
+    return _canonicalise(json.loads(_read_pact(pathlib.Path(path))), spec=spec, language=language)
+
+
+def _canonical_expected(path: pathlib.Path, spec: str, language: str) -> CanonicalPact:
+    """The canonical form of an expected pact, which is shared between every flavour of the language it's run for.
+
+    The document returned must not be modified.
+    """
+    return _canonical_expected_cached(str(path), os.stat(path).st_mtime_ns, spec, language)
+
+
+def _pacticipants(document: dict) -> Optional[Pacticipants]:
+    """Read the consumer and provider names from a (normalised) pact, or None if it doesn't name them."""
+    try:
+        return Pacticipants(
+            consumer=document["consumer"]["name"].strip().lower(),
+            provider=document["provider"]["name"].strip().lower(),
+        )
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+def _index_pacts(pacts: dict[pathlib.Path, CanonicalPact]) -> dict[Optional[Pacticipants], list[pathlib.Path]]:
+    """Index pact files by the consumer and provider they are between, so matching them up is a lookup."""
+    index = {}
+    for path, pact in pacts.items():
+        index.setdefault(_pacticipants(pact.document), []).append(path)
+    return index
+
+
+def _structural_diff(actual: Any, expected: Any, path: str = "root") -> list[Difference]:
+    """Walk both documents together, returning every path at which they differ."""
+    if type(actual) is not type(expected):
+        return [Difference(path=path, kind="type_changes", actual=actual, expected=expected)]
+
+    if isinstance(actual, dict):
+        differences = []
+        for key in sorted(actual.keys() | expected.keys()):
+            key_path = f"{path}[{key!r}]"
+            if key not in expected:
+                differences.append(Difference(key_path, "dictionary_item_removed", actual[key], MISSING))
+            elif key not in actual:
+                differences.append(Difference(key_path, "dictionary_item_added", MISSING, expected[key]))
+            else:
+                differences.extend(_structural_diff(actual[key], expected[key], key_path))
+        return differences
+
+    if isinstance(actual, list):
+        differences = []
+        for idx, (actual_item, expected_item) in enumerate(zip(actual, expected)):
+            differences.extend(_structural_diff(actual_item, expected_item, f"{path}[{idx}]"))
+        for idx in range(len(expected), len(actual)):
+            differences.append(Difference(f"{path}[{idx}]", "iterable_item_removed", actual[idx], MISSING))
+        for idx in range(len(actual), len(expected)):
+            differences.append(Difference(f"{path}[{idx}]", "iterable_item_added", MISSING, expected[idx]))
+        return differences
+
+    if actual != expected:
+        return [Difference(path=path, kind="values_changed", actual=actual, expected=expected)]
+    return []
+
+
+def _compare_pacts(actual: CanonicalPact, expected: CanonicalPact) -> list[Difference]:
+    """Compare two canonicalised pacts, only walking them for the differences if their hashes don't match."""
+    if actual.hash == expected.hash:
+        return []
+    return _structural_diff(actual.document, expected.document)
+
+
+def _format_difference(difference: Difference, max_length: int = 200) -> str:
+    def _short(value):
+        text = value if value is MISSING else json.dumps(value, sort_keys=True)
+        return text if len(text) <= max_length else f"{text[:max_length]}..."
+
+    return f"{difference.kind}: {difference.path}: actual={_short(difference.actual)}, expected={_short(difference.expected)}"
@@ -0,0 +1,119 @@
+import functools
+import os
+import pathlib
+from typing import NamedTuple, Optional
+
+# Matches every item of a list, or every value of a dict, at that point in a rule's path
+EACH = "*"
+
+
+class Rule(NamedTuple):
+    """Remove a difference between pacts which is down to the language/implementation rather than the example.
+
+    path is the keys to follow from the root of the pact, and action is one of:
+
+    - remove: remove the key, if it is present
+    - upper: make the value upper case
+    - language: replace the LANGUAGE placeholder with the language, only applied to expected pacts
+    """
+
+    path: tuple[str, ...]
+    action: str
+    # Why the rule is needed
+    reason: str
+
+
+# TODO: Big dislike, we have some mangling of the actual to remove to make match due to language/implementation differences
+# These are applied to both actual and expected, if they are present so they don't cause "differences"
+COMMON_RULES = [
+    Rule(("metadata", "pact-js"), "remove", "Implementation specific metadata"),
+    Rule(("metadata", "pactRust"), "remove", "Implementation specific metadata"),
+    Rule(("metadata", "pactSpecification"), "remove", "Languages differ in which spec version they write"),
+    # TODO: What to do about header differences?
+    Rule(
+        ("interactions", EACH, "response", "headers", "Content-Type"),
+        "remove",
+        "Pact-JS seems to automatically include Content-Type, while Python does not",
+    ),
+    Rule(("interactions", EACH, "request", "method"), "upper", "Make request method always upper case"),
+    Rule(("consumer", "name"), "language", "Expected pacts name the consumer with a LANGUAGE placeholder"),
+    Rule(("provider", "name"), "language", "Expected pacts name the provider with a LANGUAGE placeholder"),
+]
+
+# The rules for each spec version, any spec not listed uses COMMON_RULES
+RULES_BY_SPEC: dict[str, list[Rule]] = {
+    "v2": COMMON_RULES,
+    "v3": COMMON_RULES,
+}
+
+ACTIONS = {"remove", "upper", "language"}
+
+
+class Normaliser:
+    """A set of rules compiled into a tree of paths, so a pact is normalised by a single walk of only those paths."""
+
+    def __init__(self, rules: list[Rule]):
+        self.tree: dict = {}
+        for rule in rules:
+            if rule.action not in ACTIONS:
+                raise ValueError(f"Unknown action {rule.action!r} for {rule=}")
+            node = self.tree
+            for key in rule.path[:-1]:
+                node = node.setdefault(key, {})
+                if not isinstance(node, dict):
+                    raise ValueError(f"{rule=} is inside a value which another rule already applies to")
+            node[rule.path[-1]] = rule.action
+
+    def __call__(self, data: dict, language: Optional[str] = None) -> dict:
+        """Normalise a loaded pact in place.
+
+        :param language: For an expected pact, the language to replace the LANGUAGE placeholder with
+        :return: The normalised pact
+        """
+        self._apply(self.tree, data, language)
+        return data
+
+    def _apply(self, node: dict, data, language: Optional[str]):
+        if isinstance(data, list):
+            if EACH in node:
+                for item in data:
+                    self._apply(node[EACH], item, language)
+            return
+        if not isinstance(data, dict):
+            return
+
+        for key, child in node.items():
+            if key == EACH:
+                for value in data.values():
+                    self._apply(child, value, language)
+            elif key not in data:
+                continue
+            elif isinstance(child, dict):
+                self._apply(child, data[key], language)
+            elif child == "remove":
+                del data[key]
+            elif child == "upper" and isinstance(data[key], str):
+                data[key] = data[key].upper()
+            elif child == "language" and language and isinstance(data[key], str):
+                data[key] = data[key].replace("LANGUAGE", language)
+
+
+@functools.lru_cache(maxsize=None)
+def _normaliser(spec: str) -> Normaliser:
+    """The compiled rules for a spec version, compiled once and shared."""
+    return Normaliser(RULES_BY_SPEC.get(spec, COMMON_RULES))
+
+
+@functools.lru_cache(maxsize=256)
+def _read_pact_cached(path: str, mtime_ns: int, size: int) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def _read_pact(path: pathlib.Path) -> str:
+    """Read a pact file, sharing the contents between everything which needs it e.g. comparing and generating docs.
+
+    Keyed by modification time and size, so a changed file is read again.
+    """
+    stat = os.stat(path)
+    return _read_pact_cached(str(path), stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+from typing import NamedTuple, Optional
+
+from shared import bcolors
+from tracing import span
+
+# Bump to invalidate every cached result, e.g. if what is stored changes
+CACHE_FORMAT_VERSION = 2
+
+# Local leftovers from running an example outside Docker, which don't affect the result
+IGNORED_DIRS = {"node_modules", "output", "logs", ".pytest_cache", "__pycache__"}
+
+
+class CachedResult(NamedTuple):
+    result: int
+
+
+def _hash_tree(digest, path: pathlib.Path):
+    """Add every file under path, by relative name and content, to digest."""
+    for root, dirs, files in os.walk(path):
+        # Walk in a stable order, skipping anything which isn't part of the example itself
+        dirs[:] = sorted(x for x in dirs if x not in IGNORED_DIRS)
+        for _file in sorted(files):
+            file_path = pathlib.Path(root).joinpath(_file)
+            digest.update(str(file_path.relative_to(path)).encode())
+            digest.update(b"\0")
+            if file_path.is_symlink():
+                digest.update(os.readlink(file_path).encode())
+            else:
+                digest.update(file_path.read_bytes())
+            digest.update(b"\0")
+
+
+class ResultCache:
+    """Results of running examples, content-addressed so an unchanged example doesn't need to be run again.
+
+    Each result is keyed by the example dir, the expected pacts, the ID of the image it runs in and a fingerprint of
+    how pacts are compared, so a change to any of those means the example is run again. Only passing results are
+    stored, so an example which failed is always run again.
+
+    :param reuse: If False, nothing is read from the cache so every example is run, but results are still stored
+    """
+
+    def __init__(self, cache_path: pathlib.Path, client, fingerprint: str, reuse: bool = True):
+        self.cache_path = cache_path
+        self.client = client
+        self.fingerprint = fingerprint
+        self.reuse = reuse
+        self._image_ids: dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _image_id(self, image: str) -> Optional[str]:
+        from docker.errors import ImageNotFound
+
+        with self._lock:
+            if image not in self._image_ids:
+                with span("image lookup", image=image):
+                    try:
+                        self._image_ids[image] = self.client.images.get(image).id
+                    except ImageNotFound:
+                        self._image_ids[image] = None
+            return self._image_ids[image]
+
+    def key(self, image: str, example_dir: pathlib.Path, expected_pacts_dir: pathlib.Path) -> Optional[str]:
+        """The cache key for running example_dir in image, or None if it can't be cached e.g. there is no image."""
+        image_id = self._image_id(image)
+        if not image_id:
+            return None
+
+        with span("cache key"):
+            digest = hashlib.sha256()
+            digest.update(f"{CACHE_FORMAT_VERSION}\0{self.fingerprint}\0{image_id}\0".encode())
+            _hash_tree(digest, example_dir)
+            digest.update(b"\0pacts\0")
+            if expected_pacts_dir.is_dir():
+                _hash_tree(digest, expected_pacts_dir)
+            return digest.hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[CachedResult]:
+        if not key or not self.reuse:
+            return None
+        entry = self.cache_path.joinpath(key)
+        try:
+            with open(entry.joinpath("result.json")) as f:
+                result = json.load(f)["result"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return CachedResult(result=result)
+
+    def put(self, key: Optional[str], result: int):
+        """Store the result, replacing anything already stored for key."""
+        if not key:
+            return
+        os.makedirs(self.cache_path, exist_ok=True)
+
+        # Build the entry to one side, then move it into place, so a partial entry is never read
+        staging = pathlib.Path(tempfile.mkdtemp(prefix=f"{key}-", dir=self.cache_path))
+        with open(staging.joinpath("result.json"), "w") as f:
+            json.dump({"result": result}, f)
+
+        entry = self.cache_path.joinpath(key)
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            # Another worker stored the same key first
+            print(f"{bcolors.WARNING}Unable to store cached result for {key=}{bcolors.ENDC}")
+            shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,182 @@
+import json
+import pathlib
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import NamedTuple, Optional
+
+from scheduler import Cell
+from shared import RESULT_TIMEOUT, _write_atomically, bcolors
+
+# How a cell's result was arrived at
+OUTCOME_CACHED = "cached"
+OUTCOME_NOT_RUN = "not run"
+OUTCOME_TESTS_FAILED = "tests failed"
+OUTCOME_PACTS_MATCHED = "pacts matched"
+OUTCOME_PACTS_DIFFERENT = "pacts different"
+OUTCOME_TIMED_OUT = "timed out"
+
+
+class CellResult(NamedTuple):
+    cell: Cell
+    # 0 for success, as in the results matrix
+    result: int
+    outcome: str
+    # In seconds
+    duration: float
+    # Where everything output by the example was written, if it was run
+    log_path: Optional[pathlib.Path] = None
+
+    @property
+    def status(self) -> str:
+        if self.result == 0:
+            return "passed"
+        return "timeout" if self.result == RESULT_TIMEOUT else "failed"
+
+    def as_dict(self) -> dict:
+        return {
+            "suite": self.cell.suite,
+            "example": self.cell.example,
+            "spec": self.cell.spec,
+            "language": self.cell.language,
+            "flavour": self.cell.flavour,
+            "makefile": str(self.cell.makefile),
+            "status": self.status,
+            "result": self.result,
+            "outcome": self.outcome,
+            "duration": round(self.duration, 3),
+            "log": str(self.log_path) if self.log_path else None,
+        }
+
+
+class ResultsLog:
+    """Each cell's result as a line of JSON, written the moment the cell finishes, so progress and failures can be
+    followed while a run is still going.
+
+    The first line is a start event with how many cells will be run, then there is a cell event per cell in the order
+    they finished, and an end event with the totals once every cell has finished.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._results: list[CellResult] = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w")
+
+    def _write_event(self, event: str, **fields):
+        # Flushed as soon as it's written, for anything following the file
+        self._file.write(json.dumps({"event": event, "time": round(time.time(), 3), **fields}) + "\n")
+        self._file.flush()
+
+    def start(self, cells: list[Cell]):
+        with self._lock:
+            self._write_event("start", total=len([cell for cell in cells if cell.makefile]))
+
+    def write(self, cell_result: CellResult):
+        with self._lock:
+            self._results.append(cell_result)
+            self._write_event("cell", **cell_result.as_dict())
+
+    def results(self) -> list[CellResult]:
+        with self._lock:
+            return list(self._results)
+
+    def close(self):
+        with self._lock:
+            statuses = [x.status for x in self._results]
+            self._write_event(
+                "end",
+                passed=statuses.count("passed"),
+                failed=statuses.count("failed"),
+                timeout=statuses.count("timeout"),
+                duration=round(time.perf_counter() - self._start, 3),
+            )
+            self._file.close()
+
+
+def _read_cell_results(paths: list[pathlib.Path], cells: list[Cell]) -> list[CellResult]:
+    """The results of the cells in results.jsonl files, e.g. written by each shard of a run.
+
+    A cell found in more than one file takes its result from the last, and any which aren't one of cells are ignored.
+    A file which doesn't exist, e.g. as its shard failed before writing it, is skipped.
+    """
+    by_key = {(x.suite, x.example, x.spec, x.language, x.flavour): x for x in cells}
+    cell_results = {}
+    for path in paths:
+        if not path.is_file():
+            print(f"{bcolors.WARNING}No results found at {path}, its examples are reported as not run{bcolors.ENDC}")
+            continue
+        with open(path) as f:
+            for line in f:
+                event = json.loads(line)
+                if event["event"] != "cell":
+                    continue
+                cell = by_key.get(
+                    (event["suite"], event["example"], event["spec"], event["language"], event["flavour"])
+                )
+                if not cell:
+                    print(
+                        f"{bcolors.WARNING}Ignoring the result of an unknown example in {path}: {event}{bcolors.ENDC}"
+                    )
+                    continue
+                if cell in cell_results:
+                    print(f"{bcolors.WARNING}More than one result for {cell=}, using the one from {path}{bcolors.ENDC}")
+                cell_results[cell] = CellResult(
+                    cell=cell,
+                    result=event["result"],
+                    outcome=event["outcome"],
+                    duration=event["duration"],
+                    log_path=pathlib.Path(event["log"]) if event.get("log") else None,
+                )
+    return list(cell_results.values())
+
+
+def _junit_xml(cells: list[Cell], cell_results: list[CellResult]) -> str:
+    """A JUnit XML report, with a testsuite per suite and a testcase per cell, in the order of the results matrix.
+
+    Cells without an example to run are reported as skipped.
+    """
+    by_cell = {x.cell: x for x in cell_results}
+    testsuites = ET.Element("testsuites", name="pact-examples")
+    suites = {}
+    for cell in cells:
+        if cell.suite not in suites:
+            suites[cell.suite] = ET.SubElement(testsuites, "testsuite", name=cell.suite)
+        cell_result = by_cell.get(cell)
+        name = f"{cell.example} {cell.spec} {cell.language}{cell.flavour}"
+        testcase = ET.SubElement(
+            suites[cell.suite],
+            "testcase",
+            name=name,
+            classname=f"{cell.suite}.{cell.example}",
+            time=f"{cell_result.duration:.3f}" if cell_result else "0",
+        )
+        if not cell.makefile:
+            ET.SubElement(testcase, "skipped", message="No example to run")
+        elif not cell_result:
+            ET.SubElement(testcase, "skipped", message="Not run")
+        elif cell_result.result == RESULT_TIMEOUT:
+            ET.SubElement(testcase, "error", message=cell_result.outcome, type="timeout")
+        elif cell_result.result != 0:
+            ET.SubElement(testcase, "failure", message=cell_result.outcome, type=cell_result.outcome)
+
+    for testsuite in [testsuites, *suites.values()]:
+        testcases = list(testsuite.iter("testcase"))
+        testsuite.set("tests", str(len(testcases)))
+        testsuite.set("failures", str(len([x for x in testcases if x.find("failure") is not None])))
+        testsuite.set("errors", str(len([x for x in testcases if x.find("error") is not None])))
+        testsuite.set("skipped", str(len([x for x in testcases if x.find("skipped") is not None])))
+        testsuite.set("time", f"{sum(float(x.get('time')) for x in testcases):.3f}")
+
+    ET.indent(testsuites)
+    return ET.tostring(testsuites, encoding="unicode", xml_declaration=True) + "\n"
+
+
+def _write_junit(path: pathlib.Path, cells: list[Cell], cell_results: list[CellResult]):
+    try:
+        _write_atomically(path, _junit_xml(cells, cell_results))
+        print(f"JUnit XML report written to: {path}")
+    except OSError as ex:
+        print(f"{bcolors.WARNING}Unable to write the JUnit XML report to {path}: {ex}{bcolors.ENDC}")
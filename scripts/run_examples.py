@@ -1,28 +1,54 @@
 #!/usr/bin/env python3
 from difflib import unified_diff
-from typing import List
+from typing import List, NamedTuple, Optional
 
 import click
+import functools
 import glob
+import io
 import json
 import os
 import pathlib
 import re
-import tempfile
+import shutil
 import textwrap
-from tempfile import TemporaryDirectory
 import time
-import docker
-import markdown
-from bs4 import BeautifulSoup
-from deepdiff import DeepDiff
-from docker.errors import ContainerError, ImageNotFound
-from tabulate import tabulate
 
-from shared import LanguagesAndSpecs, ExamplesAndSpecs, _get_languages_and_specs, bcolors
-
-
-def _compare_example(tmpdir: TemporaryDirectory, examples_path: pathlib.Path, example: str, spec: str, language: str):
+from code_blocks import CodeBlockScanner, _source_files
+from container_pool import ContainerPool, ExampleRun
+from docs_cache import DocsCache, _hash_inputs
+from history import History
+from lifecycle import _collect_garbage, _interrupt_on_sigterm
+from manifest import _load_manifest
+from pact_compare import (
+    COMPARISON_FINGERPRINT,
+    _canonical_expected,
+    _canonicalise,
+    _compare_pacts,
+    _format_difference,
+    _index_pacts,
+)
+from pact_normalise import _read_pact
+from result_cache import ResultCache
+from result_reports import (
+    OUTCOME_CACHED,
+    OUTCOME_NOT_RUN,
+    OUTCOME_PACTS_DIFFERENT,
+    OUTCOME_PACTS_MATCHED,
+    OUTCOME_TESTS_FAILED,
+    OUTCOME_TIMED_OUT,
+    CellResult,
+    ResultsLog,
+    _read_cell_results,
+    _write_junit,
+)
+from scheduler import Cell, _run_cells
+from sharding import _parse_shard, _shard_cells
+from shared import RESULT_TIMEOUT, LanguagesAndSpecs, ExamplesAndSpecs, _get_languages_and_specs, bcolors
+from tracing import TRACER, span
+
+
+def _compare_example(output_dir: pathlib.Path, examples_path: pathlib.Path, example: str, spec: str, language: str):
     print(
         f"{bcolors.HEADER}-> _compare_example("
         f"{bcolors.OKBLUE}{language=}{bcolors.HEADER}, "
@@ -31,76 +57,85 @@ def _compare_example(tmpdir: TemporaryDirectory, examples_path: pathlib.Path, ex
         f"{bcolors.ENDC}"
     )
 
-    examples_to_compare_against = sorted(
-        [pathlib.Path(x).name for x in glob.glob(f"{examples_path}/{example}/{spec}/pacts/*")]
-    )
+    expected_paths = _load_manifest(examples_path.parents[1]).pacts(examples_path.name, example, spec, language)
 
     # Start off assuming success until proven otherwise
     result = 0
 
-    if not examples_to_compare_against:
+    if not expected_paths:
         result = 1
         print(f"{bcolors.WARNING}No Pacts were found in the example to verify against!")
 
-    example_pacts = sorted([pathlib.Path(x).name for x in glob.glob(f"{tmpdir.name}/pacts/*")])
-    print(f"Found Pacts generated by tests: {bcolors.OKBLUE}{example_pacts=}{bcolors.ENDC}")
-
-    for example_to_compare_against in examples_to_compare_against:
-        print(f"Looking to see if {example_to_compare_against=} is provided by one of {example_pacts=}")
-
-        for example_pact in example_pacts:
-            if example_to_compare_against.replace("LANGUAGE", language).lower() in example_pact.lower():
-                with open(f"{examples_path}/{example}/{spec}/pacts/{example_to_compare_against}") as json_expected:
-                    expected = json.load(json_expected)
-                with open(f"{tmpdir.name}/pacts/{example_pact}") as json_actual:
-                    actual = json.load(json_actual)
-
-                    # TODO: Big dislike, we have some mangling of the actual to remove to make match due to language/implementation differences
-                    # Remove from both actual and expected, if they are present so they don't cause "differences"
-                    for data in [actual, expected]:
-                        data["metadata"].pop("pact-js", None)
-                        data["metadata"].pop("pactRust", None)
-                        data["metadata"].pop("pactSpecification", None)
-
-                        # Pact-JS seems to automatically include Content-Type, while Python does not
-                        # TODO: What to do about header differences?
-                        if "interactions" in data:
-                            num_interactions = len(data["interactions"])
-                            for interaction in range(num_interactions):
-                                data["interactions"][interaction]["response"]["headers"].pop("Content-Type", None)
-
-                expected["consumer"]["name"] = expected["consumer"]["name"].replace("LANGUAGE", language)
-                expected["provider"]["name"] = expected["provider"]["name"].replace("LANGUAGE", language)
-
-                # Make request method always upper case
-                # This applies for non-message Pacts
-                if "interactions" in expected:
-                    for interaction in expected["interactions"]:
-                        interaction["request"]["method"] = interaction["request"]["method"].upper()
-                    for interaction in actual["interactions"]:
-                        interaction["request"]["method"] = interaction["request"]["method"].upper()
-
-                diff = DeepDiff(actual, expected)
-                if diff:
-                    print(f"{bcolors.FAIL}Pacts were not identical!{bcolors.ENDC}")
-                    print(diff)
-                    print(f"{bcolors.OKBLUE}actual:{bcolors.ENDC}")
-                    print(json.dumps(actual, indent=4))
-                    print(f"{bcolors.OKBLUE}expected:{bcolors.ENDC}")
-                    print(json.dumps(expected, indent=4))
-                    result = 1
-                else:
-                    print(f"{bcolors.OKGREEN}Pacts matched!{bcolors.ENDC}")
-                    break
-        else:
+    generated_paths = sorted(output_dir.joinpath("pacts").glob("*"))
+    print(f"Found Pacts generated by tests: {bcolors.OKBLUE}{[x.name for x in generated_paths]}{bcolors.ENDC}")
+
+    expected = {path: _canonical_expected(path, spec=spec, language=language) for path in expected_paths}
+    generated = {}
+    for path in generated_paths:
+        try:
+            generated[path] = _canonicalise(json.loads(path.read_text()), spec=spec)
+        except ValueError as ex:
+            print(f"{bcolors.FAIL}Unable to read generated Pact {path.name}: {ex}{bcolors.ENDC}")
+            result = 1
+
+    # Match the pacts up by the consumer and provider they are between, rather than by file name
+    expected_index = _index_pacts(expected)
+    generated_index = _index_pacts(generated)
+
+    for pacticipants, paths in expected_index.items():
+        names = [x.name for x in paths]
+        if not pacticipants:
+            print(f"{bcolors.FAIL}Expected Pact(s) {names} do not name a consumer and provider!{bcolors.ENDC}")
             result = 1
+            continue
+
+        print(f"Looking for a generated Pact for {pacticipants}, expected by {names}")
+        matches = generated_index.get(pacticipants, [])
+        if len(paths) > 1:
+            print(f"{bcolors.FAIL}More than one expected Pact for {pacticipants}: {names}{bcolors.ENDC}")
+            result = 1
+        elif not matches:
+            print(f"{bcolors.FAIL}No Pact was generated for {pacticipants}!{bcolors.ENDC}")
+            result = 1
+        elif len(matches) > 1:
+            print(
+                f"{bcolors.FAIL}More than one Pact was generated for {pacticipants}: {[x.name for x in matches]}{bcolors.ENDC}"
+            )
+            result = 1
+        else:
+            differences = _compare_pacts(generated[matches[0]], expected[paths[0]])
+            if differences:
+                print(f"{bcolors.FAIL}Pacts were not identical!{bcolors.ENDC}")
+                for difference in differences:
+                    print(_format_difference(difference))
+                result = 1
+            else:
+                print(f"{bcolors.OKGREEN}Pacts matched!{bcolors.ENDC}")
+
+    unexpected = [
+        x.name for pacticipants, paths in generated_index.items() if pacticipants not in expected_index for x in paths
+    ]
+    if unexpected:
+        print(f"{bcolors.WARNING}Ignoring generated Pact(s) which were not expected: {unexpected}{bcolors.ENDC}")
 
     colour = bcolors.OKGREEN if result == 0 else bcolors.FAIL
     print(f"{bcolors.HEADER}<- _compare_example, returning:  {colour}{result=}{bcolors.ENDC}")
     return result
 
 
-def _run_example(language: str, spec: str, example_dir: pathlib.Path, tmpdir: TemporaryDirectory):
+def _image_name(language: str, spec: str) -> str:
+    return f"pact-examples-{language}-{spec}"
+
+
+def _run_example(
+    pool: ContainerPool,
+    language: str,
+    spec: str,
+    example_dir: pathlib.Path,
+    log_path: pathlib.Path,
+    tail_lines: int = 100,
+    timeout: Optional[float] = None,
+) -> Optional[ExampleRun]:
     start = time.time()
 
     print(
@@ -110,76 +145,57 @@ def _run_example(language: str, spec: str, example_dir: pathlib.Path, tmpdir: Te
         f"{bcolors.OKBLUE}{example_dir=}{bcolors.HEADER}"
         f"{bcolors.ENDC}"
     )
-    client = docker.from_env()
 
-    image = f"pact-examples-{language}-{spec}"
-    container = None
-    try:
-        # The Ruby Pact Mock Service seems to get unhappy if it is unable to write a log.
-        # Unable to nicely get just a single file from the dir mounted as tmpfs, come back to this one...
-        # Couldn't get this to mount:
-        # pact_mock_log = f'{tmpdir.name}/pact-mock-service.log'
-        # open(pact_mock_log, 'a').close()
+    # Imported here, as docker is slow to import and isn't needed unless examples are run
+    from docker.errors import APIError, ImageNotFound
 
+    image = _image_name(language, spec)
+    run = None
+    try:
         # pact-python message doesn't support specifying the log_dir to output to
-        # As a result, we will need the main dir to be writable
-        volumes = {
-            tmpdir.name: {"bind": "/example/output/", "mode": "rw"},
-            example_dir: {"bind": "/example/", "mode": "rw"},
-        }
-        print(f"going to run {image=} with: {volumes=}")
-        container = client.containers.run(
-            # So we don't get mixed up perms and have files we can't delete, use the current uid
-            user=os.getuid(),
-            volumes=volumes,
-            image=image,
-            # environment=envs,
-            command=f"sh -c 'cd /example/; make test'",
-            tty=True,
-            stderr=True,
-            stdout=True,
-            detach=True,
-        )
-        result = container.wait()["StatusCode"]
+        # As a result, the example is copied to a fresh workspace, so the whole dir is writable
+        print(f"going to run {image=} with a pooled container")
+        run = pool.run(image=image, example_dir=example_dir, log_path=log_path, tail_lines=tail_lines, timeout=timeout)
+        result = RESULT_TIMEOUT if run.timed_out else run.exit_code
     except ImageNotFound:
         print(f"Image {image=} does not exist, unable to run")
         result = 1
-    except ContainerError as ex:
-        print(f"ContainerError: {ex=}, logs: {ex.container.logs()}")
-
+    except APIError as ex:
+        print(f"APIError: {ex=}")
         result = 1
     finally:
-        if container and result != 0:
-            print(f"{bcolors.HEADER}Container output{bcolors.ENDC}")
-            print(container.logs().decode("unicode_escape"))
-            container.remove()
+        if run and result != 0:
+            with span("log output"):
+                print(f"{bcolors.HEADER}Container output, last {len(run.tail)} line(s) of {run.log_path}{bcolors.ENDC}")
+                print("\n".join(run.tail))
 
     colour = bcolors.OKGREEN if result == 0 else bcolors.FAIL
+    if run and run.timed_out:
+        print(f"{bcolors.FAIL}Timed out after {timeout}s, the example was stopped{bcolors.ENDC}")
 
     end = time.time()
     duration = end - start
     print(f"{bcolors.HEADER}<- _run_example, {duration=:.1f}s, returning:  {colour}{result=}{bcolors.ENDC}")
-    return result
+    return run
+
+
+def _escape_markdown_text(text: str) -> str:
+    """Escape square brackets in plain text, as mdformat does, so they are never read as part of a link."""
+    return text.replace("[", "\\[").replace("]", "\\]")
 
 
 def _extract_first_paragraph(source, example="", suite=""):
-    """Parse with Beautiful Soup, to extract the FIRST PARAGRAPH from the Markdown
+    """Extract the FIRST PARAGRAPH (or list) from the Markdown, with line breaks as <br/>
 
     :param source: Full path to the Markdown file to read and process
     :param example: TODO: How is this used?
     :return: Text from the first paragraph in the Markdown file
     """
+    # Imported here, as it's only needed when reporting results
+    from first_paragraph import _first_paragraph
 
-    # TODO: Using Markdown and BeautifulSoup seems a bit overkill to pull out something? Something robust is needed though
     if source.is_file():
-        with open(source) as f:
-            data = f.read()
-            md = markdown.Markdown()
-            html = md.convert(data)
-
-            soup = BeautifulSoup(html, "html.parser")
-            description = [x.text for x in list(soup.children) if x.name in ["ul", "p"]][0].replace("\n", "<br/>")
-
+        description = _first_paragraph(source)
         example_link = f"**[{example}](examples/{suite}/{example})**"
     else:
         description = f"No example README.md found"
@@ -189,11 +205,167 @@ def _extract_first_paragraph(source, example="", suite=""):
     return description, example_link
 
 
-def _run_examples(
+def _possible_flavours(languages_and_specs: LanguagesAndSpecs, spec: str, language: str) -> list[str]:
+    """Possible flavours will be like e.g. -jest-pact
+
+    Note the leading -, and the default of empty string for no flavour
+    """
+    return [""] + [
+        x.replace(f"{spec}-{language}", "") for x in languages_and_specs.flavours if x.startswith(f"{spec}-{language}-")
+    ]
+
+
+def _get_cells(suite: str, examples_path: pathlib.Path, languages_and_specs: LanguagesAndSpecs, examples) -> list[Cell]:
+    """Find every permutation of example, language, spec and flavour for a suite, in the order of the results matrix."""
+    manifest = _load_manifest(examples_path.parents[1])
+    cells = []
+    for example in examples:
+        for language in languages_and_specs.languages:
+            for spec in languages_and_specs.specs:
+                for flavour in _possible_flavours(languages_and_specs, spec, language):
+                    implementation = manifest.implementation(suite, example, spec, language, flavour)
+                    cells.append(
+                        Cell(
+                            suite=suite,
+                            example=example,
+                            spec=spec,
+                            language=language,
+                            flavour=flavour,
+                            makefile=implementation.makefile if implementation else None,
+                        )
+                    )
+    return cells
+
+
+class RunSettings(NamedTuple):
+    # Where the output of each example is written
+    logs_path: pathlib.Path
+    # How many of the last lines output by an example to keep, to show if it fails
+    tail_lines: int
+    # In seconds, how long each example can run for, and the time.monotonic() by which the whole run must finish
+    timeout: Optional[float]
+    deadline: Optional[float]
+
+    def timeout_for_example(self) -> Optional[float]:
+        """How long an example starting now can run for, the shorter of its own timeout and what is left of the run."""
+        if self.deadline is None:
+            return self.timeout
+        remaining = self.deadline - time.monotonic()
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+
+def _log_path(logs_path: pathlib.Path, cell: Cell) -> pathlib.Path:
+    """Where to write the output of a cell, i.e. <logs_path>/<suite>/<example>/<spec>/<implementation>.log"""
+    return logs_path.joinpath(cell.suite, cell.example, cell.spec, f"{cell.makefile.parent.name}.log")
+
+
+def _result_for_cell(
+    pool: ContainerPool, cache: ResultCache, settings: RunSettings, cell: Cell, log_path: pathlib.Path
+) -> tuple[int, str]:
+    """Run a cell, or use its cached result, returning the result and how it was arrived at."""
+    # i.e. <examples_path>/<example>/<spec>/<example>-<language><flavour>/Makefile
+    examples_path = cell.makefile.parents[3]
+    key = cache.key(
+        image=_image_name(cell.language, cell.spec),
+        example_dir=cell.makefile.parent,
+        expected_pacts_dir=examples_path.joinpath(cell.example).joinpath(cell.spec).joinpath("pacts"),
+    )
+    cached = cache.get(key)
+    if cached:
+        print(f"{bcolors.OKCYAN}Using cached result for {cell=}: {cached.result=}{bcolors.ENDC}")
+        return cached.result, OUTCOME_CACHED
+
+    timeout = settings.timeout_for_example()
+    if timeout is not None and timeout <= 0:
+        print(f"{bcolors.FAIL}Not running {cell=}, as the run has already timed out{bcolors.ENDC}")
+        return RESULT_TIMEOUT, OUTCOME_TIMED_OUT
+
+    run = _run_example(
+        pool=pool,
+        language=cell.language,
+        spec=cell.spec,
+        example_dir=cell.makefile.parent,
+        log_path=log_path,
+        tail_lines=settings.tail_lines,
+        timeout=timeout,
+    )
+    if not run:
+        return 1, OUTCOME_NOT_RUN
+
+    try:
+        if run.timed_out:
+            # Not cached, as it could well finish in time if run again
+            return RESULT_TIMEOUT, OUTCOME_TIMED_OUT
+
+        result = run.exit_code
+        outcome = OUTCOME_TESTS_FAILED
+        if result == 0:
+            # If the tests ran, now compare the pact for this example
+            with span("pact compare"):
+                result = _compare_example(
+                    output_dir=run.output_dir,
+                    examples_path=examples_path,
+                    example=cell.example,
+                    spec=cell.spec,
+                    language=cell.language,
+                )
+            outcome = OUTCOME_PACTS_MATCHED if result == 0 else OUTCOME_PACTS_DIFFERENT
+        if result == 0:
+            # Only a pass is cached, a failure may be down to something outside the example e.g. a flaky network
+            cache.put(key, result=result)
+    finally:
+        shutil.rmtree(run.workspace, ignore_errors=True)
+    return result, outcome
+
+
+def _run_cell(
+    pool: ContainerPool,
+    cache: ResultCache,
+    results_log: ResultsLog,
+    settings: RunSettings,
+    cell: Cell,
+) -> int:
+    start = time.perf_counter()
+    log_path = _log_path(settings.logs_path, cell)
+    with span(
+        "example",
+        suite=cell.suite,
+        example=cell.example,
+        spec=cell.spec,
+        language=cell.language,
+        flavour=cell.flavour,
+    ):
+        result, outcome = _result_for_cell(pool, cache, settings, cell, log_path=log_path)
+    results_log.write(
+        CellResult(
+            cell=cell,
+            result=result,
+            outcome=outcome,
+            duration=time.perf_counter() - start,
+            # A cached result has no output, nor does an example the run timed out before
+            log_path=log_path if log_path.exists() and outcome != OUTCOME_CACHED else None,
+        )
+    )
+    return result
+
+
+def _result_text(result: Optional[int]) -> str:
+    if result is None:
+        return "⏭ Not run"
+    if result == 0:
+        return "✅ Yes"
+    if result == RESULT_TIMEOUT:
+        return "⏱ Timeout"
+    return "❌ Error"
+
+
+def _build_examples_matrix(
     suite: str,
     examples_path: pathlib.Path,
     languages_and_specs: LanguagesAndSpecs,
     examples: ExamplesAndSpecs,
+    cells: list[Cell],
+    results: dict[Cell, int],
 ) -> list[list[str]]:
     # Construct the header row
     header = ["Example", "Description"]
@@ -229,42 +401,13 @@ def _run_examples(
         description_readme = examples_path.joinpath(example).joinpath("README.md")
         description, example_link = _extract_first_paragraph(source=description_readme, suite=suite, example=example)
 
-        example_results = [example_link, description]
-        for language in languages_and_specs.languages:
-            for spec in languages_and_specs.specs:
-                # Possible flavours will be like e.g. -jest-pact
-                # Note the leading -, and the default of empty string for no flavour
-                possible_flavours = [""] + [
-                    x.replace(f"{spec}-{language}", "")
-                    for x in languages_and_specs.flavours
-                    if x.startswith(f"{spec}-{language}-")
-                ]
-                makefiles = []
-                for flavour in possible_flavours:
-                    makefile = (
-                        examples_path.joinpath(example)
-                        .joinpath(spec)
-                        .joinpath(f"{example}-{language}{flavour}")
-                        .joinpath("Makefile")
-                    )
-                    makefiles.append(makefile)
-
-                for makefile in makefiles:
-                    if makefile.is_file():
-                        tmpdir = tempfile.TemporaryDirectory()
-                        result = _run_example(language=language, spec=spec, example_dir=makefile.parent, tmpdir=tmpdir)
-                        if result == 0:
-                            # If the tests ran, now compare the pact for this example
-                            result = _compare_example(
-                                tmpdir=tmpdir,
-                                examples_path=examples_path,
-                                example=example,
-                                spec=spec,
-                                language=language,
-                            )
-                        example_results.append("✅ Yes" if result == 0 else "❌ Error")
-                    else:
-                        example_results.append(f"-")
+        example_results = [example_link, _escape_markdown_text(description)]
+        # The cells are already in the same order as the header columns
+        for cell in [cell for cell in cells if cell.example == example]:
+            if cell.makefile:
+                example_results.append(_result_text(results.get(cell)))
+            else:
+                example_results.append(f"-")
         matrix.append(example_results)
 
     # To have something to populate in the table beyond headers when nothing is found
@@ -275,20 +418,20 @@ def _run_examples(
 
 
 def _get_examples(examples_path: pathlib.Path) -> list[str]:
-    examples = sorted([pathlib.Path(x).name for x in glob.glob(f"{examples_path}/*") if os.path.isdir(x)])
-
-    return examples
+    """The examples in a suite, i.e. for <root>/suites/<suite>"""
+    return _load_manifest(examples_path.parents[1]).examples(examples_path.name)
 
 
 def _scrape_annotated_code_blocks(examples_path, examples, languages_and_specs):
-    extensions = ["py", "js", "ts"]
-    excluded_dirs = ["node_modules"]
+    """Find the annotated code blocks in each implementation of each example.
 
-    # pattern_start = re.compile('(#|//) Pact annotated code block - (.*)\n(.*)End')
-    pattern_start = re.compile("(#|//)\s+Pact annotated code block - (.*)")
-    pattern_end = re.compile("(#|//)\s+End Pact annotated code block")
+    :return: dict of example, to spec, to language+flavour, to block name, to the code in the block
+    """
+    manifest = _load_manifest(examples_path.parents[1])
+    suite = examples_path.name
 
     code_blocks = {}
+    source_files = {}
 
     # Clunky setup dict of dicts
     for example in examples:
@@ -296,63 +439,22 @@ def _scrape_annotated_code_blocks(examples_path, examples, languages_and_specs):
         for spec in languages_and_specs.specs:
             code_blocks[example][spec] = {}
             for language in languages_and_specs.languages:
-                possible_flavours = [""] + [
-                    x.replace(f"{spec}-{language}", "")
-                    for x in languages_and_specs.flavours
-                    if x.startswith(f"{spec}-{language}-")
-                ]
-
-                for flavour in possible_flavours:
+                # Look for any additional variations of a language which have an example
+                for flavour in _possible_flavours(languages_and_specs, spec, language):
                     code_blocks[example][spec][f"{language}{flavour}"] = {}
+                    implementation = manifest.implementation(suite, example, spec, language, flavour)
+                    if implementation:
+                        source_files[(example, spec, f"{language}{flavour}")] = _source_files(implementation.path)
 
-    for example in examples:
-        print(f"{bcolors.HEADER}Looking for code blocks relating to: {bcolors.OKBLUE}{example=}{bcolors.ENDC}")
-        for spec in languages_and_specs.specs:
-            for language in languages_and_specs.languages:
-                # Look for any additional variations of a language which have an example
-                # Possible flavours will be like e.g. -jest-pact
-                # Note the leading -, and the default of empty string for no flavour
-                possible_flavours = [""] + [
-                    x.replace(f"{spec}-{language}", "")
-                    for x in languages_and_specs.flavours
-                    if x.startswith(f"{spec}-{language}-")
-                ]
-
-                for flavour in possible_flavours:
-                    example_language_spec_path = (
-                        examples_path.joinpath(example).joinpath(spec).joinpath(f"{example}-{language}{flavour}")
-                    )
-                    print(f"{example_language_spec_path=}, exists: {os.path.exists(example_language_spec_path)}")
-                    if os.path.exists(example_language_spec_path):
-                        source_files = []
-                        for root, subdirs, files in os.walk(examples_path.joinpath(example_language_spec_path)):
-                            # Don't look for e.g. .ts files under the excluded dir node_modules
-                            if not any([f"/{exclude}" in root for exclude in excluded_dirs]):
-                                source_files.extend(
-                                    [os.path.join(root, _file) for _file in files if _file.split(".")[-1] in extensions]
-                                )
-                        print(f"{source_files=}")
-
-                        for source_file in source_files:
-                            text = open(source_file).read()
-                            matches = pattern_start.finditer(text)
-                            for match in matches:
-                                block_name = match.group(2)
-                                end_of_matching_start_line = match.span()[1]
-                                end_block = pattern_end.search(text[end_of_matching_start_line:])
-                                start_of_matching_end_line = end_block.span()[0]
-                                print(
-                                    f"{end_block=}, code snippet goes between: {end_of_matching_start_line=} and {end_of_matching_start_line+start_of_matching_end_line}"
-                                )
-                                code_snippet = text[
-                                    end_of_matching_start_line : end_of_matching_start_line + start_of_matching_end_line
-                                ]
-                                print("code snippet START")
-                                for line in code_snippet.split("\n"):
-                                    print(line)
-                                print("code snippet END")
-
-                                code_blocks[example][spec][f"{language}{flavour}"][block_name] = code_snippet
+    print(f"{bcolors.HEADER}Looking for code blocks in {len(source_files)} implementations of {suite}{bcolors.ENDC}")
+    with span("code-block scrape", suite=suite):
+        scanner = CodeBlockScanner(examples_path.parents[1].joinpath(".cache").joinpath("code_blocks.json"))
+        scans = scanner.scan_all([path for paths in source_files.values() for path in paths])
+        scanner.save()
+
+    for (example, spec, language), paths in source_files.items():
+        for path in paths:
+            code_blocks[example][spec][language].update(scans[path].blocks)
 
     return code_blocks
 
@@ -391,136 +493,172 @@ def _generate_example_docs(root_path, examples_path, examples, languages_and_spe
     print(f"{bcolors.HEADER}{bcolors.BOLD}Generating example docs{bcolors.ENDC}")
     os.makedirs(root_path.joinpath("output").joinpath("Examples").joinpath(suite), exist_ok=True)
 
+    manifest = _load_manifest(examples_path.parents[1])
     code_blocks = _scrape_annotated_code_blocks(examples_path, examples, languages_and_specs)
-    print("code_blocks:")
-    print(json.dumps(code_blocks, indent=4))
+    docs_cache = DocsCache(examples_path.parents[1].joinpath(".cache").joinpath("docs.json"))
 
     pattern = re.compile("<!-- Annotated code block - (.*) -->")
 
     for example in examples:
-        print(f"{bcolors.HEADER}Example: {example}{bcolors.ENDC}")
-        input_path = examples_path.joinpath(example).joinpath("README.md")
-        output_path = root_path.joinpath("output").joinpath("Examples").joinpath(suite).joinpath(f"{example}.mdx")
-        print(f"reading from: {input_path}, writing to: {output_path=}")
-
-        if os.path.exists(input_path):
-            with open(input_path, "r") as input_readme:
-                with open(output_path, "w") as output_readme:
-                    output_readme.write('import Tabs from "@theme/Tabs";\n')
-                    output_readme.write('import TabItem from "@theme/TabItem";\n\n')
-
-                    for line in input_readme:
-                        block = pattern.match(line)
-                        if block:
-                            found_any = False
-                            block_name = block.group(1)
-
-                            output_readme.write("<Tabs>\n")
-                            for spec in code_blocks[example]:
-                                for language in code_blocks[example][spec]:
-                                    if block_name in code_blocks[example][spec][language]:
-                                        output_readme.write(
-                                            f'<TabItem value="{language}-{spec}" label="{language}-{spec}">\n\n'
-                                        )
-                                        output_readme.write(f"```{language.split('-')[0]}")
-                                        block_lines = code_blocks[example][spec][language][block_name].split("\n")
-
-                                        block_lines = _remove_leading_trailing_blank_lines_and_whitespace(block_lines)
-
-                                        output_readme.write("\n")
-                                        for block_line in block_lines:
-                                            output_readme.write(f"{block_line}\n")
-
-                                        output_readme.write("\n```\n")
-                                        output_readme.write("</TabItem>\n")
-
-                                        found_any = True
-
-                            if not found_any:
-                                output_readme.write(f'<TabItem value="None available" label="None available">\n\n')
-                                output_readme.write("TODO: No code snippets available for this section\n")
-                                output_readme.write("</TabItem>\n")
-
-                            output_readme.write("</Tabs>\n")
-
-                            # if example in code_blocks:
-                            #     output_readme.write(f"found these blocks: {code_blocks[example]}")
-                            # else:
-                            #     output_readme.write("TODO: No code examples available for this section")
-                        else:
+        with span("docs write", suite=suite, example=example):
+            print(f"{bcolors.HEADER}Example: {example}{bcolors.ENDC}")
+            input_path = manifest.readme(suite, example) or examples_path.joinpath(example).joinpath("README.md")
+            output_path = root_path.joinpath("output").joinpath("Examples").joinpath(suite).joinpath(f"{example}.mdx")
+            print(f"reading from: {input_path}, writing to: {output_path=}")
+
+            if manifest.readme(suite, example):
+                readme = input_path.read_text()
+
+                # Only generate the doc again if anything it is generated from has changed
+                spec_pacts = {spec: manifest.pacts(suite, example, spec) for spec in languages_and_specs.specs}
+                inputs_hash = _hash_inputs(
+                    readme,
+                    code_blocks[example],
+                    [[spec, _read_pact(pacts[0]) if pacts else None] for spec, pacts in spec_pacts.items()],
+                )
+                if docs_cache.is_current(output_path, inputs_hash):
+                    print(f"{bcolors.OKCYAN}Unchanged, not generating again: {output_path}{bcolors.ENDC}")
+                    continue
+
+                output_readme = io.StringIO()
+                output_readme.write('import Tabs from "@theme/Tabs";\n')
+                output_readme.write('import TabItem from "@theme/TabItem";\n\n')
+
+                for line in io.StringIO(readme):
+                    block = pattern.match(line)
+                    if block:
+                        found_any = False
+                        block_name = block.group(1)
+
+                        output_readme.write("<Tabs>\n")
+                        for spec in code_blocks[example]:
+                            for language in code_blocks[example][spec]:
+                                if block_name in code_blocks[example][spec][language]:
+                                    output_readme.write(
+                                        f'<TabItem value="{language}-{spec}" label="{language}-{spec}">\n\n'
+                                    )
+                                    output_readme.write(f"```{language.split('-')[0]}")
+                                    block_lines = code_blocks[example][spec][language][block_name].split("\n")
+
+                                    block_lines = _remove_leading_trailing_blank_lines_and_whitespace(block_lines)
+
+                                    output_readme.write("\n")
+                                    for block_line in block_lines:
+                                        output_readme.write(f"{block_line}\n")
+
+                                    output_readme.write("\n```\n")
+                                    output_readme.write("</TabItem>\n")
+
+                                    found_any = True
+
+                        if not found_any:
+                            output_readme.write(f'<TabItem value="None available" label="None available">\n\n')
+                            output_readme.write("TODO: No code snippets available for this section\n")
+                            output_readme.write("</TabItem>\n")
+
+                        output_readme.write("</Tabs>\n")
+
+                        # if example in code_blocks:
+                        #     output_readme.write(f"found these blocks: {code_blocks[example]}")
+                        # else:
+                        #     output_readme.write("TODO: No code examples available for this section")
+                    else:
+                        output_readme.write(line)
+
+                # Add the contents of the Pact for each spec
+                output_readme.write("\n## Pacts\n\n")
+                output_readme.write("<Tabs>\n")
+                for idx in range(len(languages_and_specs.specs)):
+                    spec = languages_and_specs.specs[idx]
+
+                    pacts = manifest.pacts(suite, example, spec)
+
+                    output_readme.write(f'<TabItem value="{spec}" label="{spec}">\n\n')
+                    if pacts:
+                        # Write the contents of the Pact, in a json code block
+                        output_readme.write("```json\n")
+                        spec_pact_lines = io.StringIO(_read_pact(pacts[0])).readlines()
+                        for line in spec_pact_lines:
                             output_readme.write(line)
+                        output_readme.write("```\n")
+                    else:
+                        output_readme.write(f"None available\n")
+                    output_readme.write("</TabItem>\n\n")
+
+                    # If there is another spec after this one, show a diff
+                    if idx + 1 < len(languages_and_specs.specs):
+                        next_spec = languages_and_specs.specs[idx + 1]
 
-                    # Add the contents of the Pact for each spec
-                    output_readme.write("\n## Pacts\n\n")
-                    output_readme.write("<Tabs>\n")
-                    for idx in range(len(languages_and_specs.specs)):
-                        spec = languages_and_specs.specs[idx]
-
-                        pacts = [pathlib.Path(x) for x in glob.glob(f"{examples_path}/{example}/{spec}/pacts/*")]
-
-                        output_readme.write(f'<TabItem value="{spec}" label="{spec}">\n\n')
-                        if pacts[0].is_file():
-                            # Write the contents of the Pact, in a json code block
-                            output_readme.write("```json\n")
-                            with open(pacts[0], "r") as p:
-                                spec_pact_lines = p.readlines()
-                                for line in spec_pact_lines:
-                                    output_readme.write(line)
+                        next_pacts = manifest.pacts(suite, example, next_spec)
+                        if pacts and next_pacts:
+                            # Read in the next spec
+                            next_spec_pact_lines = io.StringIO(_read_pact(next_pacts[0])).readlines()
+
+                            # Write the diff between the two Pact files in a TabItem
+                            output_readme.write(
+                                f'<TabItem value="{spec}-{next_spec} diff" label="{spec}-{next_spec} diff">\n\n'
+                            )
+                            output_readme.write("```diff\n")
+                            output_readme.writelines(
+                                unified_diff(spec_pact_lines, next_spec_pact_lines, fromfile=spec, tofile=next_spec)
+                            )
                             output_readme.write("```\n")
-                        else:
-                            output_readme.write(f"None available\n")
-                        output_readme.write("</TabItem>\n\n")
-
-                        # If there is another spec after this one, show a diff
-                        if idx + 1 < len(languages_and_specs.specs):
-                            next_spec = languages_and_specs.specs[idx + 1]
-
-                            next_pacts = [
-                                pathlib.Path(x) for x in glob.glob(f"{examples_path}/{example}/{next_spec}/pacts/*")
-                            ]
-                            if next_pacts[0].is_file():
-                                # Read in the next spec
-                                with open(next_pacts[0], "r") as p:
-                                    next_spec_pact_lines = p.readlines()
-
-                                # Write the diff between the two Pact files in a TabItem
-                                output_readme.write(
-                                    f'<TabItem value="{spec}-{next_spec} diff" label="{spec}-{next_spec} diff">\n\n'
-                                )
-                                output_readme.write("```diff\n")
-                                output_readme.writelines(
-                                    unified_diff(spec_pact_lines, next_spec_pact_lines, fromfile=spec, tofile=next_spec)
-                                )
-                                output_readme.write("```\n")
-                                output_readme.write("</TabItem>\n\n")
-                    output_readme.write("</Tabs>\n")
-
-
-def run_suite(root_path, suites_path, suite, languages=None, specs=None, examples=None):
-    print(f"{bcolors.HEADER}{bcolors.BOLD}Attempting to run examples for suite: {bcolors.OKBLUE}{suite}{bcolors.ENDC}")
-
-    examples_path = suites_path.joinpath(suite)
-
-    languages_path = root_path.joinpath("languages")
-
-    languages_and_specs = _get_languages_and_specs(
-        languages_path, languages=languages, specs=specs, examples_path=examples_path
-    )
+                            output_readme.write("</TabItem>\n\n")
+                output_readme.write("</Tabs>\n")
+                docs_cache.write(output_path, inputs_hash, output_readme.getvalue())
+
+    docs_cache.save()
+
+
+class SuitePlan(NamedTuple):
+    suite: str
+    examples_path: pathlib.Path
+    languages_and_specs: LanguagesAndSpecs
+    examples: list[str]
+    cells: list[Cell]
+
+
+def plan_suite(root_path, suites_path, suite, languages=None, specs=None, examples=None) -> SuitePlan:
+    with span("discovery", suite=suite):
+        print(f"{bcolors.HEADER}{bcolors.BOLD}Identifying examples for suite: {bcolors.OKBLUE}{suite}{bcolors.ENDC}")
+
+        examples_path = suites_path.joinpath(suite)
+
+        languages_path = root_path.joinpath("languages")
+
+        languages_and_specs = _get_languages_and_specs(
+            languages_path, languages=languages, specs=specs, examples_path=examples_path
+        )
+
+        print(f"{bcolors.OKBLUE}{languages_and_specs=}{bcolors.ENDC}")
+
+        if not examples:
+            examples = _get_examples(examples_path)
+        print(f"Found: {examples=}")
+
+        cells = _get_cells(suite, examples_path, languages_and_specs, examples)
+        return SuitePlan(
+            suite=suite,
+            examples_path=examples_path,
+            languages_and_specs=languages_and_specs,
+            examples=examples,
+            cells=cells,
+        )
 
-    print(f"{bcolors.OKBLUE}{languages_and_specs=}{bcolors.ENDC}")
 
-    if not examples:
-        examples = _get_examples(examples_path)
-    print(f"Found: {examples=}")
+def report_suite(root_path, suites_path, plan: SuitePlan, results: dict[Cell, int]):
+    suite = plan.suite
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Reporting results for suite: {bcolors.OKBLUE}{suite}{bcolors.ENDC}")
 
-    print("Attempt to build all available, and create a table of all permutations")
-    languages_and_examples_and_specs_table = _run_examples(suite, examples_path, languages_and_specs, examples)
+    print("Create a table of all permutations")
+    with span("table render", suite=suite):
+        languages_and_examples_and_specs_table = _build_examples_matrix(
+            suite, plan.examples_path, plan.languages_and_specs, plan.examples, plan.cells, results
+        )
 
-    # print('Attempt to build all available, and create a table of all permutations')
-    # languages_and_specs_table = _build_images(languages_path, languages_and_specs)
-    #
+        from tabulate import tabulate
 
-    results = tabulate(languages_and_examples_and_specs_table, headers="firstrow", tablefmt="github")
+        results = tabulate(languages_and_examples_and_specs_table, headers="firstrow", tablefmt="github")
 
     print()
     print(" STORE BELOW IN .MD")
@@ -536,17 +674,34 @@ def run_suite(root_path, suites_path, suite, languages=None, specs=None, example
         suite_readme = suites_path.joinpath(suite).joinpath("README.md")
         suite_readme_description, _ = _extract_first_paragraph(suite_readme)
 
+        # Each section starts with the blank line separating it from the one before, so the file never ends with a
+        # blank line and is already as mdformat would format it
+        f.write("\n")
         f.write(f"## {suite}")
         f.write("\n")
         f.write("\n")
-        f.write(suite_readme_description)
+        f.write(_escape_markdown_text(suite_readme_description))
         f.write("\n")
         f.write("\n")
         f.write(results)
         f.write("\n")
-        f.write("\n")
 
-    _generate_example_docs(root_path, examples_path, examples, languages_and_specs, suite)
+    _generate_example_docs(root_path, plan.examples_path, plan.examples, plan.languages_and_specs, suite)
+
+
+def list_suite(plan: SuitePlan):
+    """Print the examples which would be run for a suite, and those which are missing for any language and spec."""
+    print()
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Suite: {bcolors.OKBLUE}{plan.suite}{bcolors.ENDC}")
+    print(f"{plan.languages_and_specs=}")
+    for cell in plan.cells:
+        name = f"{cell.example} {cell.spec} {cell.language}{cell.flavour}"
+        if cell.makefile:
+            print(f"{bcolors.OKGREEN}run{bcolors.ENDC}      {name}: {cell.makefile.parent}")
+        else:
+            print(f"{bcolors.WARNING}missing{bcolors.ENDC}  {name}")
+    to_run = [cell for cell in plan.cells if cell.makefile]
+    print(f"{len(to_run)} of {len(plan.cells)} examples would be run for {plan.suite}")
 
 
 def prepare_output(root_path):
@@ -560,6 +715,8 @@ def prepare_output(root_path):
         - `Yes`: Example runs successfully, and generates the expected Pactfile (Consumer), or verifies successfully against the provided Pactfile (Provider)
         - `-`: No example to test found
         - `Error`: Found an example, but the test was unsuccessful
+        - `Timeout`: Found an example, but the test didn't finish in time
+        - `Not run`: Found an example, but it wasn't run as another example failed first, with `--fail-fast`
     """
     )
 
@@ -575,7 +732,36 @@ def prepare_output(root_path):
     print(f"writing to: {output_path=}")
     with open(output_path, "w") as f:
         f.write(details)
-        f.write("\n")
+
+
+def _merge_shards(
+    root_path: pathlib.Path,
+    suites_path: pathlib.Path,
+    plans: List[SuitePlan],
+    results_paths: List[pathlib.Path],
+    report_path: pathlib.Path,
+    history: History,
+):
+    """Report the results written by each shard of a run, as if every example had been run here."""
+    cells = [cell for plan in plans for cell in plan.cells]
+    cell_results = _read_cell_results(results_paths, cells)
+    print(f"Merging the results of {len(cell_results)} examples from {len(results_paths)} shards")
+
+    prepare_output(root_path)
+    # Written again as one, so the merged report looks the same as that of a run on a single node
+    results_log = ResultsLog(report_path.joinpath("results.jsonl"))
+    results_log.start(cells)
+    for cell_result in cell_results:
+        results_log.write(cell_result)
+    results_log.close()
+    _write_junit(report_path.joinpath("junit.xml"), cells, cell_results)
+    history.update(cell_results)
+    history.save()
+
+    # Any cell without a result, e.g. its shard failed before it was run, is reported as not run
+    results = {x.cell: x.result for x in cell_results}
+    for plan in plans:
+        report_suite(root_path=root_path, suites_path=suites_path, plan=plan, results=results)
 
 
 @click.command()
@@ -583,21 +769,113 @@ def prepare_output(root_path):
 @click.option("--language", help="Which language to run, multiple may be provided", multiple=True)
 @click.option("--spec", help="Which spec to run, multiple may be provided", multiple=True)
 @click.option("--example", help="Which example, multiple may be provided", multiple=True)
-def main(suite, language, spec, example):
+@click.option(
+    "--jobs",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="How many examples to run at once, across all suites",
+)
+@click.option(
+    "--max-container-uses",
+    default=10,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="How many examples to run in a pooled container before it is replaced, 1 for a new container per example",
+)
+@click.option("--no-cache", is_flag=True, help="Run every example, even if there is a cached result for it")
+@click.option(
+    "--list",
+    "--dry-run",
+    "list_only",
+    is_flag=True,
+    help="Only list the examples which would be run, without running them or needing Docker",
+)
+@click.option(
+    "--trace-dir",
+    default=".cache/trace",
+    show_default=True,
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    help="Where to write a Chrome trace of the time spent in each phase, and a summary of it, relative to the root",
+)
+@click.option(
+    "--report-dir",
+    default=".cache/report",
+    show_default=True,
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    help="Where to write results.jsonl as each example finishes, and junit.xml at the end, relative to the root",
+)
+@click.option(
+    "--tail-lines",
+    default=100,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="How many of the last lines output by a failing example to show, all of it is in its log file",
+)
+@click.option(
+    "--timeout",
+    default=900,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="How many seconds each example can run for before it is stopped, and reported as timed out. 0 for no limit",
+)
+@click.option(
+    "--global-timeout",
+    default=0,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="How many seconds the whole run can take, examples still running or to run are then timed out. 0 for no limit",
+)
+@click.option("--fail-fast", is_flag=True, help="Stop starting examples after the first one fails")
+@click.option(
+    "--shard",
+    callback=_parse_shard,
+    metavar="I/N",
+    help="Only run the I-th of N shards of the examples, split by how long each took last time, e.g. 2/4",
+)
+@click.option(
+    "--merge",
+    multiple=True,
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="Don't run anything, report the results.jsonl written by each shard instead, multiple may be provided. Any "
+    "which don't exist are skipped, and their examples reported as not run",
+)
+@click.option(
+    "--list-images",
+    is_flag=True,
+    help="Only list the images needed by the examples which would be run, e.g. by a shard, so only those are built",
+)
+def main(
+    suite,
+    language,
+    spec,
+    example,
+    jobs,
+    max_container_uses,
+    no_cache,
+    list_only,
+    trace_dir,
+    report_dir,
+    tail_lines,
+    timeout,
+    global_timeout,
+    fail_fast,
+    shard,
+    merge,
+    list_images,
+):
     print(f"{bcolors.HEADER}{bcolors.BOLD}Identifying and running available examples{bcolors.ENDC}")
     root_path = pathlib.Path.cwd().parent if pathlib.Path.cwd().name == "scripts" else pathlib.Path.cwd()
 
-    prepare_output(root_path)
-
     suites_path = root_path.joinpath("suites")
 
     if suite != "all":
         suites = [suite]
     else:
-        suites = _get_examples(suites_path)
+        suites = _load_manifest(root_path).suites()
 
-    for suite in suites:
-        run_suite(
+    plans = [
+        plan_suite(
             root_path=root_path,
             suites_path=suites_path,
             suite=suite,
@@ -605,6 +883,79 @@ def main(suite, language, spec, example):
             specs=list(spec),
             examples=list(example),
         )
+        for suite in suites
+    ]
+
+    if list_only:
+        for plan in plans:
+            list_suite(plan)
+        return
+
+    cells = [cell for plan in plans for cell in plan.cells]
+    history = History(root_path.joinpath(".cache").joinpath("history.json"))
+    if merge:
+        _merge_shards(root_path, suites_path, plans, merge, root_path.joinpath(report_dir), history)
+        TRACER.save(root_path.joinpath(trace_dir))
+        return
+
+    if shard:
+        # Each shard only writes its own results, the output and docs come from merging every shard's results
+        cells, totals = _shard_cells(cells, shard, lambda x: history.get(x) and history.get(x).duration)
+        print(
+            f"Running shard {shard.index}/{shard.count}: {len(cells)} examples, estimated to take "
+            f"{totals[shard.index - 1]:.0f}s of the {sum(totals):.0f}s for every shard"
+        )
+
+    if list_images:
+        for image in sorted({_image_name(cell.language, cell.spec) for cell in cells}):
+            print(image)
+        return
+
+    if not shard:
+        prepare_output(root_path)
+
+    # Imported here, as docker is slow to import and isn't needed to only list the examples
+    import docker
+
+    # Every cell from every suite goes into a single queue, so the workers are kept busy across suite boundaries
+    client = docker.from_env()
+    _collect_garbage(client)
+    pool = ContainerPool(client=client, max_uses=max_container_uses)
+    cache = ResultCache(
+        cache_path=root_path.joinpath(".cache").joinpath("results"),
+        client=client,
+        # Any change to how pacts are normalised and compared invalidates every cached result
+        fingerprint=COMPARISON_FINGERPRINT,
+        reuse=not no_cache,
+    )
+    # Run the examples which failed last time first, then the slowest, so failures are seen as early as possible
+    ordered_cells = history.order(cells)
+    results_log = ResultsLog(root_path.joinpath(report_dir).joinpath("results.jsonl"))
+    print(f"Writing the result of each example as it finishes to: {results_log.path}")
+    results_log.start(cells)
+    try:
+        settings = RunSettings(
+            logs_path=root_path.joinpath(report_dir).joinpath("logs"),
+            tail_lines=tail_lines,
+            timeout=timeout or None,
+            deadline=time.monotonic() + global_timeout if global_timeout else None,
+        )
+        run_cell = functools.partial(_run_cell, pool, cache, results_log, settings)
+        with _interrupt_on_sigterm():
+            results = _run_cells(ordered_cells, run_cell, jobs=jobs, fail_fast=fail_fast)
+    finally:
+        # On every way out, including Ctrl-C, so no containers or workspaces are left behind
+        pool.close()
+        results_log.close()
+        history.update(results_log.results())
+        history.save()
+    _write_junit(root_path.joinpath(report_dir).joinpath("junit.xml"), cells, results_log.results())
+
+    if not shard:
+        for plan in plans:
+            report_suite(root_path=root_path, suites_path=suites_path, plan=plan, results=results)
+
+    TRACER.save(root_path.joinpath(trace_dir))
 
 
 if __name__ == "__main__":
@@ -8,10 +8,8 @@ echo "${BOLD}${MAGENTA}$0 starting up"
 if [ -z "$1" ]
   then
     echo "${BOLD}${MAGENTA}Running all available suites"
-    scripts/run_examples.py
+    scripts/run_examples.py --jobs "${JOBS:-1}"
 else
     echo "${BOLD}${MAGENTA}Running single suite: ${BLUE}$1"
-    scripts/run_examples.py "$1"
+    scripts/run_examples.py --jobs "${JOBS:-1}" --suite "$1"
 fi
-
-mdformat ./output
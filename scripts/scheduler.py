@@ -0,0 +1,69 @@
+import concurrent.futures
+import pathlib
+from typing import Callable, NamedTuple, Optional
+
+from shared import bcolors
+
+
+class Cell(NamedTuple):
+    """A single (suite, example, spec, language, flavour) permutation, i.e. one cell of the results matrix.
+
+    flavour is e.g. "-jest-pact", with the default of empty string for no flavour. makefile is None when there is no
+    example to run for this permutation, in which case the cell is shown as "-".
+    """
+
+    suite: str
+    example: str
+    spec: str
+    language: str
+    flavour: str
+    makefile: Optional[pathlib.Path]
+
+
+def _run_cells(
+    cells: list[Cell], run_cell: Callable[[Cell], int], jobs: int = 1, fail_fast: bool = False
+) -> dict[Cell, int]:
+    """Run every runnable cell, across all suites, on a bounded pool of workers.
+
+    :param cells: Cells to run, in the order they should be picked up from the queue
+    :param run_cell: Called for each cell with a Makefile, returning 0 for success
+    :param jobs: Maximum number of cells to run at once
+    :param fail_fast: Stop starting cells after the first one fails, those already running are finished
+    :return: The result for each cell which was run
+    """
+    runnable = [cell for cell in cells if cell.makefile]
+    print(f"{bcolors.HEADER}{bcolors.BOLD}Running {len(runnable)} example(s) with {jobs=}{bcolors.ENDC}")
+
+    results = {}
+    if jobs <= 1:
+        for cell in runnable:
+            results[cell] = run_cell(cell)
+            if fail_fast and results[cell] != 0:
+                _print_failed_fast(len(runnable) - len(results))
+                break
+        return results
+
+    # The executor holds a single queue of all the work, and hands out cells as workers become free
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="example")
+    try:
+        futures = {executor.submit(run_cell, cell): cell for cell in runnable}
+        stopped = False
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            cell = futures[future]
+            results[cell] = future.result()
+            if fail_fast and results[cell] != 0 and not stopped:
+                # Cancelling only succeeds for cells which haven't started
+                _print_failed_fast(len([x for x in futures if x.cancel()]))
+                stopped = True
+        return results
+    finally:
+        # If interrupted e.g. by Ctrl-C, don't start any more cells, or wait for those running before cleaning up
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _print_failed_fast(not_started: int):
+    print(
+        f"{bcolors.FAIL}{bcolors.BOLD}Stopping after the first failure, {not_started} example(s) not run{bcolors.ENDC}"
+    )
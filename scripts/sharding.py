@@ -0,0 +1,57 @@
+from typing import Callable, NamedTuple, Optional
+
+import click
+
+from history import _cell_key
+from scheduler import Cell
+
+# How long to assume a cell takes when there is no history for any cell, in seconds
+DEFAULT_DURATION = 60.0
+
+
+class Shard(NamedTuple):
+    # 1-based, i.e. from 1 to count
+    index: int
+    count: int
+
+
+def _parse_shard(ctx, param, value: Optional[str]) -> Optional[Shard]:
+    """Click callback for e.g. --shard 2/4, the second of four shards."""
+    if value is None:
+        return None
+    try:
+        index, count = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise click.BadParameter(f"{value!r} is not of the form i/n, e.g. 2/4")
+    if not 1 <= index <= count:
+        raise click.BadParameter(f"{value!r} must have 1 <= i <= n")
+    return Shard(index=index, count=count)
+
+
+def _shard_cells(
+    cells: list[Cell], shard: Shard, duration: Callable[[Cell], Optional[float]]
+) -> tuple[list[Cell], list[float]]:
+    """The runnable cells for a shard, so every shard takes about the same time.
+
+    Each cell, slowest first, goes to whichever shard has the least to do so far. The split only depends on the cells
+    and their durations, so every node given the same history makes the same split. Cells without a duration are
+    assumed to take the median of those with one.
+
+    :param duration: How long a cell took last time, if known
+    :return: The cells for the shard, in the order given, and the estimated total duration of every shard
+    """
+    runnable = [cell for cell in cells if cell.makefile]
+    durations = {cell: duration(cell) for cell in runnable}
+    known = sorted(x for x in durations.values() if x is not None)
+    default = known[len(known) // 2] if known else DEFAULT_DURATION
+    # A recorded duration of 0 is still known, so it mustn't be given the default
+    weights = {cell: x if x is not None else default for cell, x in durations.items()}
+
+    totals = [0.0] * shard.count
+    assigned = {}
+    # Ties are broken by the name of the cell and the number of the shard, so never depend on the order given
+    for cell in sorted(runnable, key=lambda x: (-weights[x], _cell_key(x))):
+        idx = min(range(shard.count), key=lambda x: (totals[x], x))
+        totals[idx] += weights[cell]
+        assigned[cell] = idx
+    return [cell for cell in runnable if assigned[cell] == shard.index - 1], totals
@@ -1,6 +1,7 @@
 import glob
 import os
 import pathlib
+import threading
 from typing import NamedTuple
 
 
@@ -27,45 +28,25 @@ class ExamplesAndSpecs(NamedTuple):
     specs: list[str]
 
 
-RESULT = {0: "SUCCESS", 1: "ERROR"}
+# An example which didn't finish in time, distinct from one which failed
+RESULT_TIMEOUT = 2
+
+RESULT = {0: "SUCCESS", 1: "ERROR", RESULT_TIMEOUT: "TIMEOUT"}
 
 
 def _get_languages_and_specs(
     languages_path: pathlib.Path, languages=None, specs=None, examples_path=None
 ) -> LanguagesAndSpecs:
-    if not languages:
-        # Find the languages, ignoring any directories which end with 'skip'
-        languages = sorted(
-            [
-                pathlib.Path(x).name
-                for x in glob.glob(f"{languages_path}/*")
-                if os.path.isdir(x) and not pathlib.Path(x).name.endswith("skip")
-            ]
-        )
-    if not specs:
-        specs = sorted(set([pathlib.Path(x).name for x in glob.glob(f"{languages_path}/*/*") if os.path.isdir(x)]))
+    # Imported here, since the manifest uses the types defined in this module
+    from manifest import _load_manifest
 
-    # Try and find any additional flavours, i.e. variations of a language
-    # This will find e.g. consumer-features/v2/example-hello-world-js-jest-pact and identify v2-js-jest-pact
-    if examples_path:
-        flavours = set()
-        for spec in specs:
-            for language in languages:
-                additional_flavours = sorted(
-                    set(
-                        [
-                            f'{spec}-{language}-{pathlib.Path(x).name.split(f"-{language}-")[1]}'
-                            for x in glob.glob(f"{examples_path}/*/{spec}/*")
-                            if os.path.isdir(x) and f"-{language}-" in x
-                        ]
-                    )
-                )
-                for additional_flavour in additional_flavours:
-                    flavours.add(additional_flavour)
-
-    else:
-        flavours = []
-    return LanguagesAndSpecs(languages=languages, specs=specs, flavours=list(flavours))
+    # Any languages which end with 'skip' are ignored, and if looking at a suite of examples, flavours are also found
+    # i.e. variations of a language. This will find e.g. consumer-features/v2/example-hello-world-js-jest-pact and
+    # identify v2-js-jest-pact
+    manifest = _load_manifest(languages_path.parent)
+    return manifest.languages_and_specs(
+        languages=languages, specs=specs, suite=examples_path.name if examples_path else None
+    )
 
 
 def _get_examples_and_specs(languages_path: pathlib.Path, examples, specs) -> LanguagesAndSpecs:
@@ -75,3 +56,17 @@ def _get_examples_and_specs(languages_path: pathlib.Path, examples, specs) -> La
         specs = sorted(set([pathlib.Path(x).name for x in glob.glob(f"{languages_path}/*/*") if os.path.isdir(x)]))
 
     return LanguagesAndSpecs(examples=examples, specs=specs)
+
+
+def _write_atomically(path: pathlib.Path, text: str):
+    """Write text to path via a temporary file alongside it, so the file is never seen partly written."""
+    os.makedirs(path.parent, exist_ok=True)
+    # Unique to this process and thread, so concurrent writers never share a temporary file
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
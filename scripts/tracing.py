@@ -0,0 +1,140 @@
+import contextlib
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import NamedTuple
+
+from shared import _write_atomically, bcolors
+
+
+class Span(NamedTuple):
+    name: str
+    # Nanoseconds since the tracer was created
+    start: int
+    end: int
+    thread: str
+    # e.g. suite, example, spec, language and flavour, including those of any spans it was nested in
+    tags: dict
+
+    @property
+    def duration(self) -> float:
+        """In seconds."""
+        return (self.end - self.start) / 1e9
+
+
+class Tracer:
+    """Timed spans for each phase of a run, so it can be seen where the time goes.
+
+    Spans are nested per thread, and a span is tagged with the tags of every span it is nested in, so e.g. the
+    container wait inside an example is tagged with the example it was for. The spans can be written as a Chrome trace,
+    to view in chrome://tracing or https://ui.perfetto.dev, and as a summary of the time spent in each phase.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter_ns()
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list[dict]:
+        """The tags of the spans this thread is currently in, innermost last."""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name: str, **tags):
+        stack = self._stack()
+        tags = {**(stack[-1] if stack else {}), **{key: value for key, value in tags.items() if value is not None}}
+        stack.append(tags)
+        start = time.perf_counter_ns() - self._origin
+        try:
+            yield tags
+        finally:
+            end = time.perf_counter_ns() - self._origin
+            stack.pop()
+            span = Span(name=name, start=start, end=end, thread=threading.current_thread().name, tags=tags)
+            with self._lock:
+                self._spans.append(span)
+
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return sorted(self._spans, key=lambda x: x.start)
+
+    def chrome_trace(self) -> dict:
+        """The spans in the Chrome trace event format, as complete events with a row per thread."""
+        pid = os.getpid()
+        spans = self.spans()
+        threads = {thread: idx for idx, thread in enumerate(dict.fromkeys(x.thread for x in spans))}
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}}
+            for thread, tid in threads.items()
+        ]
+        events += [
+            {
+                "name": span.name,
+                "cat": "run_examples",
+                "ph": "X",
+                # Microseconds
+                "ts": span.start / 1000,
+                "dur": (span.end - span.start) / 1000,
+                "pid": pid,
+                "tid": threads[span.thread],
+                "args": span.tags,
+            }
+            for span in spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self, slowest: int = 20) -> dict:
+        """The count and time spent in each phase, and the slowest spans with their tags."""
+        spans = self.spans()
+        phases = {}
+        for span in spans:
+            phase = phases.setdefault(span.name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            phase["count"] += 1
+            phase["total_seconds"] += span.duration
+            phase["max_seconds"] = max(phase["max_seconds"], span.duration)
+        for phase in phases.values():
+            phase["mean_seconds"] = phase["total_seconds"] / phase["count"]
+        return {
+            "wall_seconds": (max(x.end for x in spans) - min(x.start for x in spans)) / 1e9 if spans else 0.0,
+            "phases": dict(sorted(phases.items(), key=lambda x: x[1]["total_seconds"], reverse=True)),
+            "slowest": [
+                {"name": x.name, "seconds": x.duration, "thread": x.thread, **x.tags}
+                for x in sorted(spans, key=lambda x: x.duration, reverse=True)[:slowest]
+            ],
+        }
+
+    def save(self, trace_dir: pathlib.Path):
+        """Write trace.json and summary.json to trace_dir, and print where the time was spent."""
+        summary = self.summary()
+        try:
+            _write_atomically(trace_dir.joinpath("trace.json"), json.dumps(self.chrome_trace()))
+            _write_atomically(trace_dir.joinpath("summary.json"), json.dumps(summary, indent=2))
+        except OSError as ex:
+            print(f"{bcolors.WARNING}Unable to save the trace to {trace_dir}: {ex}{bcolors.ENDC}")
+            return
+
+        print()
+        print(
+            f"{bcolors.HEADER}{bcolors.BOLD}Time spent in each phase, over {summary['wall_seconds']:.1f}s{bcolors.ENDC}"
+        )
+        print(f"{'phase':>20} {'count':>6} {'total':>9} {'mean':>9} {'max':>9}")
+        for name, phase in summary["phases"].items():
+            print(
+                f"{name:>20} {phase['count']:>6} {phase['total_seconds']:>8.2f}s "
+                f"{phase['mean_seconds']:>8.3f}s {phase['max_seconds']:>8.3f}s"
+            )
+        print(f"Trace written to: {trace_dir.joinpath('trace.json')}, summary: {trace_dir.joinpath('summary.json')}")
+
+
+# Shared by every module, so the phases of a run don't need the tracer passing down to them
+TRACER = Tracer()
+
+
+def span(name: str, **tags):
+    """Time the enclosed block as a span of the shared tracer."""
+    return TRACER.span(name, **tags)
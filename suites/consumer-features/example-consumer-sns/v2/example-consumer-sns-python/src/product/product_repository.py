@@ -1,4 +1,7 @@
-from src.product.product import Product, Products
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping
+
+from src.product.product import Product
 
 
 # To try and keep the examples as similar as possible, the service class follows
@@ -12,24 +15,83 @@ def singleton(cls):
             instances[cls] = cls()
         return instances[cls]
 
+    # So a repository of its own can still be made, e.g. for tests and benchmarks
+    getinstance.__wrapped__ = cls
     return getinstance
 
 
 @singleton
 class ProductRepository:
     def __init__(self):
-        self.products: Products = {
-            "09": Product("09", "CREDIT_CARD", "Gem Visa", "v1"),
-            "10": Product("10", "CREDIT_CARD", "28 Degrees", "v1"),
-            "11": Product("11", "PERSONAL_LOAN", "MyFlexiPay", "v2"),
-        }
+        self.products: Dict[str, Product] = {}
+        # Secondary indexes, of the ids of the products of each type and version, in the order they were first stored
+        self._by_type: Dict[str, Dict[str, None]] = {}
+        self._by_version: Dict[str, Dict[str, None]] = {}
+        # Whether self.products has been handed out by fetch_all, so must be copied before it is next changed
+        self._shared = False
+
+        for product in [
+            Product(id="09", name="Gem Visa", type="CREDIT_CARD", version="v1"),
+            Product(id="10", name="28 Degrees", type="CREDIT_CARD", version="v1"),
+            Product(id="11", name="MyFlexiPay", type="PERSONAL_LOAN", version="v2"),
+        ]:
+            self._apply(product)
+
+    async def fetch_all(self) -> Mapping[str, Product]:
+        """A read only snapshot of every product, which later changes don't affect.
 
-    async def fetch_all(self) -> Products:
-        return self.products
+        Nothing is copied until the repository is next changed, and then only once however many
+        snapshots there are.
+        """
+        self._shared = True
+        return MappingProxyType(self.products)
 
     async def get_by_id(self, id: str) -> Product:
         return self.products[id]
 
-    async def insert(self, product: Product) -> Products:
+    async def find_by_type(self, type: str) -> List[Product]:
+        return [self.products[x] for x in self._by_type.get(type, ())]
+
+    async def find_by_version(self, version: str) -> List[Product]:
+        return [self.products[x] for x in self._by_version.get(version, ())]
+
+    async def insert(self, product: Product) -> Product:
+        """Insert the product, or replace the product with the same id."""
+        return (await self.bulk_upsert([product]))[0]
+
+    async def bulk_upsert(self, products: Iterable[Product]) -> List[Product]:
+        """Insert or replace every product, all at once, so no snapshot or lookup ever sees only some of them.
+
+        :raises ValueError: If any of the products has no id, in which case none of them are stored
+        """
+        products = list(products)
+        if any(not product.id for product in products):
+            raise ValueError("Every product must have an id")
+
+        # Nothing here awaits, so no other coroutine can run part way through, and no lock is needed
+        if self._shared:
+            self.products = dict(self.products)
+            self._shared = False
+        for product in products:
+            self._apply(product)
+        return products
+
+    def _apply(self, product: Product):
+        previous = self.products.get(product.id)
+        if previous and previous.type == product.type and previous.version == product.version:
+            # Still indexed under the same type and version
+            self.products[product.id] = product
+            return
+        if previous:
+            _unindex(self._by_type, previous.type, previous.id)
+            _unindex(self._by_version, previous.version, previous.id)
         self.products[product.id] = product
-        return self.products
+        self._by_type.setdefault(product.type, {})[product.id] = None
+        self._by_version.setdefault(product.version, {})[product.id] = None
+
+
+def _unindex(index: Dict[str, Dict[str, None]], key: str, id: str):
+    ids = index[key]
+    del ids[id]
+    if not ids:
+        del index[key]
@@ -1,4 +1,7 @@
+import asyncio
+import copy
 import json
+import logging
 
 import pytest
 
@@ -6,6 +9,23 @@ from src.product.product_repository import ProductRepository
 from src._lambda import product
 
 
+def _batch(size: int) -> dict:
+    """An SNS event of size records, each a copy of the example SNS message with its own message and product id."""
+    with open('tests/resources/events/update.json') as f:
+        payload = json.load(f)
+    template = payload['Records'][0]
+
+    records = []
+    for idx in range(size):
+        record = copy.deepcopy(template)
+        message = json.loads(record['Sns']['Message'])
+        message['id'] = f'batch-product-{idx}'
+        record['Sns']['MessageId'] = f'batch-message-{idx}'
+        record['Sns']['Message'] = json.dumps(message)
+        records.append(record)
+    return {'Records': records}
+
+
 @pytest.mark.asyncio
 async def test_lambda_consumes_a_valid_sns_event(mocker):
     # (1) Arrange
@@ -22,9 +42,99 @@ async def test_lambda_consumes_a_valid_sns_event(mocker):
     # (2) Act: call the actual lambda with a valid SNS message
     result = await product.handler(payload)
 
-    # (3) Assert: should return
-    assert result == num_products + 1
+    # (3) Assert: should report no failures, and have added the product
+    assert result == {'batchItemFailures': []}
+    assert len(await repository.fetch_all()) == num_products + 1
+    stored = await repository.get_by_id('some-uuid-1234-5678')
+    assert (stored.name, stored.type) == ('Some Product', 'Product Range')
 
     # Assert: check that the implementation code was invoked
     # if it gets here, it also meant it didn't encounter any issues
     assert spy.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_lambda_consumes_every_record_of_a_large_batch():
+    repository = ProductRepository()
+
+    result = await product.handler(_batch(5000))
+
+    assert result == {'batchItemFailures': []}
+    products = await repository.fetch_all()
+    assert all(f'batch-product-{idx}' in products for idx in range(5000))
+
+
+@pytest.mark.asyncio
+async def test_lambda_reports_the_records_which_failed():
+    event = _batch(1000)
+    # Not JSON, and missing the product id, respectively
+    event['Records'][10]['Sns']['Message'] = 'not json'
+    event['Records'][500]['Sns']['Message'] = json.dumps({'type': 'Product Range', 'name': 'No id'})
+
+    result = await product.handler(event)
+
+    # Only those which failed are reported, so only they are delivered again
+    assert result == {
+        'batchItemFailures': [{'itemIdentifier': 'batch-message-10'}, {'itemIdentifier': 'batch-message-500'}]
+    }
+
+
+@pytest.mark.asyncio
+async def test_lambda_consumes_sqs_records():
+    # SQS records of the same messages, one delivered raw and one as an SNS notification
+    sns_records = _batch(2)['Records']
+    event = {
+        'Records': [
+            {'messageId': 'sqs-message-0', 'body': sns_records[0]['Sns']['Message']},
+            {'messageId': 'sqs-message-1', 'body': json.dumps(sns_records[1]['Sns'])},
+            {'messageId': 'sqs-message-2', 'body': 'not json'},
+        ]
+    }
+
+    result = await product.handler(event)
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'sqs-message-2'}]}
+
+
+@pytest.mark.asyncio
+async def test_lambda_reports_malformed_records_without_failing_the_batch():
+    event = _batch(3)
+    # Neither an SNS nor an SQS record, and an SNS record of a message which isn't JSON, without its message id
+    event['Records'][0] = {'eventSource': 'aws:unknown'}
+    event['Records'][2]['Sns']['Message'] = 'not json'
+    del event['Records'][2]['Sns']['MessageId']
+
+    result = await product.handler(event)
+
+    # Reported by their position in the batch, as they have no message id, while the rest still succeed
+    assert result == {'batchItemFailures': [{'itemIdentifier': '0'}, {'itemIdentifier': '2'}]}
+
+
+@pytest.mark.asyncio
+async def test_lambda_caps_how_many_records_are_processed_at_once(mocker):
+    in_flight = 0
+    most_in_flight = 0
+
+    async def slow_update(message):
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+
+    mocker.patch.object(product, 'receive_product_update', slow_update)
+
+    result = await product.handler(_batch(200))
+
+    assert result == {'batchItemFailures': []}
+    assert most_in_flight == product.MAX_CONCURRENCY
+
+
+@pytest.mark.asyncio
+async def test_lambda_samples_what_it_logs(caplog):
+    caplog.set_level(logging.INFO, logger=product.__name__)
+
+    await product.handler(_batch(1000))
+
+    processing = [x for x in caplog.records if x.msg.startswith('Processing record')]
+    assert len(processing) == 1000 // product.LOG_SAMPLE_RATE
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.product.product import Product
+from src.product.product_repository import ProductRepository
+
+
+@pytest.fixture
+def repository():
+    # A repository of its own, rather than the one shared by the service
+    return ProductRepository.__wrapped__()
+
+
+@pytest.mark.asyncio
+async def test_find_by_type_and_version(repository):
+    assert [x.id for x in await repository.find_by_type("CREDIT_CARD")] == ["09", "10"]
+    assert [x.name for x in await repository.find_by_type("PERSONAL_LOAN")] == ["MyFlexiPay"]
+
+    await repository.insert(Product(id="12", name="Platinum", type="CREDIT_CARD", version="v3"))
+
+    assert [x.id for x in await repository.find_by_type("CREDIT_CARD")] == ["09", "10", "12"]
+    assert [x.id for x in await repository.find_by_version("v1")] == ["09", "10"]
+    assert [x.id for x in await repository.find_by_version("v3")] == ["12"]
+    assert await repository.find_by_type("Unknown") == []
+
+
+@pytest.mark.asyncio
+async def test_replacing_a_product_updates_the_indexes(repository):
+    await repository.insert(Product(id="09", name="Gem Visa", type="CREDIT_CARD", version="v2"))
+
+    assert [x.id for x in await repository.find_by_version("v1")] == ["10"]
+    assert [x.id for x in await repository.find_by_version("v2")] == ["11", "09"]
+    assert (await repository.get_by_id("09")).version == "v2"
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_is_a_snapshot(repository):
+    snapshot = await repository.fetch_all()
+    await repository.insert(Product(id="12", name="Platinum", type="CREDIT_CARD", version="v3"))
+    await repository.bulk_upsert([Product(id="09", name="Gem Visa", type="CREDIT_CARD", version="v2")])
+
+    # Later changes aren't seen by the snapshot, and it can't be changed itself
+    assert sorted(snapshot) == ["09", "10", "11"]
+    assert snapshot["09"].version == "v1"
+    with pytest.raises(TypeError):
+        snapshot["13"] = Product(id="13", name="Gold", type="CREDIT_CARD", version="v1")
+
+    assert sorted(await repository.fetch_all()) == ["09", "10", "11", "12"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_stores_none_if_any_are_invalid(repository):
+    with pytest.raises(ValueError):
+        await repository.bulk_upsert(
+            [
+                Product(id="12", name="Platinum", type="CREDIT_CARD", version="v3"),
+                Product(id=None, name="No id", type="LOAN"),
+            ]
+        )
+
+    assert sorted(await repository.fetch_all()) == ["09", "10", "11"]
+    assert await repository.find_by_version("v3") == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes(repository):
+    # Overlapping batches and single inserts all at once, none of which may be lost
+    batches = [
+        [Product(id=f"loan-{x}", name=f"Loan {x}", type="LOAN", version=f"v{x % 3}") for x in range(idx, idx + 100)]
+        for idx in range(0, 1000, 50)
+    ]
+    await asyncio.gather(
+        *(repository.bulk_upsert(batch) for batch in batches),
+        *(repository.insert(Product(id=f"card-{x}", name=f"Card {x}", type="CARD", version="v9")) for x in range(100)),
+    )
+
+    # The 3 products to start with, 1050 loans as the batches overlap, and 100 cards
+    assert len(await repository.fetch_all()) == 3 + 1050 + 100
+    assert len(await repository.find_by_type("LOAN")) == 1050
+    assert len(await repository.find_by_type("CARD")) == 100
+    assert len(await repository.find_by_version("v0")) == 350
+    assert len(await repository.find_by_version("v9")) == 100
@@ -1,21 +1,65 @@
+import asyncio
 import logging
 import json
-from typing import Dict
+from typing import Dict, List, Optional
 from src.product.product_service import receive_product_update
 logger = logging.getLogger(__name__)
 
+# How many records of a batch are processed at once
+MAX_CONCURRENCY = 10
 
-# Actual lambda handler, responsible for extracting message from SNS
-# and dealing with lambda-related things, passing the encoded message along to the
+# Only every this many records of a batch is logged, so a large batch doesn't flood the logs
+LOG_SAMPLE_RATE = 100
+
+
+def _decode_record(record: Dict) -> Dict:
+    """The message of an SNS record, or the body of an SQS record, which may itself be an SNS notification."""
+    if 'Sns' in record:
+        return json.loads(record['Sns']['Message'])
+
+    body = json.loads(record['body'])
+    if isinstance(body, dict) and body.get('Type') == 'Notification':
+        return json.loads(body['Message'])
+    return body
+
+
+def _record_id(idx: int, record: Dict) -> str:
+    """The message id of an SNS or SQS record, or its position in the batch if it has neither."""
+    return (record.get('Sns') or {}).get('MessageId') or record.get('messageId') or str(idx)
+
+
+async def _process_record(idx: int, total: int, record: Dict, semaphore: asyncio.Semaphore) -> Optional[str]:
+    """Pass the message of a record to the actual message handler.
+
+    :return: The id of the record if it failed, None if it succeeded
+    """
+    async with semaphore:
+        try:
+            message: Dict = _decode_record(record)
+            if idx % LOG_SAMPLE_RATE == 0:
+                logger.info('Processing record %d of %d: %s', idx + 1, total, message)
+            await receive_product_update(message)
+        except Exception:
+            logger.exception('Failed to process record %d of %d: %s', idx + 1, total, record)
+            return _record_id(idx, record)
+    return None
+
+
+# Actual lambda handler, responsible for extracting messages from SNS
+# and dealing with lambda-related things, passing each decoded message along to the
 # message handler
-async def handler(event: Dict):
-    logger.info(f'{event=}')
+async def handler(event: Dict) -> Dict[str, List[Dict[str, str]]]:
+    records: List[Dict] = event.get('Records', [])
+    logger.info('Received %d records', len(records))
+    logger.debug('event=%s', event)
 
-    # Read the SNS message and pass the contents to the actual message handler
-    message: Dict = json.loads(event['Records'][0]['Sns']['Message'])
-    logger.info(message)
-    results = await receive_product_update(message)
-    logger.info(results)
+    # Every record of a batch is processed, rather than only the first, any which
+    # fail are reported so only those are delivered again
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    failed = await asyncio.gather(
+        *(_process_record(idx, len(records), record, semaphore) for idx, record in enumerate(records))
+    )
+    failures = [{'itemIdentifier': x} for x in failed if x is not None]
+    logger.info('Processed %d records, %d failed', len(records), len(failures))
 
-    # Return the current size of the repository
-    return len(results.keys())
+    return {'batchItemFailures': failures}
@@ -1,5 +1,6 @@
 """pact test for Bear service client"""
 
+import asyncio
 import atexit
 import logging
 import os
@@ -7,7 +8,7 @@ import os
 import pytest
 from pact import Consumer, Provider
 
-from consumer import BearConsumer
+from consumer import AsyncBearConsumer, BearConsumer, BearSpecies, SpeciesCache
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -26,9 +27,22 @@ PACT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..",
 LOG_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "output", "logs")
 
 
+# The batch and caching interactions are each in a Pact of their own, with a mock Provider on
+# another port, so the Pact expected of every language for BearServiceClient is unchanged
+PACT_BATCH_MOCK_PORT = 1235
+PACT_CACHING_MOCK_PORT = 1236
+
+
 @pytest.fixture
 def consumer() -> BearConsumer:
-    return BearConsumer("http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_MOCK_PORT))
+    with BearConsumer("http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_MOCK_PORT)) as consumer:
+        yield consumer
+
+
+@pytest.fixture
+def batch_consumer() -> BearConsumer:
+    with BearConsumer("http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_BATCH_MOCK_PORT)) as consumer:
+        yield consumer
 
 
 @pytest.fixture(scope="session")
@@ -101,3 +115,250 @@ def test_get_polar_bear(mock_provider, consumer):
         # Make sure that all interactions defined occurred
         mock_provider.verify()
     # End Pact annotated code block
+
+
+@pytest.fixture(scope="session")
+def batch_mock_provider(request):
+    """Setup a Pact Consumer for the batch interactions, as for mock_provider"""
+
+    batch_mock_provider = Consumer("BearServiceBatchClient").has_pact_with(
+        Provider("BearService"),
+        host_name=PACT_MOCK_HOST,
+        port=PACT_BATCH_MOCK_PORT,
+        pact_dir=PACT_DIR,
+        log_dir=LOG_DIR,
+    )
+    batch_mock_provider.start_service()
+    atexit.register(batch_mock_provider.stop_service)
+
+    yield batch_mock_provider
+
+    batch_mock_provider.stop_service()
+    batch_mock_provider.publish_to_broker = False
+
+
+def _given_some_bears(batch_mock_provider):
+    """The interactions of the batch tests, the same for the sync and async Consumers so they generate the same Pact"""
+    (
+        batch_mock_provider.given("There are some bears")
+        .upon_receiving("A request for the Bear species with id 1")
+        .with_request("GET", "/species/1")
+        .will_respond_with(200, body={"name": "Polar", "colour": "White"})
+    )
+    (
+        batch_mock_provider.given("There are some bears")
+        .upon_receiving("A request for the Bear species with id 2")
+        .with_request("GET", "/species/2")
+        .will_respond_with(200, body={"name": "Brown", "colour": "Brown"})
+    )
+    (
+        batch_mock_provider.given("There are some bears")
+        .upon_receiving("A request for a Bear species which does not exist")
+        .with_request("GET", "/species/99")
+        .will_respond_with(404)
+    )
+
+
+def test_get_species_many(batch_mock_provider, batch_consumer):
+    # Each species is requested separately, over the pooled connections, and any
+    # which are not found are returned as None in the same position
+    _given_some_bears(batch_mock_provider)
+
+    with batch_mock_provider:
+        species = batch_consumer.get_species_many([1, 2, 99])
+
+        assert [(x.name, x.colour) if x else None for x in species] == [("Polar", "White"), ("Brown", "Brown"), None]
+
+        batch_mock_provider.verify()
+
+
+def test_get_species_many_with_no_ids(batch_consumer):
+    # Nothing to fetch, so the Provider is never called
+    assert batch_consumer.get_species_many([]) == []
+
+
+@pytest.mark.asyncio
+async def test_get_polar_bear_async(mock_provider):
+    # The same interaction as test_get_polar_bear, so the Pact generated is the same
+    (
+        mock_provider.given("There are some bears")
+        .upon_receiving("A request for the Bear species with id 1")
+        .with_request("GET", "/species/1")
+        .will_respond_with(200, body={"name": "Polar", "colour": "White"})
+    )
+
+    with mock_provider:
+        url = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_MOCK_PORT)
+        async with AsyncBearConsumer(url) as consumer:
+            species = await consumer.get_species(1)
+
+        assert species.name == "Polar"
+        assert species.colour == "White"
+
+        mock_provider.verify()
+
+
+@pytest.mark.asyncio
+async def test_get_species_many_async(batch_mock_provider):
+    _given_some_bears(batch_mock_provider)
+
+    with batch_mock_provider:
+        url = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_BATCH_MOCK_PORT)
+        async with AsyncBearConsumer(url) as consumer:
+            species = await consumer.get_species_many([1, 2, 99])
+
+        assert [(x.name, x.colour) if x else None for x in species] == [("Polar", "White"), ("Brown", "Brown"), None]
+
+        batch_mock_provider.verify()
+
+
+@pytest.mark.asyncio
+async def test_get_species_many_async_is_bounded():
+    # A Provider which takes a while to respond, counting how many requests it has at once
+    in_flight = most_in_flight = 0
+
+    async def respond(reader, writer):
+        nonlocal in_flight, most_in_flight
+        body = b'{"name": "Polar", "colour": "White"}'
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                in_flight += 1
+                most_in_flight = max(most_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n")
+                writer.write(b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    server = await asyncio.start_server(respond, "127.0.0.1", 0)
+    async with server:
+        url = "http://127.0.0.1:{port}".format(port=server.sockets[0].getsockname()[1])
+        async with AsyncBearConsumer(url, max_concurrency=3) as consumer:
+            species = await consumer.get_species_many(range(20))
+
+    assert [x.name for x in species] == ["Polar"] * 20
+    assert most_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_get_species_async_times_out():
+    # A Provider which never responds
+    server = await asyncio.start_server(lambda reader, writer: None, "127.0.0.1", 0)
+    async with server:
+        url = "http://127.0.0.1:{port}".format(port=server.sockets[0].getsockname()[1])
+        async with AsyncBearConsumer(url, timeout=0.1) as consumer:
+            with pytest.raises(asyncio.TimeoutError):
+                await consumer.get_species(1)
+
+
+@pytest.fixture(scope="session")
+def caching_mock_provider(request):
+    """Setup a Pact Consumer for the interactions of a caching Consumer, as for mock_provider"""
+
+    caching_mock_provider = Consumer("BearServiceCachingClient").has_pact_with(
+        Provider("BearService"),
+        host_name=PACT_MOCK_HOST,
+        port=PACT_CACHING_MOCK_PORT,
+        pact_dir=PACT_DIR,
+        log_dir=LOG_DIR,
+    )
+    caching_mock_provider.start_service()
+    atexit.register(caching_mock_provider.stop_service)
+
+    yield caching_mock_provider
+
+    caching_mock_provider.stop_service()
+    caching_mock_provider.publish_to_broker = False
+
+
+def test_get_species_cached_then_revalidated(caching_mock_provider):
+    now = [0.0]
+    cache = SpeciesCache(ttl=60, clock=lambda: now[0])
+    url = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_CACHING_MOCK_PORT)
+
+    with BearConsumer(url, cache=cache) as consumer:
+        (
+            caching_mock_provider.given("There are some bears")
+            .upon_receiving("A request for the Bear species with id 1, which has an ETag")
+            .with_request("GET", "/species/1")
+            .will_respond_with(200, headers={"ETag": '"polar-1"'}, body={"name": "Polar", "colour": "White"})
+        )
+        with caching_mock_provider:
+            # The second lookup is answered from the cache, without a request
+            assert consumer.get_species(1).name == "Polar"
+            assert consumer.get_species(1).name == "Polar"
+            caching_mock_provider.verify()
+
+        assert (cache.hits, cache.misses, cache.revalidated) == (1, 1, 0)
+
+        # Once no longer fresh, the Provider is asked if the species has changed since
+        now[0] += 61
+        (
+            caching_mock_provider.given("There are some bears")
+            .upon_receiving("A request for the Bear species with id 1 if it has changed, which it has not")
+            .with_request("GET", "/species/1", headers={"If-None-Match": '"polar-1"'})
+            .will_respond_with(304)
+        )
+        with caching_mock_provider:
+            species = consumer.get_species(1)
+            caching_mock_provider.verify()
+
+        assert (species.name, species.colour) == ("Polar", "White")
+        assert (cache.hits, cache.misses, cache.revalidated) == (1, 2, 1)
+
+
+def test_get_species_not_found_cached(caching_mock_provider):
+    cache = SpeciesCache()
+    url = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_CACHING_MOCK_PORT)
+    (
+        caching_mock_provider.given("There are some bears")
+        .upon_receiving("A request for a Bear species which does not exist")
+        .with_request("GET", "/species/99")
+        .will_respond_with(404)
+    )
+
+    with BearConsumer(url, cache=cache) as consumer:
+        with caching_mock_provider:
+            # That it wasn't found is cached too, so the second lookup doesn't need a request
+            assert consumer.get_species(99) is None
+            assert consumer.get_species(99) is None
+            caching_mock_provider.verify()
+
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_species_cache_evicts_least_recently_used():
+    cache = SpeciesCache(max_size=2)
+    cache.put(1, BearSpecies("Polar", "White"))
+    cache.put(2, BearSpecies("Brown", "Brown"))
+    # Looking up 1 makes 2 the least recently used
+    cache.get(1)
+    cache.put(3, BearSpecies("Black", "Black"))
+
+    assert len(cache) == 2
+    assert cache.get(2) == (None, False)
+    assert cache.get(1)[0].species.name == "Polar"
+    assert cache.get(3)[0].species.name == "Black"
+
+
+def test_species_cache_expires():
+    now = [0.0]
+    cache = SpeciesCache(ttl=60, not_found_ttl=10, clock=lambda: now[0])
+    cache.put(1, BearSpecies("Polar", "White"))
+    cache.put(2, BearSpecies("Brown", "Brown"), etag='"brown-1"')
+    cache.put(99, None)
+
+    now[0] += 11
+    # Not found is fresh for less time than found
+    assert cache.get(99) == (None, False)
+    assert cache.get(1)[1]
+
+    now[0] += 50
+    # Without an ETag there is nothing to revalidate, so it is dropped, otherwise it is kept to revalidate
+    assert cache.get(1) == (None, False)
+    cached, fresh = cache.get(2)
+    assert cached.etag == '"brown-1"' and not fresh
+    assert len(cache) == 1
@@ -1,6 +1,28 @@
-from typing import Optional
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Iterable, List, Optional, Tuple
 
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+# How many connections to keep open to the Provider, and so how many requests can be in flight at once
+POOL_SIZE = 10
+
+# How many requests AsyncBearConsumer can have in flight at once, and how long each can take in seconds
+MAX_CONCURRENCY = 10
+REQUEST_TIMEOUT = 10.0
+
+# How many species a SpeciesCache keeps, and how long in seconds those found and not found are fresh for
+CACHE_SIZE = 1024
+CACHE_TTL = 300.0
+CACHE_NOT_FOUND_TTL = 30.0
 
 
 class BearSpecies(object):
@@ -11,16 +33,113 @@ class BearSpecies(object):
         self.colour = colour
 
 
+class CachedSpecies(object):
+    """A species as last received from the Provider, or None if it wasn't found."""
+
+    def __init__(self, species: Optional[BearSpecies], etag: Optional[str], expires: float):
+        self.species = species
+        self.etag = etag
+        self.expires = expires
+
+
+class SpeciesCache(object):
+    """An opt-in cache of the species received from the Provider, as they almost never change.
+
+    At most max_size species are kept, the least recently used dropped first, and each is
+    fresh for ttl seconds. Species which weren't found are cached too, for not_found_ttl.
+    Once a species is no longer fresh, it is revalidated if the Provider sent an ETag for it,
+    otherwise it is fetched again.
+
+    hits counts the lookups answered without a request, misses those which needed one, and
+    revalidated those of the misses the Provider answered with 304 Not Modified.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CACHE_SIZE,
+        ttl: float = CACHE_TTL,
+        not_found_ttl: float = CACHE_NOT_FOUND_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._entries: "OrderedDict[Hashable, CachedSpecies]" = OrderedDict()
+        # get_species_many looks up species from several threads at once
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[Optional[CachedSpecies], bool]:
+        """The cached species, if there is one which is still fresh or can be revalidated, and if it is fresh."""
+        with self._lock:
+            cached = self._entries.get(key)
+            fresh = cached is not None and self.clock() < cached.expires
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+                if cached and not cached.etag:
+                    del self._entries[key]
+                    return None, False
+            if cached:
+                self._entries.move_to_end(key)
+            return cached, fresh
+
+    def put(self, key: Hashable, species: Optional[BearSpecies], etag: Optional[str] = None):
+        """Cache a species received from the Provider, None if it wasn't found."""
+        ttl = self.ttl if species else self.not_found_ttl
+        with self._lock:
+            self._entries[key] = CachedSpecies(species, etag, self.clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def refresh(self, key: Hashable, cached: CachedSpecies) -> Optional[BearSpecies]:
+        """The Provider has confirmed the cached species is unchanged, so it is fresh again."""
+        with self._lock:
+            self.revalidated += 1
+        self.put(key, cached.species, cached.etag)
+        return cached.species
+
+
 class BearConsumer(object):
     """Demonstrate some basic functionality of how the Bear Consumer will interact
     with the Bear Provider, in this case a simple get_species."""
 
-    def __init__(self, base_uri: str):
-        """Initialise the Consumer, in this case we only need to know the URL.
+    def __init__(self, base_uri: str, pool_size: int = POOL_SIZE, cache: Optional[SpeciesCache] = None):
+        """Initialise the Consumer with the URL of the Provider, how many connections to it to
+        keep open, and optionally a cache for the species it sends.
 
         :param base_uri: The full URL, including port of the Provider to connect to
+        :param pool_size: How many connections to the Provider to keep open for reuse
+        :param cache: Where to cache the species received, if at all
         """
         self.base_uri = base_uri
+        self.pool_size = pool_size
+        self.cache = cache
+
+        # A single Session keeps its connections to the Provider open, rather than a
+        # new connection being made for every request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """Close any connections to the Provider which are still open."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def get_species(self, name: str) -> Optional[BearSpecies]:
         """Fetch a Bear Species object by name from the server.
@@ -28,13 +147,102 @@ class BearConsumer(object):
         :param name: Species name to search for
         :return: BearSpecies details if found, None if not found
         """
-        uri = self.base_uri + "/species?name=" + name
-        response = requests.get(uri)
-        print(response.json())
+        cached, fresh = self.cache.get(name) if self.cache is not None else (None, False)
+        if fresh:
+            return cached.species
+
+        # A cached species which is no longer fresh is only sent again if it has changed
+        headers = {"If-None-Match": cached.etag} if cached else None
+        response = self.session.get(self.base_uri + "/species", params={"name": name}, headers=headers)
+        if response.status_code == 304 and cached:
+            return self.cache.refresh(name, cached)
         if response.status_code == 404:
-            return None
+            species = None
+        else:
+            body = response.json()
+            log.debug("Received species %s: %s", name, body)
+            species = BearSpecies(body["name"], body["colour"])
+
+        if self.cache is not None:
+            self.cache.put(name, species, response.headers.get("ETag"))
+        return species
+
+    def get_species_many(self, names: Iterable[str]) -> List[Optional[BearSpecies]]:
+        """Fetch several Bear Species objects by name from the server, with up to
+        pool_size requests in flight at once over the pooled connections.
 
-        name = response.json()["name"]
-        colour = response.json()["colour"]
+        :param names: Species names to search for
+        :return: BearSpecies details, in the same order as the names, None for any not found
+        """
+        names = list(names)
+        if not names:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(names))) as executor:
+            return list(executor.map(self.get_species, names))
+
+
+class AsyncBearConsumer(object):
+    """As BearConsumer, but with coroutines, so many species can be fetched at once
+    without blocking on each request in turn.
+
+    Use it with async with, e.g. async with AsyncBearConsumer(uri) as consumer.
+    """
+
+    def __init__(self, base_uri: str, max_concurrency: int = MAX_CONCURRENCY, timeout: float = REQUEST_TIMEOUT):
+        """Initialise the Consumer with the URL of the Provider, how many requests it can have in
+        flight at once, and how long each can take.
+
+        :param base_uri: The full URL, including port of the Provider to connect to
+        :param max_concurrency: How many requests can be in flight at once, any more wait for one to finish
+        :param timeout: How long each request can take in seconds, before asyncio.TimeoutError is raised
+        """
+        self.base_uri = base_uri
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        # Created here rather than in __init__, as both belong to the event loop they are created in
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
 
-        return BearSpecies(name, colour)
+    async def close(self):
+        """Close any connections to the Provider which are still open."""
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def get_species(self, name: str) -> Optional[BearSpecies]:
+        """Fetch a Bear Species object by name from the server.
+
+        :param name: Species name to search for
+        :return: BearSpecies details if found, None if not found
+        """
+        # The timeout only starts once the request does, not while waiting for others to finish
+        async with self._semaphore:
+            async with self._session.get(self.base_uri + "/species", params={"name": name}) as response:
+                if response.status == 404:
+                    return None
+
+                body = await response.json()
+        log.debug("Received species %s: %s", name, body)
+
+        return BearSpecies(body["name"], body["colour"])
+
+    async def get_species_many(self, names: Iterable[str]) -> List[Optional[BearSpecies]]:
+        """Fetch several Bear Species objects by name from the server, with up to
+        max_concurrency requests in flight at once.
+
+        :param names: Species names to search for
+        :return: BearSpecies details, in the same order as the names, None for any not found
+        """
+        return list(await asyncio.gather(*(self.get_species(x) for x in names)))
@@ -7,7 +7,7 @@ import os
 import pytest
 from pact import Consumer, Provider
 
-from consumer import BearConsumer
+from consumer import AsyncBearConsumer, BearConsumer, SpeciesCache
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -26,9 +26,22 @@ PACT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..",
 LOG_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "output", "logs")
 
 
+# The batch and caching interactions are each in a Pact of their own, with a mock Provider on
+# another port, so the Pact expected of every language for BearServiceClient is unchanged
+PACT_BATCH_MOCK_PORT = 1235
+PACT_CACHING_MOCK_PORT = 1236
+
+
 @pytest.fixture
 def consumer() -> BearConsumer:
-    return BearConsumer("http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_MOCK_PORT))
+    with BearConsumer("http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_MOCK_PORT)) as consumer:
+        yield consumer
+
+
+@pytest.fixture
+def batch_consumer() -> BearConsumer:
+    with BearConsumer("http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_BATCH_MOCK_PORT)) as consumer:
+        yield consumer
 
 
 @pytest.fixture(scope="session")
@@ -97,3 +110,174 @@ def test_get_polar_bear(pact, consumer):
         # Make sure that all interactions defined occurred
         pact.verify()
     # End Pact annotated code block
+
+
+@pytest.fixture(scope="session")
+def batch_pact(request):
+    """Setup a Pact Consumer for the batch interactions, as for pact"""
+
+    batch_pact = Consumer("BearServiceBatchClient").has_pact_with(
+        Provider("BearService"),
+        host_name=PACT_MOCK_HOST,
+        port=PACT_BATCH_MOCK_PORT,
+        pact_dir=PACT_DIR,
+        log_dir=LOG_DIR,
+    )
+    batch_pact.start_service()
+    atexit.register(batch_pact.stop_service)
+
+    yield batch_pact
+
+    batch_pact.stop_service()
+    batch_pact.publish_to_broker = False
+
+
+def _given_some_bears(batch_pact):
+    """The interactions of the batch tests, the same for the sync and async Consumers so they generate the same Pact"""
+    (
+        batch_pact.given("There are some bears")
+        .upon_receiving("A request for the Polar bear species by name")
+        .with_request("GET", "/species", query={"name": "Polar"})
+        .will_respond_with(200, body={"name": "Polar", "colour": "White"})
+    )
+    (
+        batch_pact.given("There are some bears")
+        .upon_receiving("A request for the Brown bear species by name")
+        .with_request("GET", "/species", query={"name": "Brown"})
+        .will_respond_with(200, body={"name": "Brown", "colour": "Brown"})
+    )
+    (
+        batch_pact.given("There are some bears")
+        .upon_receiving("A request for a bear species which does not exist by name")
+        .with_request("GET", "/species", query={"name": "Purple"})
+        .will_respond_with(404)
+    )
+
+
+def test_get_species_many(batch_pact, batch_consumer):
+    # Each species is requested separately, over the pooled connections, and any
+    # which are not found are returned as None in the same position
+    _given_some_bears(batch_pact)
+
+    with batch_pact:
+        species = batch_consumer.get_species_many(["Polar", "Brown", "Purple"])
+
+        assert [(x.name, x.colour) if x else None for x in species] == [("Polar", "White"), ("Brown", "Brown"), None]
+
+        batch_pact.verify()
+
+
+def test_get_species_many_with_no_names(batch_consumer):
+    # Nothing to fetch, so the Provider is never called
+    assert batch_consumer.get_species_many([]) == []
+
+
+@pytest.mark.asyncio
+async def test_get_polar_bear_async(pact):
+    # The same interaction as test_get_polar_bear, so the Pact generated is the same
+    (
+        pact.given("There are some bears")
+        .upon_receiving("A request for the Polar bear species by name")
+        .with_request("GET", "/species", query={"name": "Polar"})
+        .will_respond_with(200, body={"name": "Polar", "colour": "White"})
+    )
+
+    with pact:
+        uri = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_MOCK_PORT)
+        async with AsyncBearConsumer(uri) as consumer:
+            species = await consumer.get_species("Polar")
+
+        assert species.name == "Polar"
+        assert species.colour == "White"
+
+        pact.verify()
+
+
+@pytest.mark.asyncio
+async def test_get_species_many_async(batch_pact):
+    _given_some_bears(batch_pact)
+
+    with batch_pact:
+        uri = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_BATCH_MOCK_PORT)
+        async with AsyncBearConsumer(uri) as consumer:
+            species = await consumer.get_species_many(["Polar", "Brown", "Purple"])
+
+        assert [(x.name, x.colour) if x else None for x in species] == [("Polar", "White"), ("Brown", "Brown"), None]
+
+        batch_pact.verify()
+
+
+@pytest.fixture(scope="session")
+def caching_pact(request):
+    """Setup a Pact Consumer for the interactions of a caching Consumer, as for pact"""
+
+    caching_pact = Consumer("BearServiceCachingClient").has_pact_with(
+        Provider("BearService"),
+        host_name=PACT_MOCK_HOST,
+        port=PACT_CACHING_MOCK_PORT,
+        pact_dir=PACT_DIR,
+        log_dir=LOG_DIR,
+    )
+    caching_pact.start_service()
+    atexit.register(caching_pact.stop_service)
+
+    yield caching_pact
+
+    caching_pact.stop_service()
+    caching_pact.publish_to_broker = False
+
+
+def test_get_species_cached_then_revalidated(caching_pact):
+    now = [0.0]
+    cache = SpeciesCache(ttl=60, clock=lambda: now[0])
+    uri = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_CACHING_MOCK_PORT)
+
+    with BearConsumer(uri, cache=cache) as consumer:
+        (
+            caching_pact.given("There are some bears")
+            .upon_receiving("A request for the Polar bear species by name, which has an ETag")
+            .with_request("GET", "/species", query={"name": "Polar"})
+            .will_respond_with(200, headers={"ETag": '"polar-1"'}, body={"name": "Polar", "colour": "White"})
+        )
+        with caching_pact:
+            # The second lookup is answered from the cache, without a request
+            assert consumer.get_species("Polar").name == "Polar"
+            assert consumer.get_species("Polar").name == "Polar"
+            caching_pact.verify()
+
+        assert (cache.hits, cache.misses, cache.revalidated) == (1, 1, 0)
+
+        # Once no longer fresh, the Provider is asked if the species has changed since
+        now[0] += 61
+        (
+            caching_pact.given("There are some bears")
+            .upon_receiving("A request for the Polar bear species by name if it has changed, which it has not")
+            .with_request("GET", "/species", query={"name": "Polar"}, headers={"If-None-Match": '"polar-1"'})
+            .will_respond_with(304)
+        )
+        with caching_pact:
+            species = consumer.get_species("Polar")
+            caching_pact.verify()
+
+        assert (species.name, species.colour) == ("Polar", "White")
+        assert (cache.hits, cache.misses, cache.revalidated) == (1, 2, 1)
+
+
+def test_get_species_not_found_cached(caching_pact):
+    cache = SpeciesCache()
+    uri = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_CACHING_MOCK_PORT)
+    (
+        caching_pact.given("There are some bears")
+        .upon_receiving("A request for a bear species which does not exist by name")
+        .with_request("GET", "/species", query={"name": "Purple"})
+        .will_respond_with(404)
+    )
+
+    with BearConsumer(uri, cache=cache) as consumer:
+        with caching_pact:
+            # That it wasn't found is cached too, so the second lookup doesn't need a request
+            assert consumer.get_species("Purple") is None
+            assert consumer.get_species("Purple") is None
+            caching_pact.verify()
+
+    assert (cache.hits, cache.misses) == (1, 1)
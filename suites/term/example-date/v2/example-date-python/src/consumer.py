@@ -1,7 +1,13 @@
+import asyncio
 from typing import Optional
 
+import aiohttp
 import requests
 
+# How many requests AsyncBearConsumer can have in flight at once, and how long each can take in seconds
+MAX_CONCURRENCY = 10
+REQUEST_TIMEOUT = 10.0
+
 
 class BearSpecies(object):
     """Define the basic BearSpecies data we expect to receive from the Bear Provider."""
@@ -22,18 +28,72 @@ class BearConsumer(object):
         """
         self.base_uri = base_uri
 
-    def get_birthday(self, name: str) -> Optional[BearSpecies]:
-        """Fetch a Bear object by species from the server.
+    def get_birthday(self, bear_id: int) -> Optional[str]:
+        """Fetch the birthday of a Bear by its id from the server.
 
-        :param name: Species name to search for
-        :return: BearSpecies details if found, None if not found
+        :param bear_id: The id of the Bear
+        :return: The birthday if found, None if not found
         """
-        uri = self.base_uri + "/species/" + name + "/birthday"
+        uri = self.base_uri + "/bear/" + str(bear_id) + "/birthday"
         response = requests.get(uri)
-        print(response.json())
         if response.status_code == 404:
             return None
 
-        birthday = response.json()["birthday"]
+        return response.json()["birthday"]
+
+
+class AsyncBearConsumer(object):
+    """As BearConsumer, but with coroutines, so many birthdays can be fetched at once
+    without blocking on each request in turn.
+
+    Use it with async with, e.g. async with AsyncBearConsumer(uri) as consumer.
+    """
+
+    def __init__(self, base_uri: str, max_concurrency: int = MAX_CONCURRENCY, timeout: float = REQUEST_TIMEOUT):
+        """Initialise the Consumer with the URL of the Provider, how many requests it can have in
+        flight at once, and how long each can take.
+
+        :param base_uri: The full URL, including port of the Provider to connect to
+        :param max_concurrency: How many requests can be in flight at once, any more wait for one to finish
+        :param timeout: How long each request can take in seconds, before asyncio.TimeoutError is raised
+        """
+        self.base_uri = base_uri
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        # Created here rather than in __init__, as both belong to the event loop they are created in
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """Close any connections to the Provider which are still open."""
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def get_birthday(self, bear_id: int) -> Optional[str]:
+        """Fetch the birthday of a Bear by its id from the server.
+
+        :param bear_id: The id of the Bear
+        :return: The birthday if found, None if not found
+        """
+        uri = self.base_uri + "/bear/" + str(bear_id) + "/birthday"
+        # The timeout only starts once the request does, not while waiting for others to finish
+        async with self._semaphore:
+            async with self._session.get(uri) as response:
+                if response.status == 404:
+                    return None
+
+                body = await response.json()
 
-        return BearSpecies(name, colour)
+        return body["birthday"]
@@ -7,7 +7,7 @@ import os
 import pytest
 from pact import Consumer, Provider, Format
 
-from consumer import BearConsumer
+from consumer import AsyncBearConsumer, BearConsumer
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -59,11 +59,31 @@ def test_get_polar_bear_birthday(pact, consumer):
 
     with pact:
         # Perform the actual request
-        species = consumer.get_birthday("Polar")
+        birthday = consumer.get_birthday(1)
 
-        # In this case the mock Provider will have returned a valid response
-        assert species.birthday == "2010-07-19"
+        # In this case the mock Provider will have returned the example date of the Term
+        assert birthday == "2000-02-01"
 
         # Make sure that all interactions defined occurred
         pact.verify()
     # End Pact annotated code block
+
+
+@pytest.mark.asyncio
+async def test_get_polar_bear_birthday_async(pact):
+    # The same interaction as the sync test, so both are held to the same contract
+    (
+        pact.given("There are some bears")
+        .upon_receiving("A request for the first Bear's birthday")
+        .with_request("GET", "/bear/1/birthday")
+        .will_respond_with(200, body={"birthday": Format().date})
+    )
+
+    with pact:
+        uri = "http://{host}:{port}".format(host=PACT_MOCK_HOST, port=PACT_MOCK_PORT)
+        async with AsyncBearConsumer(uri) as consumer:
+            birthday = await consumer.get_birthday(1)
+
+        assert birthday == "2000-02-01"
+
+        pact.verify()
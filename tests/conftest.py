@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# The scripts import each other as top level modules, as they do when run from scripts/
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.joinpath("scripts")))
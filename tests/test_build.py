@@ -0,0 +1,37 @@
+import build
+from build import _build_images, _read_build_results, _results_matrix, _write_build_results
+from shared import LanguagesAndSpecs
+
+LANGUAGES_AND_SPECS = LanguagesAndSpecs(languages=["js", "python"], specs=["v2", "v3"], flavours=[])
+
+
+def _languages(tmp_path):
+    for language, spec, content in [("js", "v2", "js"), ("js", "v3", "js"), ("python", "v3", "python")]:
+        tmp_path.joinpath(language, spec).mkdir(parents=True)
+        tmp_path.joinpath(language, spec, "Dockerfile").write_text(f"FROM {content}\n")
+    return tmp_path
+
+
+def test_merged_build_results_only_build_the_images_no_shard_built(tmp_path, monkeypatch):
+    built_here = []
+
+    def _build_image(context_hash, images, force=False):
+        built_here.extend(x.tag for x in images)
+        return 0
+
+    monkeypatch.setattr(build, "_build_image", _build_image)
+    _write_build_results(tmp_path.joinpath("shard-1.json"), {("js", "v2"): 0, ("js", "v3"): 1})
+    _write_build_results(tmp_path.joinpath("shard-2.json"), {("js", "v3"): 0})
+    built = _read_build_results(
+        [tmp_path.joinpath("shard-1.json"), tmp_path.joinpath("shard-2.json"), tmp_path.joinpath("shard-3.json")]
+    )
+
+    results = _build_images(_languages(tmp_path.joinpath("languages")), LANGUAGES_AND_SPECS, built=built)
+
+    assert built_here == ["pact-examples-python-v3"]
+    # Failing to build on any shard is an error
+    assert _results_matrix(LANGUAGES_AND_SPECS, results) == [
+        ["Language", "v2", "v3"],
+        ["**js**", "✅ Yes", "❌ Error"],
+        ["**python**", "-", "✅ Yes"],
+    ]
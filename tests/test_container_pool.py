@@ -0,0 +1,125 @@
+import time
+
+import pytest
+from docker.errors import ImageNotFound
+
+from container_pool import ContainerPool
+from fake_docker import FakeContainer, FakeDockerClient, FakeExecResult
+
+IMAGE = "pact-examples-python-v3"
+
+
+@pytest.fixture
+def example_dir(tmp_path):
+    example_dir = tmp_path.joinpath("example-hello-world-python")
+    example_dir.mkdir()
+    example_dir.joinpath("Makefile").write_text("test:\n\tpytest\n")
+    return example_dir
+
+
+def _pool(exec_handler=None, max_uses: int = 10) -> ContainerPool:
+    client = FakeDockerClient([IMAGE], exec_handler) if exec_handler else FakeDockerClient([IMAGE])
+    return ContainerPool(client, max_uses=max_uses)
+
+
+def test_run_reuses_a_container_until_max_uses(example_dir, tmp_path):
+    pool = _pool(max_uses=2)
+    try:
+        runs = [pool.run(IMAGE, example_dir, tmp_path.joinpath(f"{idx}.log")) for idx in range(5)]
+
+        assert [x.exit_code for x in runs] == [0] * 5
+        # Replaced after every second use, the last is still idle in the pool
+        started = pool.client.containers.started
+        assert [x.id for x in started] == ["fake-1", "fake-2", "fake-3"]
+        assert [len(x.exec_calls) for x in started] == [2, 2, 1]
+        assert pool.client.containers.removed == started[:2]
+    finally:
+        pool.close()
+
+
+def test_run_discards_the_container_after_a_failed_example(example_dir, tmp_path):
+    exit_codes = iter([0, 1, 0])
+
+    def exec_handler(container, command, workdir):
+        return FakeExecResult(exit_code=next(exit_codes), output=b"output\n")
+
+    pool = _pool(exec_handler)
+    try:
+        runs = [pool.run(IMAGE, example_dir, tmp_path.joinpath(f"{idx}.log")) for idx in range(3)]
+
+        assert [x.exit_code for x in runs] == [0, 1, 0]
+        assert runs[1].tail == ["output"]
+        # The container the example failed in isn't reused, in case it was left in a bad state
+        first, second = pool.client.containers.started
+        assert len(first.exec_calls) == 2
+        assert pool.client.containers.removed == [first]
+        assert len(second.exec_calls) == 1
+    finally:
+        pool.close()
+
+
+def test_run_raises_image_not_found_for_an_image_which_has_not_been_built(example_dir, tmp_path):
+    pool = _pool()
+    try:
+        with pytest.raises(ImageNotFound):
+            pool.run("pact-examples-python-v4", example_dir, tmp_path.joinpath("example.log"))
+
+        assert pool.client.containers.started == []
+        # The workspace copied for the example is removed, as it's never handed back
+        assert [x.name for x in pool.workspace_root.iterdir() if x.is_dir()] == []
+    finally:
+        pool.close()
+
+
+def test_close_removes_the_containers_and_workspaces(example_dir, tmp_path):
+    pool = _pool()
+    run = pool.run(IMAGE, example_dir, tmp_path.joinpath("example.log"))
+    leased = pool.acquire(IMAGE)
+    assert run.workspace.exists()
+
+    pool.close()
+
+    # Including the container still leased out
+    assert pool.client.containers.running == {}
+    assert leased.container.status == "removed"
+    assert not pool.workspace_root.exists()
+    with pytest.raises(RuntimeError):
+        pool.acquire(IMAGE)
+
+
+def test_run_kills_and_discards_the_container_of_an_example_which_times_out(example_dir, tmp_path):
+    def exec_handler(container, command, workdir):
+        # Still running when the timeout fires
+        time.sleep(0.5)
+        return FakeExecResult(exit_code=0, output=b"")
+
+    pool = _pool(exec_handler)
+    try:
+        run = pool.run(IMAGE, example_dir, tmp_path.joinpath("example.log"), timeout=0.05)
+
+        assert run.timed_out
+        # As if by SIGKILL
+        assert run.exit_code == 137
+        container = pool.client.containers.started[0]
+        assert pool.client.containers.removed == [container]
+    finally:
+        pool.close()
+
+
+def test_run_discards_a_killed_container_even_if_the_example_exits_cleanly(example_dir, tmp_path, monkeypatch):
+    # The kill lands as the example exits, so its exit code is still 0
+    monkeypatch.setattr(FakeContainer, "kill", lambda self, **kwargs: None)
+
+    def exec_handler(container, command, workdir):
+        time.sleep(0.5)
+        return FakeExecResult(exit_code=0, output=b"")
+
+    pool = _pool(exec_handler)
+    try:
+        run = pool.run(IMAGE, example_dir, tmp_path.joinpath("example.log"), timeout=0.05)
+
+        assert (run.exit_code, run.timed_out) == (0, True)
+        assert pool.client.containers.removed == pool.client.containers.started
+        assert pool.client.containers.running == {}
+    finally:
+        pool.close()
@@ -0,0 +1,85 @@
+import pathlib
+
+import pytest
+
+import first_paragraph
+from first_paragraph import _first_paragraph, _first_paragraph_text
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+
+READMES = sorted(x for x in ROOT_PATH.glob("**/README.md") if "node_modules" not in x.parts)
+
+
+@pytest.mark.parametrize("path", READMES, ids=[str(x.relative_to(ROOT_PATH)) for x in READMES])
+def test_every_readme_gives_the_same_text_memoised_as_rendering_it(path):
+    first_paragraph._first_paragraphs.clear()
+    rendered = _first_paragraph_text(path.read_text())
+
+    assert _first_paragraph(path) == rendered
+    # And again, from the memoised text
+    assert _first_paragraph(path) == rendered
+
+
+@pytest.mark.parametrize(
+    "data,expected",
+    [
+        pytest.param(
+            "# Title\n\nA *first* paragraph,\nover two lines.\n\nA second paragraph.\n",
+            "A first paragraph,<br/>over two lines.",
+            id="atx heading",
+        ),
+        pytest.param("## Title ##\nStraight after the heading.\n", "Straight after the heading.", id="closed atx"),
+        pytest.param("Title\n=====\n\nUnder a setext heading.\n", "Under a setext heading.", id="setext heading"),
+        pytest.param("Title\n-----\nStraight after.\n", "Straight after.", id="setext subheading"),
+        pytest.param(
+            "# Title\n\n- An item\n- Another [item](https://example.com)\n\nAfter.\n",
+            "<br/>An item<br/>Another item<br/>",
+            id="tight list",
+        ),
+        pytest.param(
+            "- An item\n    - A nested item\n- Another item\n",
+            "<br/>An item<br/>A nested item<br/><br/><br/>Another item<br/>",
+            id="nested list",
+        ),
+        pytest.param("1. Ordered\n2. Not a paragraph\n\nThe paragraph.\n", "The paragraph.", id="ordered list"),
+        pytest.param(
+            '<div align="center">\n  <img src="logo.png"/>\n</div>\n\nAfter the HTML.\n',
+            "After the HTML.",
+            id="html block",
+        ),
+        pytest.param("<p>A paragraph\nof <b>HTML</b></p>\n\nAfter.\n", "A paragraph<br/>of HTML", id="html paragraph"),
+        pytest.param(
+            "Some `code`, an ![image](x.png) and a [reference][ref].\n\n[ref]: https://example.com\n",
+            "Some code, an  and a reference.",
+            id="inline",
+        ),
+        pytest.param("> A quote\n\n    indented code\n\n---\n\nAfter the rule.\n", "After the rule.", id="quote"),
+        # Asterisks and underscores which aren't emphasis are kept
+        pytest.param("a * b * c\n", "a * b * c", id="lone asterisks"),
+        pytest.param("x_y_z and 2 * 3 * 4\n", "x_y_z and 2 * 3 * 4", id="underscores and asterisks"),
+    ],
+)
+def test_edge_cases(data, expected):
+    assert _first_paragraph_text(data) == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param("", id="empty"),
+        pytest.param("# Only a heading\n", id="heading"),
+        pytest.param("# Title\n\n    only_code()\n\n---\n", id="heading, code and rule"),
+        pytest.param("<div>\nOnly HTML\n</div>\n", id="html block"),
+    ],
+)
+def test_a_readme_with_no_paragraph_gives_no_text(data):
+    assert _first_paragraph_text(data) == ""
+
+
+def test_a_changed_readme_is_rendered_again(tmp_path):
+    path = tmp_path.joinpath("README.md")
+    path.write_text("# example\n\nBefore.\n")
+    assert _first_paragraph(path) == "Before."
+
+    path.write_text("# example\n\nAfter.\n")
+    assert _first_paragraph(path) == "After."
@@ -0,0 +1,23 @@
+from manifest import Manifest
+
+
+def test_pacts_in_a_language_dir_are_only_expected_for_that_language(tmp_path):
+    spec_path = tmp_path.joinpath("suites", "specs", "example-a", "v2")
+    for language in ["js", "python"]:
+        spec_path.joinpath(f"example-a-{language}").mkdir(parents=True)
+        tmp_path.joinpath("languages", language, "v2").mkdir(parents=True)
+    spec_path.joinpath("pacts", "python").mkdir(parents=True)
+    spec_path.joinpath("pacts", "client-service.json").write_text("{}")
+    spec_path.joinpath("pacts", "python", "batchclient-service.json").write_text("{}")
+
+    manifest = Manifest.scan(tmp_path)
+    pacts_path = spec_path.joinpath("pacts")
+
+    assert manifest.pacts("specs", "example-a", "v2") == [pacts_path.joinpath("client-service.json")]
+    assert manifest.pacts("specs", "example-a", "v2", "js") == [pacts_path.joinpath("client-service.json")]
+    assert manifest.pacts("specs", "example-a", "v2", "python") == [
+        pacts_path.joinpath("client-service.json"),
+        pacts_path.joinpath("python", "batchclient-service.json"),
+    ]
+    # The language dir isn't taken for an implementation
+    assert manifest.implementation("specs", "example-a", "v2", "python").path == spec_path.joinpath("example-a-python")
@@ -0,0 +1,21 @@
+import pathlib
+
+from result_reports import CellResult, ResultsLog, _read_cell_results
+from scheduler import Cell
+
+CELLS = [
+    Cell("specs", "example-date", spec, "python", "", pathlib.Path(f"suites/specs/example-date/{spec}/Makefile"))
+    for spec in ("v2", "v3")
+]
+
+
+def test_read_cell_results_skips_a_shard_which_wrote_no_results(tmp_path):
+    results_log = ResultsLog(tmp_path.joinpath("shard-1", "results.jsonl"))
+    results_log.start(CELLS[:1])
+    results_log.write(CellResult(cell=CELLS[0], result=0, outcome="pacts matched", duration=1.5))
+    results_log.close()
+
+    cell_results = _read_cell_results([results_log.path, tmp_path.joinpath("shard-2", "results.jsonl")], CELLS)
+
+    # The examples of the missing shard have no result, so are reported as not run
+    assert [(x.cell, x.result) for x in cell_results] == [(CELLS[0], 0)]
@@ -0,0 +1,25 @@
+import pathlib
+
+from scheduler import Cell
+from sharding import Shard, _shard_cells
+
+
+def _cell(example: str) -> Cell:
+    return Cell("specs", example, "v3", "python", "", pathlib.Path(f"suites/specs/{example}/v3/Makefile"))
+
+
+def test_a_recorded_duration_of_zero_is_not_given_the_default():
+    durations = {_cell("example-a"): 100.0, _cell("example-b"): 100.0, _cell("example-c"): 0.0}
+
+    _, totals = _shard_cells(list(durations), Shard(index=1, count=2), durations.get)
+
+    # Rather than the median of the known durations, 100s
+    assert sorted(totals) == [100.0, 100.0]
+
+
+def test_a_cell_without_a_duration_is_given_the_median():
+    durations = {_cell("example-a"): 10.0, _cell("example-b"): 30.0, _cell("example-c"): None}
+
+    _, totals = _shard_cells(list(durations), Shard(index=1, count=1), durations.get)
+
+    assert totals == [70.0]